@@ -0,0 +1,253 @@
+# async_bot.py
+import asyncio
+
+import aiohttp
+from binance import AsyncClient
+from binance.enums import *
+from binance.exceptions import BinanceAPIException, BinanceOrderException
+from basic_bot import FUTURES_TESTNET_API_URL
+from logger_setup import log # Use our configured logger
+
+class AsyncBot:
+    """
+    asyncio counterpart of BasicBot with the same order/query method surface.
+    All requests share one pooled keep-alive aiohttp session, so independent
+    calls issued together through gather() complete in roughly one round-trip.
+
+    Use AsyncBot.create(...) (or `async with await AsyncBot.create(...)`)
+    rather than the constructor, since the session must be opened inside a
+    running event loop.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    async def create(cls, api_key, api_secret, futures_url=FUTURES_TESTNET_API_URL, pool_size=100):
+        """
+        Opens the pooled session and checks connectivity.
+        :param futures_url: Futures REST base URL (override to point at a local stub exchange)
+        :param pool_size: Maximum number of concurrent keep-alive connections
+        """
+        connector = client = None
+        try:
+            connector = aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+            client = AsyncClient(api_key, api_secret, session_params={"connector": connector})
+            client.FUTURES_URL = futures_url
+            bot = cls(client)
+            await client.futures_ping()
+            log.info(f"Successfully connected to Binance Futures Testnet (async, pool size {pool_size}).")
+            return bot
+        except Exception as e:
+            if isinstance(e, BinanceAPIException):
+                log.error(f"Binance API Exception during async initialization: {e}")
+            else:
+                log.error(f"Error initializing AsyncBot: {e}")
+            # Refused connections and timeouts would otherwise leak the session and its connector
+            if client is not None:
+                await client.close_connection()
+            elif connector is not None:
+                await connector.close()
+            raise
+
+    async def close(self):
+        """Closes the pooled session."""
+        await self.client.close_connection()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def gather(self, *coros, concurrency: int = None):
+        """
+        Runs independent bot calls concurrently over the shared session.
+        :param coros: Coroutines from this bot's methods, e.g. bot.place_limit_order(...)
+        :param concurrency: Optional cap on in-flight requests (defaults to all at once)
+        :return: Results in the same order as the coroutines (None for failed calls)
+        """
+        if concurrency:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(coro):
+                async with semaphore:
+                    return await coro
+
+            coros = [limited(c) for c in coros]
+        return await asyncio.gather(*coros)
+
+    def _log_request(self, method_name, params):
+        # %-style args: the payload is only rendered if DEBUG is enabled, and then off-thread
+        log.debug("API Request: %s with params: %s", method_name, params)
+
+    def _log_response(self, method_name, response):
+        log.debug("API Response from %s: %s", method_name, response)
+
+    def _handle_api_error(self, e, operation_description):
+        log.error(f"Binance API Exception during {operation_description}: {e}")
+        log.error(f"Status Code: {e.status_code}, Message: {e.message}")
+        return None
+
+    async def _create_order(self, label, params, description):
+        self._log_request(f"futures_create_order ({label})", params)
+        try:
+            order = await self.client.futures_create_order(**params)
+            self._log_response(f"futures_create_order ({label})", order)
+            log.info(f"{label.capitalize()} order placed successfully: {order}")
+            return order
+        except (BinanceAPIException, BinanceOrderException) as e:
+            return self._handle_api_error(e, description)
+        except Exception as e:
+            log.error(f"Unexpected error {description}: {e}")
+            return None
+
+    def _side(self, side):
+        side_map = {"BUY": SIDE_BUY, "SELL": SIDE_SELL}
+        if side.upper() not in side_map:
+            log.error(f"Invalid order side: {side}. Must be 'BUY' or 'SELL'.")
+            return None
+        return side_map[side.upper()]
+
+    async def get_account_balance(self, asset="USDT"):
+        """Fetches the balance for a specific asset in the futures account."""
+        log.info(f"Fetching account balance for asset: {asset}")
+        try:
+            balances = await self.client.futures_account_balance()
+            self._log_response("futures_account_balance", balances)
+            for balance in balances:
+                if balance['asset'] == asset:
+                    log.info(f"Balance for {asset}: {balance['balance']}")
+                    return balance
+            log.warning(f"Asset {asset} not found in futures account balance.")
+            return None
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, "fetching account balance")
+        except Exception as e:
+            log.error(f"Unexpected error fetching account balance: {e}")
+            return None
+
+    async def set_leverage(self, symbol, leverage):
+        """Sets leverage for a given symbol."""
+        log.info(f"Attempting to set leverage for {symbol} to {leverage}x")
+        self._log_request("futures_change_leverage", {"symbol": symbol, "leverage": leverage})
+        try:
+            response = await self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+            self._log_response("futures_change_leverage", response)
+            log.info(f"Successfully set leverage for {symbol} to {response.get('leverage', 'N/A')}x.")
+            return response
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, f"setting leverage for {symbol}")
+        except Exception as e:
+            log.error(f"Unexpected error setting leverage for {symbol}: {e}")
+            return None
+
+    async def place_market_order(self, symbol: str, side: str, quantity: float):
+        """
+        Places a market order.
+        :return: Order response or None on error
+        """
+        order_side = self._side(side)
+        if order_side is None:
+            return None
+        log.info(f"Placing MARKET order: {side} {quantity} {symbol}")
+        params = {
+            "symbol": symbol,
+            "side": order_side,
+            "type": ORDER_TYPE_MARKET,
+            "quantity": str(quantity)
+        }
+        return await self._create_order("MARKET", params, f"placing market order for {symbol}")
+
+    async def place_limit_order(self, symbol: str, side: str, quantity: float, price: float):
+        """
+        Places a GTC limit order.
+        :return: Order response or None on error
+        """
+        order_side = self._side(side)
+        if order_side is None:
+            return None
+        log.info(f"Placing LIMIT order: {side} {quantity} {symbol} @ {price}")
+        params = {
+            "symbol": symbol,
+            "side": order_side,
+            "type": ORDER_TYPE_LIMIT,
+            "timeInForce": TIME_IN_FORCE_GTC,
+            "quantity": str(quantity),
+            "price": str(price)
+        }
+        return await self._create_order("LIMIT", params, f"placing limit order for {symbol}")
+
+    async def place_stop_limit_order(self, symbol: str, side: str, quantity: float, price: float, stop_price: float):
+        """
+        Places a Stop-Limit order (see BasicBot.place_stop_limit_order for trigger semantics).
+        :return: Order response or None on error
+        """
+        order_side = self._side(side)
+        if order_side is None:
+            return None
+        log.info(f"Placing STOP-LIMIT order: {side} {quantity} {symbol} @ price {price}, stopPrice {stop_price}")
+        params = {
+            "symbol": symbol,
+            "side": order_side,
+            "type": FUTURE_ORDER_TYPE_STOP,
+            "quantity": str(quantity),
+            "price": str(price),
+            "stopPrice": str(stop_price),
+            "timeInForce": TIME_IN_FORCE_GTC
+        }
+        return await self._create_order("STOP-LIMIT", params, f"placing stop-limit order for {symbol}")
+
+    async def get_order_status(self, symbol: str, order_id: int):
+        """
+        Retrieves the status of a specific order.
+        :return: Order status details or None on error
+        """
+        log.info(f"Fetching status for order ID {order_id} on {symbol}")
+        self._log_request("futures_get_order", {"symbol": symbol, "orderId": order_id})
+        try:
+            order_status = await self.client.futures_get_order(symbol=symbol, orderId=order_id)
+            self._log_response("futures_get_order", order_status)
+            return order_status
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, f"getting order status for {order_id}")
+        except Exception as e:
+            log.error(f"Unexpected error getting order status for {order_id}: {e}")
+            return None
+
+    async def cancel_order(self, symbol: str, order_id: int):
+        """
+        Cancels an open order.
+        :return: Cancellation response or None on error
+        """
+        log.info(f"Attempting to cancel order ID {order_id} on {symbol}")
+        self._log_request("futures_cancel_order", {"symbol": symbol, "orderId": order_id})
+        try:
+            cancel_response = await self.client.futures_cancel_order(symbol=symbol, orderId=order_id)
+            self._log_response("futures_cancel_order", cancel_response)
+            log.info(f"Order {order_id} cancelled successfully.")
+            return cancel_response
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, f"cancelling order {order_id}")
+        except Exception as e:
+            log.error(f"Unexpected error cancelling order {order_id}: {e}")
+            return None
+
+    async def get_open_orders(self, symbol: str = None):
+        """
+        Retrieves all open orders for a specific symbol or all symbols.
+        :return: List of open orders or None on error
+        """
+        log.info(f"Fetching open orders for symbol: {symbol if symbol else 'ALL'}")
+        params = {"symbol": symbol} if symbol else {}
+        self._log_request("futures_get_open_orders", params)
+        try:
+            open_orders = await self.client.futures_get_open_orders(**params)
+            self._log_response("futures_get_open_orders", open_orders)
+            log.info(f"Found {len(open_orders)} open order(s).")
+            return open_orders
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, "getting open orders")
+        except Exception as e:
+            log.error(f"Unexpected error getting open orders: {e}")
+            return None
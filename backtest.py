@@ -0,0 +1,759 @@
+# backtest.py
+"""
+Offline backtesting: SimulatedExchange stands in for the python-binance
+Client inside BasicBot (BasicBot(..., client=SimulatedExchange(...))) and
+replays historical klines instead of talking to the testnet.
+
+Klines are stored columnar, one directory per symbol holding open_time.npy
+(int64 ms) and open/high/low/close/volume.npy (float64). They are opened with
+mmap_mode="r", so a replay only pages in what it touches.
+
+Matching is event driven: when an order rests, the first bar that would fill
+it is found with a vectorized scan over the kline columns and queued by time,
+so bars without fills cost nothing. The clock sits at the close of the bar at
+`step`; orders placed then can fill from the next bar onwards.
+
+    LIMIT       fills when the bar trades through the price (at the open if it gaps through)
+    STOP        stop-limit: triggers on stopPrice, then rests as a LIMIT at price
+    STOP_MARKET triggers on stopPrice and fills at max/min(stopPrice, open)
+    MARKET      fills at the current close +/- slippage
+
+Margin is cross, one-way mode: orders are rejected (-2019) when their initial
+margin exceeds the available balance, and positions are liquidated when
+equity falls to the maintenance margin.
+
+Generate a year of synthetic data and run the demo strategy:
+    python backtest.py data/klines --generate 24 --bars 525600
+or replay klines downloaded with `main.py fetch` (market_store.py):
+    python backtest.py market_history --store --interval 1m
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from binance.exceptions import BinanceAPIException
+
+from logger_setup import log
+
+KLINE_COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+KLINE_DTYPES = {"open_time": np.int64, "open": np.float64, "high": np.float64,
+                "low": np.float64, "close": np.float64, "volume": np.float64}
+SCAN_CHUNK = 1024 # Bars per first vectorized scan; doubled until a hit
+MAX_LEVERAGE = 125
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+
+
+class Klines:
+    """Columnar kline arrays for one symbol (NumPy arrays or read-only memmaps)."""
+    __slots__ = ("symbol",) + KLINE_COLUMNS
+
+    def __init__(self, symbol, open_time, open, high, low, close, volume):
+        self.symbol = symbol
+        self.open_time = open_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.open_time)
+
+
+def save_klines(directory, klines: Klines):
+    """Writes one symbol's columns to <directory>/<symbol>/<column>.npy."""
+    path = os.path.join(directory, klines.symbol)
+    os.makedirs(path, exist_ok=True)
+    for column in KLINE_COLUMNS:
+        np.save(os.path.join(path, f"{column}.npy"), np.asarray(getattr(klines, column), dtype=KLINE_DTYPES[column]))
+
+
+def load_klines(directory, symbols=None):
+    """
+    Memory-maps kline columns written by save_klines.
+    :param symbols: Symbols to load (default: every subdirectory)
+    :return: {symbol: Klines}
+    """
+    if symbols is None:
+        symbols = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    result = {}
+    for symbol in symbols:
+        path = os.path.join(directory, symbol)
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-index overhead
+        result[symbol] = Klines(symbol, *(np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r").view(np.ndarray)
+                                          for c in KLINE_COLUMNS))
+    return result
+
+
+def store_klines(store, interval="1m", symbols=None, start=None, end=None):
+    """
+    Klines downloaded into a market_store.MarketStore by `main.py fetch`.
+    Ranges inside one sealed chunk stay memory-mapped; longer ones are concatenated.
+    :param store: MarketStore, or the path of one
+    :param symbols: Symbols to load (default: every symbol stored for the interval)
+    :param start: First open time in ms (default: the first stored bar)
+    :param end: End open time in ms, exclusive (default: after the last stored bar)
+    :return: {symbol: Klines}, skipping symbols without bars in the range
+    """
+    from market_store import MarketStore, klines_dataset
+    store = MarketStore(store) if isinstance(store, str) else store
+    dataset = klines_dataset(interval)
+    result = {}
+    for symbol in symbols if symbols is not None else store.symbols(dataset):
+        columns = store.read(dataset, symbol, start, end, columns=list(KLINE_COLUMNS))
+        if len(columns["open_time"]):
+            result[symbol] = Klines(symbol, *(columns[c] for c in KLINE_COLUMNS))
+    return result
+
+
+def generate_klines(symbol, bars, start_time=1672531200000, interval_ms=60000, start_price=100.0,
+                    volatility=0.001, seed=None):
+    """Random-walk klines for demos and benchmarks."""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, bars)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.gamma(2.0, 50.0, bars)
+    open_time = start_time + interval_ms * np.arange(bars, dtype=np.int64)
+    return Klines(symbol, open_time, open_, high, low, close, volume)
+
+
+def _first_bar(values, start, threshold, above):
+    """Index of the first bar at or after `start` where values >= threshold (above) or <= threshold."""
+    n = len(values)
+    chunk = SCAN_CHUNK
+    while start < n:
+        end = min(n, start + chunk)
+        window = values[start:end]
+        hits = window >= threshold if above else window <= threshold
+        i = int(hits.argmax())
+        if hits[i]:
+            return start + i
+        start = end
+        chunk *= 2
+    return None
+
+
+def _fmt(value):
+    return f"{value:.8f}".rstrip("0").rstrip(".") or "0"
+
+
+def _api_error(code, msg, status_code=400):
+    return BinanceAPIException(None, status_code, json.dumps({"code": code, "msg": msg}))
+
+
+class _SimOrder:
+    __slots__ = ("order_id", "client_order_id", "symbol", "side", "type", "quantity", "price", "stop_price",
+                 "time_in_force", "reduce_only", "status", "executed_qty", "avg_price", "time", "update_time", "algo")
+
+    def to_dict(self):
+        order = {
+            "orderId": self.order_id,
+            "symbol": self.symbol,
+            "status": self.status,
+            "clientOrderId": self.client_order_id,
+            "price": _fmt(self.price),
+            "avgPrice": _fmt(self.avg_price),
+            "origQty": _fmt(self.quantity),
+            "executedQty": _fmt(self.executed_qty),
+            "cumQuote": _fmt(self.executed_qty * self.avg_price),
+            "timeInForce": self.time_in_force,
+            "type": self.type,
+            "reduceOnly": self.reduce_only,
+            "side": "BUY" if self.side > 0 else "SELL",
+            "stopPrice": _fmt(self.stop_price),
+            "positionSide": "BOTH",
+            "time": self.time,
+            "updateTime": self.update_time,
+        }
+        if self.algo: # Placed through the algo endpoint: echo its identifiers too
+            order["algoId"] = self.order_id
+            order["clientAlgoId"] = self.client_order_id
+        return order
+
+
+class SimulatedExchange:
+    def __init__(self, klines, balance=10000.0, asset="USDT", leverage=20, maker_fee=0.0002, taker_fee=0.0004,
+                 maintenance_margin_rate=0.004, slippage=0.0, margin_check_interval=60, exchange_info=None,
+                 book_spread=0.0002):
+        """
+        :param klines: {symbol: Klines}, e.g. from load_klines()
+        :param balance: Starting wallet balance in `asset`
+        :param leverage: Default leverage per symbol
+        :param maker_fee: Fee rate for resting LIMIT fills
+        :param taker_fee: Fee rate for MARKET, STOP and immediately marketable LIMIT fills
+        :param maintenance_margin_rate: Maintenance margin as a fraction of position notional
+        :param slippage: Fractional price penalty on MARKET and STOP_MARKET fills
+        :param margin_check_interval: Bars between full cross-margin liquidation re-checks
+        :param exchange_info: Optional exchangeInfo "symbols" entries (filters) served to SymbolRules
+        :param book_spread: Fractional bid/ask spread of the one-level book futures_order_book serves
+        """
+        if not klines:
+            raise ValueError("SimulatedExchange needs klines for at least one symbol")
+        self.klines = klines
+        self.symbols = sorted(klines)
+        self.asset = asset
+        self.default_leverage = leverage
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.slippage = slippage
+        self.margin_check_interval = margin_check_interval
+        self.exchange_info = exchange_info
+        self.book_spread = book_spread
+
+        first = klines[self.symbols[0]].open_time
+        self.aligned = all(len(k) == len(first) and np.array_equal(k.open_time, first) for k in klines.values())
+        self.timeline = first if self.aligned else np.unique(np.concatenate([k.open_time for k in klines.values()]))
+        self.step = 0
+        self.time = int(self.timeline[0])
+
+        self.initial_balance = float(balance)
+        self.wallet = float(balance)
+        self.realized_pnl = 0.0
+        self.fees_paid = 0.0
+        self.fill_count = 0
+        self.liquidations = 0
+        self.leverage = {}
+        self.positions = {} # symbol -> [signed qty, entry price]
+        self.orders = {} # orderId -> _SimOrder
+        self.client_ids = {} # clientOrderId -> orderId
+        self.open_orders = {} # symbol -> {orderId: _SimOrder}
+        self._events = [] # heap of (bar open time, seq, kind, key, bar index)
+        self._seq = 0
+        self._next_order_id = 1
+        self._liq_generation = 0
+        self._next_margin_check = margin_check_interval
+        self._marks = {} # symbol -> close at the current clock
+        self._order_margin = {} # symbol -> initial margin of its open orders (dropped when it changes)
+
+    # --- Clock and market data ---
+    def __len__(self):
+        return len(self.timeline)
+
+    def index(self, symbol):
+        """Index of the symbol's last closed bar (-1 before its first bar)."""
+        if self.aligned:
+            return self.step
+        return int(np.searchsorted(self.klines[symbol].open_time, self.time, side="right")) - 1
+
+    def mark_price(self, symbol):
+        mark = self._marks.get(symbol)
+        if mark is None:
+            mark = self._marks[symbol] = float(self.klines[symbol].close[self.index(symbol)])
+        return mark
+
+    def history(self, symbol, bars, column="close"):
+        """The last `bars` values of a kline column up to the current bar (a view, no copy)."""
+        end = self.index(symbol) + 1
+        return getattr(self.klines[symbol], column)[max(0, end - bars):end]
+
+    def advance_to(self, step):
+        """Moves the clock to the close of timeline[step], applying every fill and liquidation on the way."""
+        while True:
+            check = min(step, self._next_margin_check)
+            self._drain(int(self.timeline[check]))
+            self._set_clock(check, int(self.timeline[check]))
+            if check < self._next_margin_check:
+                break
+            self._next_margin_check = check + self.margin_check_interval
+            if self.positions:
+                self._schedule_liquidations()
+            if check == step:
+                break
+
+    def _set_clock(self, step, event_time):
+        if step != self.step or event_time != self.time:
+            self._marks.clear()
+        self.step = step
+        self.time = event_time
+
+    def _drain(self, target):
+        while self._events and self._events[0][0] <= target:
+            event_time, _, kind, key, bar = heapq.heappop(self._events)
+            if kind == "order":
+                order = self.orders[key]
+                if order.status not in OPEN_STATUSES:
+                    continue # Cancelled or filled since it was queued
+                self._set_clock(bar if self.aligned else self.step, event_time)
+                self._fill_resting(order, bar, event_time)
+            elif key[0] == self._liq_generation and key[1] in self.positions:
+                self._set_clock(bar if self.aligned else self.step, event_time)
+                self._check_liquidation(key[1], bar, event_time)
+
+    # --- Account maths ---
+    def _leverage(self, symbol):
+        return self.leverage.get(symbol, self.default_leverage)
+
+    def _increasing_qty(self, symbol, signed_qty):
+        """Part of an order that opens or adds to exposure (the rest only reduces the position)."""
+        position = self.positions.get(symbol)
+        if position is None or position[0] * signed_qty > 0:
+            return abs(signed_qty)
+        return max(0.0, abs(signed_qty) - abs(position[0]))
+
+    def account(self):
+        """(unrealized PnL, position initial margin, open-order initial margin, maintenance margin)."""
+        unrealized = position_margin = maintenance = 0.0
+        for symbol, (qty, entry) in self.positions.items():
+            mark = self.mark_price(symbol)
+            unrealized += qty * (mark - entry)
+            position_margin += abs(qty) * mark / self._leverage(symbol)
+            maintenance += abs(qty) * mark * self.maintenance_margin_rate
+        order_margin = 0.0
+        for symbol, orders in self.open_orders.items():
+            margin = self._order_margin.get(symbol)
+            if margin is None:
+                margin = self._order_margin[symbol] = sum(
+                    self._increasing_qty(symbol, o.side * o.quantity) * (o.price or o.stop_price)
+                    for o in orders.values() if not o.reduce_only) / self._leverage(symbol)
+            order_margin += margin
+        return unrealized, position_margin, order_margin, maintenance
+
+    def available_balance(self):
+        unrealized, position_margin, order_margin, _ = self.account()
+        return self.wallet + unrealized - position_margin - order_margin
+
+    def equity(self):
+        return self.wallet + sum(qty * (self.mark_price(s) - entry) for s, (qty, entry) in self.positions.items())
+
+    # --- Matching ---
+    def _new_order(self, symbol, side, order_type, quantity, price, stop_price, time_in_force, reduce_only,
+                   client_order_id, algo=False):
+        order = _SimOrder()
+        order.order_id = self._next_order_id
+        self._next_order_id += 1
+        order.client_order_id = client_order_id or f"sim_{order.order_id}"
+        order.symbol = symbol
+        order.side = side
+        order.type = order_type
+        order.quantity = quantity
+        order.price = price
+        order.stop_price = stop_price
+        order.time_in_force = time_in_force
+        order.reduce_only = reduce_only
+        order.status = "NEW"
+        order.executed_qty = 0.0
+        order.avg_price = 0.0
+        order.time = order.update_time = self.time
+        order.algo = algo
+        return order
+
+    def _schedule_order(self, order, start):
+        """Queues the first bar at or after `start` in which a resting order fills (if any)."""
+        k = self.klines[order.symbol]
+        buy = order.side > 0
+        if order.type == "LIMIT":
+            bar = _first_bar(k.low if buy else k.high, start, order.price, above=not buy)
+        else:
+            bar = _first_bar(k.high if buy else k.low, start, order.stop_price, above=buy)
+            if bar is not None and order.type == "STOP":
+                bar = _first_bar(k.low if buy else k.high, bar, order.price, above=not buy)
+        if bar is not None:
+            self._seq += 1
+            heapq.heappush(self._events, (int(k.open_time[bar]), self._seq, "order", order.order_id, bar))
+
+    def _fill_resting(self, order, bar, event_time):
+        k = self.klines[order.symbol]
+        bar_open = float(k.open[bar])
+        buy = order.side > 0
+        if order.type == "LIMIT":
+            price, fee_rate = (min(order.price, bar_open) if buy else max(order.price, bar_open)), self.maker_fee
+        elif order.type == "STOP_MARKET":
+            start = max(order.stop_price, bar_open) if buy else min(order.stop_price, bar_open)
+            price, fee_rate = start * (1 + self.slippage * order.side), self.taker_fee
+        else:
+            # Triggered in this bar: the limit becomes live at the stop (or the gap open);
+            # triggered earlier: it rested and fills like a LIMIT
+            triggered_here = (float(k.high[bar]) >= order.stop_price) if buy else (float(k.low[bar]) <= order.stop_price)
+            reference = (max(order.stop_price, bar_open) if buy else min(order.stop_price, bar_open)) \
+                if triggered_here else bar_open
+            price = min(order.price, reference) if buy else max(order.price, reference)
+            fee_rate = self.taker_fee
+        self._execute(order, price, fee_rate, event_time)
+
+    def _execute(self, order, price, fee_rate, event_time):
+        symbol = order.symbol
+        quantity = order.quantity
+        position = self.positions.get(symbol)
+        if order.reduce_only:
+            if position is None or position[0] * order.side > 0:
+                self._close_order(order, "EXPIRED", event_time)
+                return
+            quantity = min(quantity, abs(position[0]))
+        realized = 0.0
+        signed = order.side * quantity
+        if position is None:
+            self.positions[symbol] = [signed, price]
+        elif position[0] * signed > 0:
+            total = position[0] + signed
+            position[1] = (position[0] * position[1] + signed * price) / total
+            position[0] = total
+        else:
+            closed = min(abs(position[0]), quantity)
+            realized = closed * (price - position[1]) * (1 if position[0] > 0 else -1)
+            remaining = position[0] + signed
+            if abs(remaining) <= 1e-12:
+                del self.positions[symbol]
+            else:
+                if remaining * position[0] < 0: # Flipped sides; the rest opens at the fill price
+                    position[1] = price
+                position[0] = remaining
+        fee = quantity * price * fee_rate
+        self.wallet += realized - fee
+        self.realized_pnl += realized
+        self.fees_paid += fee
+        self.fill_count += 1
+        order.executed_qty = quantity
+        order.avg_price = price
+        self._close_order(order, "FILLED", event_time)
+        self._schedule_liquidations()
+
+    def _close_order(self, order, status, event_time):
+        order.status = status
+        order.update_time = event_time
+        self.open_orders.get(order.symbol, {}).pop(order.order_id, None)
+        self._order_margin.pop(order.symbol, None) # Also covers the position change of a fill
+
+    # --- Liquidation ---
+    def _liquidation_price(self, symbol, unrealized, maintenance):
+        """Price at which equity meets maintenance margin, holding the other positions at their marks."""
+        qty, entry = self.positions[symbol]
+        mark = self.mark_price(symbol)
+        others_upnl = unrealized - qty * (mark - entry)
+        others_maintenance = maintenance - abs(qty) * mark * self.maintenance_margin_rate
+        return (others_maintenance + qty * entry - self.wallet - others_upnl) / (
+            qty - abs(qty) * self.maintenance_margin_rate)
+
+    def _schedule_liquidations(self):
+        """
+        Queues, per position, the first bar (up to the next periodic margin check)
+        whose adverse extreme reaches its liquidation price. Stale schedules are
+        dropped by generation and events are re-verified before liquidating.
+        """
+        self._liq_generation += 1
+        if not self.positions:
+            return
+        unrealized, _, _, maintenance = self.account()
+        for symbol, (qty, _) in self.positions.items():
+            liq_price = self._liquidation_price(symbol, unrealized, maintenance)
+            k = self.klines[symbol]
+            start = self.index(symbol) + 1
+            end = start + self.margin_check_interval
+            hits = k.low[start:end] <= liq_price if qty > 0 else k.high[start:end] >= liq_price
+            if len(hits) and hits.any():
+                bar = start + int(hits.argmax())
+                self._seq += 1
+                heapq.heappush(self._events, (int(k.open_time[bar]), self._seq, "liquidation",
+                                              (self._liq_generation, symbol), bar))
+
+    def _check_liquidation(self, symbol, bar, event_time):
+        k = self.klines[symbol]
+        qty = self.positions[symbol][0]
+        unrealized, _, _, maintenance = self.account() # Marks for `symbol` are this bar's close
+        liq_price = self._liquidation_price(symbol, unrealized, maintenance)
+        bar_open = float(k.open[bar])
+        if qty > 0:
+            hit = float(k.low[bar]) <= liq_price
+            price = min(liq_price, bar_open)
+        else:
+            hit = float(k.high[bar]) >= liq_price
+            price = max(liq_price, bar_open)
+        if not hit:
+            self._schedule_liquidations()
+            return
+        log.warning(f"Backtest liquidation at {event_time}: {symbol} reached {price:.8g} "
+                    f"(liquidation price {liq_price:.8g}), closing all positions")
+        for s, (q, e) in list(self.positions.items()):
+            realized = q * ((price if s == symbol else self.mark_price(s)) - e)
+            self.wallet += realized
+            self.realized_pnl += realized
+        self.wallet = max(0.0, self.wallet) # The insurance fund covers anything beyond the wallet
+        self.positions.clear()
+        self._order_margin.clear()
+        for orders in self.open_orders.values():
+            for order in list(orders.values()):
+                self._close_order(order, "CANCELED", event_time)
+        self.liquidations += 1
+        self._liq_generation += 1
+
+    # --- Client API (the python-binance futures_* methods BasicBot calls) ---
+    def futures_ping(self):
+        return {}
+
+    def futures_exchange_info(self):
+        if self.exchange_info is not None:
+            return {"symbols": self.exchange_info}
+        return {"symbols": [{"symbol": s, "filters": []} for s in self.symbols]}
+
+    def futures_create_order(self, symbol, side, type, quantity, price=None, stopPrice=None, timeInForce=None,
+                             reduceOnly=False, newClientOrderId=None, clientAlgoId=None, **kwargs):
+        if symbol not in self.klines or self.index(symbol) < 0:
+            raise _api_error(-1121, "Invalid symbol.")
+        if side not in ("BUY", "SELL"):
+            raise _api_error(-1102, "Mandatory parameter 'side' was not sent, was empty/null, or malformed.")
+        if type not in ("MARKET", "LIMIT", "STOP", "STOP_MARKET"):
+            raise _api_error(-1116, "Invalid orderType.")
+        # python-binance sends conditional types to the algo endpoint, which takes clientAlgoId instead
+        client_order_id = newClientOrderId or clientAlgoId
+        if client_order_id and client_order_id in self.client_ids:
+            raise _api_error(-4116, "ClientOrderId is duplicated.")
+        quantity = float(quantity)
+        price = float(price) if price is not None else 0.0
+        stop_price = float(stopPrice) if stopPrice is not None else 0.0
+        reduce_only = str(reduceOnly).lower() == "true"
+        if quantity <= 0:
+            raise _api_error(-4003, "Quantity less than or equal to zero.")
+        if type in ("LIMIT", "STOP") and price <= 0:
+            raise _api_error(-1102, "Mandatory parameter 'price' was not sent, was empty/null, or malformed.")
+        if type in ("STOP", "STOP_MARKET") and stop_price <= 0:
+            raise _api_error(-1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+
+        signed_side = 1 if side == "BUY" else -1
+        mark = self.mark_price(symbol)
+        if type in ("STOP", "STOP_MARKET") and (stop_price - mark) * signed_side <= 0:
+            raise _api_error(-2021, "Order would immediately trigger.")
+        marketable = type == "MARKET" or (type == "LIMIT" and (price - mark) * signed_side >= 0)
+        if type == "MARKET":
+            fill_price = mark * (1 + self.slippage * signed_side)
+        else: # A marketable LIMIT takes the current price, never worse than its limit
+            fill_price = min(price, mark) if signed_side > 0 else max(price, mark)
+        margin_price = fill_price if marketable else (price or stop_price)
+        if not reduce_only:
+            required = self._increasing_qty(symbol, signed_side * quantity) * margin_price / self._leverage(symbol)
+            if marketable:
+                required += quantity * fill_price * self.taker_fee
+            if required > self.available_balance():
+                raise _api_error(-2019, "Margin is insufficient.")
+
+        order = self._new_order(symbol, signed_side, type, quantity, price, stop_price,
+                                timeInForce or "GTC", reduce_only, client_order_id, algo=clientAlgoId is not None)
+        self.orders[order.order_id] = order
+        self.client_ids[order.client_order_id] = order.order_id
+        if marketable:
+            self._execute(order, fill_price, self.taker_fee, self.time)
+        else:
+            self.open_orders.setdefault(symbol, {})[order.order_id] = order
+            self._order_margin.pop(symbol, None)
+            self._schedule_order(order, self.index(symbol) + 1)
+        return order.to_dict()
+
+    def _find_order(self, symbol, orderId=None, origClientOrderId=None, clientAlgoId=None):
+        if orderId is None:
+            orderId = self.client_ids.get(origClientOrderId or clientAlgoId)
+        order = self.orders.get(int(orderId)) if orderId is not None else None
+        return order if order is not None and order.symbol == symbol else None
+
+    def futures_get_order(self, symbol, orderId=None, origClientOrderId=None, clientAlgoId=None, **kwargs):
+        order = self._find_order(symbol, orderId, origClientOrderId, clientAlgoId)
+        if order is None:
+            raise _api_error(-2013, "Order does not exist.")
+        return order.to_dict()
+
+    def futures_cancel_order(self, symbol, orderId=None, origClientOrderId=None, clientAlgoId=None, **kwargs):
+        order = self._find_order(symbol, orderId, origClientOrderId, clientAlgoId)
+        if order is None or order.status not in OPEN_STATUSES:
+            raise _api_error(-2011, "Unknown order sent.")
+        self._close_order(order, "CANCELED", self.time)
+        return order.to_dict()
+
+    def futures_get_open_orders(self, symbol=None, **kwargs):
+        if symbol:
+            return [o.to_dict() for o in self.open_orders.get(symbol, {}).values()]
+        return [o.to_dict() for orders in self.open_orders.values() for o in orders.values()]
+
+    def futures_place_batch_order(self, batchOrders, **kwargs):
+        results = []
+        for params in batchOrders:
+            try:
+                results.append(self.futures_create_order(**params))
+            except BinanceAPIException as e:
+                results.append({"code": e.code, "msg": e.message})
+        return results
+
+    def futures_cancel_orders(self, symbol, orderidlist=(), **kwargs):
+        results = []
+        for order_id in orderidlist:
+            try:
+                results.append(self.futures_cancel_order(symbol=symbol, orderId=order_id))
+            except BinanceAPIException as e:
+                results.append({"code": e.code, "msg": e.message})
+        return results
+
+    def futures_cancel_all_open_orders(self, symbol, **kwargs):
+        for order in list(self.open_orders.get(symbol, {}).values()):
+            self._close_order(order, "CANCELED", self.time)
+        return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    def futures_account_balance(self, **kwargs):
+        unrealized, position_margin, order_margin, _ = self.account()
+        available = self.wallet + unrealized - position_margin - order_margin
+        return [{
+            "accountAlias": "SIM",
+            "asset": self.asset,
+            "balance": _fmt(self.wallet),
+            "crossWalletBalance": _fmt(self.wallet),
+            "crossUnPnl": _fmt(unrealized),
+            "availableBalance": _fmt(available),
+            "maxWithdrawAmount": _fmt(max(0.0, min(self.wallet, available))),
+            "marginAvailable": True,
+            "updateTime": self.time,
+        }]
+
+    def futures_position_information(self, symbol=None, **kwargs):
+        result = []
+        for s in ([symbol] if symbol else self.symbols):
+            qty, entry = self.positions.get(s, (0.0, 0.0))
+            mark = self.mark_price(s)
+            result.append({
+                "symbol": s,
+                "positionAmt": _fmt(qty),
+                "entryPrice": _fmt(entry),
+                "markPrice": _fmt(mark),
+                "unRealizedProfit": _fmt(qty * (mark - entry)),
+                "leverage": str(self._leverage(s)),
+                "marginType": "cross",
+                "positionSide": "BOTH",
+                "updateTime": self.time,
+            })
+        return result
+
+    def futures_mark_price(self, symbol, **kwargs):
+        if symbol not in self.klines or self.index(symbol) < 0:
+            raise _api_error(-1121, "Invalid symbol.")
+        return {"symbol": symbol, "markPrice": _fmt(self.mark_price(symbol)), "time": self.time}
+
+    def futures_order_book(self, symbol, limit=500, **kwargs):
+        # One level per side around the current close, sized by the bar's volume
+        if symbol not in self.klines or self.index(symbol) < 0:
+            raise _api_error(-1121, "Invalid symbol.")
+        mark = self.mark_price(symbol)
+        volume = _fmt(float(self.klines[symbol].volume[self.index(symbol)]))
+        half = mark * self.book_spread / 2
+        return {"lastUpdateId": self.time, "E": self.time, "T": self.time,
+                "bids": [[_fmt(mark - half), volume]], "asks": [[_fmt(mark + half), volume]]}
+
+    def futures_klines(self, symbol, interval="1m", startTime=None, endTime=None, limit=500, **kwargs):
+        # Serves the stored bars whatever `interval` asks for, and never bars after the clock
+        if symbol not in self.klines:
+            raise _api_error(-1121, "Invalid symbol.")
+        k = self.klines[symbol]
+        end = self.index(symbol) + 1
+        if endTime is not None:
+            end = min(end, int(np.searchsorted(k.open_time, int(endTime), side="right")))
+        begin = int(np.searchsorted(k.open_time, int(startTime))) if startTime is not None else max(end - int(limit), 0)
+        end = min(end, begin + int(limit))
+        step = int(k.open_time[1] - k.open_time[0]) if len(k) > 1 else 60000
+        return [[int(t), _fmt(o), _fmt(h), _fmt(l), _fmt(c), _fmt(v), int(t) + step - 1, _fmt(v * c), 0, "0", "0", "0"]
+                for t, o, h, l, c, v in zip(k.open_time[begin:end].tolist(), k.open[begin:end].tolist(),
+                                            k.high[begin:end].tolist(), k.low[begin:end].tolist(),
+                                            k.close[begin:end].tolist(), k.volume[begin:end].tolist())]
+
+    def futures_change_leverage(self, symbol, leverage, **kwargs):
+        leverage = int(leverage)
+        if symbol not in self.klines:
+            raise _api_error(-1121, "Invalid symbol.")
+        if not 1 <= leverage <= MAX_LEVERAGE:
+            raise _api_error(-4028, f"Leverage {leverage} is not valid")
+        self.leverage[symbol] = leverage
+        self._order_margin.pop(symbol, None)
+        self._schedule_liquidations()
+        return {"symbol": symbol, "leverage": leverage, "maxNotionalValue": "INF"}
+
+
+def backtest_bot(exchange, validate_orders=True, **kwargs):
+    """BasicBot wired to a SimulatedExchange (no rate limiting, metrics or risk gate; rules from the exchange)."""
+    from basic_bot import BasicBot
+    kwargs.setdefault("rate_limit", False)
+    kwargs.setdefault("metrics", False)
+    kwargs.setdefault("risk", False) # Price ages are wall-clock; replayed bars move much faster
+    return BasicBot(None, None, client=exchange, validate_orders=validate_orders, **kwargs)
+
+
+def run_backtest(exchange, strategy, bot=None, every=1, start=0, stop=None):
+    """
+    Replays the exchange's timeline, calling strategy(bot, exchange) at the close of every `every`-th bar.
+    :return: Summary dict, including the equity curve sampled at each strategy call
+    """
+    bot = bot or backtest_bot(exchange)
+    stop = len(exchange) if stop is None else min(stop, len(exchange))
+    equity = []
+    began = time.perf_counter()
+    for step in range(start, stop, every):
+        exchange.advance_to(step)
+        strategy(bot, exchange)
+        equity.append(exchange.equity())
+    if stop > start:
+        exchange.advance_to(stop - 1)
+    elapsed = time.perf_counter() - began
+    curve = np.asarray(equity)
+    peak = np.maximum.accumulate(curve) if len(curve) else curve
+    drawdown = float(((peak - curve) / np.where(peak > 0, peak, 1)).max()) if len(curve) else 0.0
+    final_equity = exchange.equity()
+    return {
+        "bars": (stop - start) * len(exchange.symbols),
+        "strategy_calls": len(equity),
+        "elapsed_seconds": elapsed,
+        "initial_balance": exchange.initial_balance,
+        "final_equity": final_equity,
+        "return_pct": (final_equity / exchange.initial_balance - 1) * 100,
+        "realized_pnl": exchange.realized_pnl,
+        "fees": exchange.fees_paid,
+        "fills": exchange.fill_count,
+        "liquidations": exchange.liquidations,
+        "max_drawdown_pct": drawdown * 100,
+        "equity_curve": curve,
+    }
+
+
+def band_strategy(band=0.01, notional=200.0, take_profit=0.01, stop_loss=0.02):
+    """
+    Demo strategy: while flat, rests a BUY limit `band` below the close; once
+    long, rests a take-profit SELL limit and exits at market below the stop.
+    """
+    def strategy(bot, exchange):
+        for symbol in exchange.symbols:
+            close = exchange.mark_price(symbol)
+            position = exchange.positions.get(symbol)
+            if position is None:
+                if exchange.open_orders.get(symbol):
+                    bot.cancel_all_orders(symbol)
+                bot.place_limit_order(symbol, "BUY", round(notional / close, 6), round(close * (1 - band), 4))
+                continue
+            qty, entry = position
+            if close <= entry * (1 - stop_loss):
+                bot.cancel_all_orders(symbol)
+                bot.place_market_order(symbol, "SELL", qty)
+            elif not exchange.open_orders.get(symbol):
+                bot.place_limit_order(symbol, "SELL", qty, round(entry * (1 + take_profit), 4))
+    return strategy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the demo band strategy over memory-mapped klines")
+    parser.add_argument('data', type=str, help='Kline directory (<data>/<SYMBOL>/<column>.npy)')
+    parser.add_argument('--store', action='store_true', help='The directory is a market store filled by main.py fetch')
+    parser.add_argument('--interval', type=str, default='1m', help='Kline interval to replay from a store (default: 1m)')
+    parser.add_argument('--generate', type=int, default=0, metavar='N',
+                        help='First write N synthetic symbols into the directory')
+    parser.add_argument('--bars', type=int, default=525600, help='Bars per generated symbol (default: 1y of 1m)')
+    parser.add_argument('--every', type=int, default=60, help='Call the strategy every N bars')
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--leverage', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.generate:
+        for i in range(args.generate):
+            save_klines(args.data, generate_klines(f"SYM{i:02d}USDT", args.bars, start_price=10.0 + i, seed=i))
+    log.setLevel(logging.WARNING) # Per-order INFO logs would dominate the replay
+    klines = store_klines(args.data, args.interval) if args.store else load_klines(args.data)
+    exchange = SimulatedExchange(klines, balance=args.balance, leverage=args.leverage)
+    summary = run_backtest(exchange, band_strategy(), every=args.every)
+    summary.pop("equity_curve")
+    print(json.dumps(summary, indent=2))
@@ -1,31 +1,135 @@
 # basic_bot.py
+import itertools
+import threading
+import time
+
 from binance.client import Client
 from binance.enums import *
 from binance.exceptions import BinanceAPIException, BinanceOrderException
+from ledger import LEDGER_SNAPSHOT_PATH, RECONCILE_INTERVAL, SNAPSHOT_INTERVAL, LedgerSync, PositionLedger
 from logger_setup import log # Use our configured logger
+from market_data import FUTURES_TESTNET_MARKET_STREAM_URL, MarketData, MarketDataStream, OrderBook
+from metrics import Metrics, TimingHTTPAdapter, connect_seconds, reset_connect_seconds
+from order_journal import DEFAULT_JOURNAL_PATH, MISSING, REJECTED, UNKNOWN, JournalError, OrderJournal, account_owner
+from rate_limiter import REQUEST_WEIGHT, RequestScheduler, endpoint_cost
+from risk import DEFAULT_LIMITS_PATH, KILL_SWITCH_PATH, RiskEngine, load_limits
+from symbol_rules import DEFAULT_CACHE_PATH, OrderValidationError, SymbolRules
+from user_stream import FUTURES_TESTNET_STREAM_URL, OrderStateCache, UserDataStream
+
+FUTURES_TESTNET_API_URL = 'https://testnet.binancefuture.com/fapi'
+BATCH_ORDER_LIMIT = 5 # Max orders per POST /fapi/v1/batchOrders
+BATCH_CANCEL_LIMIT = 10 # Max order IDs per DELETE /fapi/v1/batchOrders
+BOOK_PRICE_MODES = ("join", "improve", "mid", "cross")
+BOOK_SNAPSHOT_LIMIT = 50 # Levels fetched for one-off REST pricing (lowest weight tier)
+ORDER_RETRIES = 3 # Extra attempts for an order whose outcome is unknown or that was throttled
+RETRY_BACKOFF = 0.5 # Seconds before the first retry; doubles on every further one
+RETRY_BACKOFF_MAX = 8.0
+UNKNOWN_OUTCOME_CODES = (-1000, -1001, -1006, -1007) # Unknown error, disconnected, unexpected response, timeout
+THROTTLED_CODES = (-1003, -1015) # Too many requests / orders: rejected before it was placed
+DUPLICATE_CLIENT_ID_CODES = (-4116, -4015) # ClientOrderId is duplicated / not valid
+ORDER_NOT_FOUND_CODE = -2013
+RECONCILE_GRACE = 15.0 # Younger unresolved entries may still be in flight in another process
+# Client methods whose responses are orders (or lists of orders) worth caching
+ORDER_RESPONSE_ENDPOINTS = (
+    "futures_create_order", "futures_cancel_order", "futures_get_order",
+    "futures_get_open_orders", "futures_place_batch_order", "futures_cancel_orders",
+)
 
 class BasicBot:
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, futures_url=FUTURES_TESTNET_API_URL, scheduler=None, rate_limit=True,
+                 validate_orders=True, metrics=True, client=None, journal=True, order_retries=ORDER_RETRIES,
+                 retry_backoff=RETRY_BACKOFF, ledger=True, risk=True):
         """
         Initializes the BasicBot with API credentials.
         The python-binance Client will use the testnet.binancefuture.com
         endpoints for its futures_* methods if the API keys were generated
         on the Futures Testnet.
+        :param futures_url: Futures REST base URL (override to point at a local stub exchange)
+        :param scheduler: RequestScheduler every API call goes through (default: exchange limits)
+        :param rate_limit: Set to False to send requests without client-side pacing
+        :param validate_orders: Round and check orders against cached symbol filters before sending
+        :param metrics: Keep per-endpoint latency/error/weight metrics (see get_stats)
+        :param client: Object to use instead of a python-binance Client, exposing the same
+                       futures_* methods (e.g. backtest.SimulatedExchange); credentials are then unused
+        :param journal: Journal every order before sending it (see order_journal.py): True for
+                        DEFAULT_JOURNAL_PATH (not with an injected client), a path, or False
+        :param order_retries: Extra attempts for an order whose outcome is unknown (timeout, 5xx)
+                              or that was throttled; the client order ID is looked up before each
+        :param retry_backoff: Seconds before the first retry, doubling on every further one
+        :param ledger: Keep a position/PnL ledger from the fills seen (see ledger.py): True for one
+                       snapshotted to LEDGER_SNAPSHOT_PATH (in memory only with an injected client),
+                       a snapshot path, or False
+        :param risk: Check every order against pre-trade limits first (see risk.py): True for
+                     limits from DEFAULT_LIMITS_PATH if it exists (built-in limits with an
+                     injected client), a limits file path, a RiskEngine, or False
         """
+        self.scheduler = (scheduler or RequestScheduler()) if rate_limit else None
+        self.metrics = Metrics() if metrics else None
+        self.symbol_rules = (
+            SymbolRules(lambda: self._call("futures_exchange_info"), source=futures_url,
+                        path=DEFAULT_CACHE_PATH if client is None else None) if validate_orders else None)
+        self.order_cache = None # Set by start_user_stream()
+        self.user_stream = None
+        self.market_data = None # Set by start_market_data()
+        self.market_stream = None
+        self.order_retries = order_retries
+        self.retry_backoff = retry_backoff
+        self.journal = None
+        self._client_ids = itertools.count(1) # Used without a journal
+        self._client_id_prefix = f"tb{int(time.time() * 1000):x}-"
+        self._responses = threading.local() # Last HTTP response of each thread's call (see _call)
+        self.ledger = None
+        self.ledger_sync = None # Set by start_ledger()
+        if ledger:
+            path = ledger if isinstance(ledger, str) else (
+                LEDGER_SNAPSHOT_PATH.format(owner=account_owner(api_key)) if client is None else None)
+            self.ledger = PositionLedger(path, mark_source=self._live_mark)
+        self.risk = None
+        if isinstance(risk, RiskEngine):
+            self.risk = risk
+            if risk.ledger is None:
+                risk.ledger = self.ledger
+        elif risk:
+            limits_path = risk if isinstance(risk, str) else (DEFAULT_LIMITS_PATH if client is None else None)
+            limits, symbol_limits = load_limits(limits_path)
+            self.risk = RiskEngine(limits, symbol_limits, ledger=self.ledger, price_source=self._live_mark,
+                                   kill_switch_path=KILL_SWITCH_PATH if client is None else None)
         try:
-            self.client = Client(api_key, api_secret)
-            # The base URL for futures testnet is automatically handled by python-binance
-            # if the API keys are generated from testnet.binancefuture.com.
-            # We can verify by pinging the server or getting account info.
-            self.client.FUTURES_URL = 'https://testnet.binancefuture.com/fapi' # Explicitly set for clarity/safety
+            if client is not None:
+                self.client = client
+            else:
+                # Skip the client's spot-API ping; connectivity is checked with futures_ping below.
+                self.client = Client(api_key, api_secret, ping=False)
+                # The base URL for futures testnet is automatically handled by python-binance
+                # if the API keys are generated from testnet.binancefuture.com.
+                # We can verify by pinging the server or getting account info.
+                self.client.FUTURES_URL = futures_url # Explicitly set for clarity/safety
+            # client.response is one attribute shared by every thread using the bot; a session hook
+            # hands each call its own response instead
+            session = getattr(self.client, "session", None)
+            if session is not None and hasattr(session, "hooks"):
+                session.hooks.setdefault("response", []).append(self._capture_response)
+                if self.metrics is not None: # Times connection setup apart from the exchange round-trip
+                    session.mount("https://", TimingHTTPAdapter())
+                    session.mount("http://", TimingHTTPAdapter())
             
             # Test connectivity
-            self.client.futures_ping()
-            log.info("Successfully connected to Binance Futures Testnet.")
+            self._call("futures_ping")
+            if client is not None:
+                log.info(f"Using injected client: {type(client).__name__}.")
+            else:
+                log.info("Successfully connected to Binance Futures Testnet.")
             
             # Optional: Set default leverage for a common symbol if needed
             # self.set_leverage("BTCUSDT", 5) 
 
+            if journal is True:
+                journal = DEFAULT_JOURNAL_PATH if client is None else None
+            if journal:
+                self.journal = OrderJournal(journal, owner=account_owner(api_key))
+                if self.journal.unresolved(): # A previous run died or timed out mid-order
+                    self.reconcile_journal()
+
         except BinanceAPIException as e:
             log.error(f"Binance API Exception during initialization: {e}")
             raise
@@ -33,11 +137,214 @@ class BasicBot:
             log.error(f"Error initializing BasicBot: {e}")
             raise
 
+    def _capture_response(self, response, *args, **kwargs):
+        """requests response hook: runs on the thread that sent the request."""
+        self._responses.last = response
+
+    def _call(self, endpoint, **params):
+        """
+        Sends one client call through the rate-limit scheduler, feeds the
+        response's usage headers back into it and records latency metrics.
+        :param endpoint: Name of the python-binance Client futures_* method
+        """
+        start = time.perf_counter()
+        queue_seconds = 0.0
+        costs = None
+        error_status = None
+        self._responses.last = None
+        if self.metrics is not None:
+            reset_connect_seconds()
+        try:
+            if self.scheduler is not None:
+                costs = self.scheduler.acquire(endpoint, params)
+                queue_seconds = time.perf_counter() - start
+            result = getattr(self.client, endpoint)(**params)
+        except BinanceAPIException as e:
+            error_status = e.status_code
+            raise
+        except Exception:
+            error_status = "exception"
+            raise
+        finally:
+            response = getattr(self._responses, "last", None)
+            answered = response is not None # Else the request never got an answer
+            if costs is not None:
+                if answered:
+                    self.scheduler.observe(costs, response.status_code, response.headers)
+                else:
+                    self.scheduler.observe(costs)
+            if self.metrics is not None:
+                weight = (costs if costs is not None else endpoint_cost(endpoint, params)[1]).get(REQUEST_WEIGHT, 0)
+                self.metrics.record(endpoint, time.perf_counter() - start, queue_seconds,
+                                    response.elapsed.total_seconds() if answered else None, weight, error_status,
+                                    connect_seconds())
+        if self.order_cache is not None and endpoint in ORDER_RESPONSE_ENDPOINTS:
+            for order in (result if isinstance(result, list) else [result]):
+                self.order_cache.update_order(order)
+        if self.ledger is not None:
+            if endpoint in ORDER_RESPONSE_ENDPOINTS:
+                created = endpoint in ("futures_create_order", "futures_place_batch_order")
+                for order in (result if isinstance(result, list) else [result]):
+                    self.ledger.apply_order(order, created)
+            elif endpoint == "futures_change_leverage" and result.get("leverage"):
+                self.ledger.set_leverage(params["symbol"], result["leverage"])
+        if self.risk is not None:
+            if endpoint == "futures_get_open_orders":
+                self.risk.load_open_orders(result, params.get("symbol"))
+            elif endpoint in ORDER_RESPONSE_ENDPOINTS:
+                for order in (result if isinstance(result, list) else [result]):
+                    self.risk.apply_order(order)
+            elif endpoint == "futures_cancel_all_open_orders":
+                self.risk.clear_symbol(params["symbol"])
+            elif endpoint == "futures_change_leverage" and result.get("leverage"):
+                self.risk.set_leverage(params["symbol"], result["leverage"], result.get("maxNotionalValue"))
+        return result
+
+    def start_user_stream(self, stream_url=FUTURES_TESTNET_STREAM_URL):
+        """
+        Starts the user-data stream so order status, open orders and balances
+        are served from a local cache instead of REST.
+        :param stream_url: Base websocket URL for the user-data stream
+        """
+        if self.user_stream is None:
+            self.order_cache = OrderStateCache()
+            self.user_stream = UserDataStream(self, self.order_cache, stream_url=stream_url, ledger=self.ledger,
+                                              risk=self.risk)
+            self.user_stream.start()
+            log.info("User data stream started.")
+        return self.order_cache
+
+    def stop_user_stream(self):
+        if self.user_stream is not None:
+            self.user_stream.stop()
+            self.user_stream = None
+            self.order_cache = None
+            log.info("User data stream stopped.")
+
+    def start_market_data(self, symbols, stream_url=FUTURES_TESTNET_MARKET_STREAM_URL):
+        """
+        Starts depth and aggTrade streams for the symbols so order books are
+        kept locally and limit orders can be priced off them.
+        :param symbols: Symbols to stream
+        :param stream_url: Combined-stream websocket URL
+        """
+        if self.market_stream is None:
+            self.market_data = MarketData(symbols)
+            self.market_stream = MarketDataStream(self, self.market_data, stream_url=stream_url)
+            self.market_stream.start()
+            log.info(f"Market data stream started for {len(self.market_data.books)} symbol(s).")
+        return self.market_data
+
+    def stop_market_data(self):
+        if self.market_stream is not None:
+            self.market_stream.stop()
+            self.market_stream = None
+            self.market_data = None
+            log.info("Market data stream stopped.")
+
+    def start_ledger(self, reconcile_interval=RECONCILE_INTERVAL, snapshot_interval=SNAPSHOT_INTERVAL):
+        """
+        Starts snapshotting the ledger and reconciling it against the exchange
+        in the background (the daemon does this; one-off runs save at exit).
+        :param reconcile_interval: Seconds between REST reconciles (None disables them)
+        :param snapshot_interval: Seconds between snapshot saves
+        """
+        if self.ledger is not None and self.ledger_sync is None:
+            self.ledger_sync = LedgerSync(self, self.ledger, reconcile_interval, snapshot_interval).start()
+            log.info(f"Ledger sync started (reconcile every {reconcile_interval} s).")
+        return self.ledger
+
+    def stop_ledger(self):
+        if self.ledger_sync is not None:
+            self.ledger_sync.stop()
+            self.ledger_sync = None
+            log.info("Ledger sync stopped.")
+
+    def reconcile_positions(self):
+        """
+        Reconciles the ledger with futures_position_information and
+        futures_account_balance, logging any drift.
+        :return: Number of drifted symbols/balances, or None on error
+        """
+        if self.ledger is None:
+            return None
+        try:
+            positions = self._call("futures_position_information")
+            balances = self._call("futures_account_balance")
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, "reconciling positions")
+        except Exception as e:
+            log.error(f"Unexpected error reconciling positions: {e}")
+            return None
+        return self.ledger.reconcile(positions, balances)
+
+    def engage_kill_switch(self, reason="manual", cancel_open_orders=True):
+        """
+        Stops every new order at the risk gate until release_kill_switch().
+        :param cancel_open_orders: Also cancel the open orders on every symbol known to have some
+        :return: Symbols whose open orders were cancelled
+        """
+        if self.risk is None:
+            log.error("Kill switch unavailable: pre-trade risk checks are disabled for this bot.")
+            return []
+        self.risk.engage_kill_switch(reason)
+        if not cancel_open_orders:
+            return []
+        return [symbol for symbol in self.risk.open_symbols() if self.cancel_all_orders(symbol)]
+
+    def release_kill_switch(self):
+        if self.risk is not None:
+            self.risk.release_kill_switch()
+
+    def _live_mark(self, symbol):
+        # Mid of the streamed book, when the symbol has one in sync
+        book = self.market_data.book(symbol) if self.market_data is not None else None
+        return book.mid() if book is not None else None
+
+    def _refresh_risk_price(self, symbol):
+        """Gives the risk gate a REST mark price to value a market order with, unless it has a fresh one."""
+        if self.risk is None or self.risk.has_fresh_price(symbol):
+            return
+        try:
+            mark = self._call("futures_mark_price", symbol=symbol)
+            self.risk.set_price(symbol, mark["markPrice"])
+        except Exception as e: # The check then rejects the order with NO_REFERENCE_PRICE
+            log.warning(f"Could not fetch the mark price of {symbol} for the risk check: {e}")
+
+    def _cache_ready(self):
+        return self.order_cache is not None and self.order_cache.synced
+
+    def _apply_symbol_rules(self, params):
+        """
+        Rounds quantity, price and stopPrice in create-order params to the
+        symbol's step/tick size and checks its limits, in place.
+        Raises OrderValidationError if the order can't be made valid.
+        """
+        if self.symbol_rules is None:
+            return params
+        try:
+            filters = self.symbol_rules.get(params["symbol"])
+        except OrderValidationError:
+            raise
+        except Exception as e:
+            log.warning(f"Trading rules unavailable, sending {params['symbol']} order unvalidated: {e}")
+            return params
+        quantity, price, stop_price = filters.normalize(
+            params["side"], params["quantity"], params.get("price"), params.get("stopPrice"),
+            market=params["type"] == ORDER_TYPE_MARKET)
+        params["quantity"] = format(quantity, "f")
+        if price is not None:
+            params["price"] = format(price, "f")
+        if stop_price is not None:
+            params["stopPrice"] = format(stop_price, "f")
+        return params
+
     def _log_request(self, method_name, params):
-        log.debug(f"API Request: {method_name} with params: {params}")
+        # %-style args: the payload is only rendered if DEBUG is enabled, and then off-thread
+        log.debug("API Request: %s with params: %s", method_name, params)
 
     def _log_response(self, method_name, response):
-        log.debug(f"API Response from {method_name}: {response}")
+        log.debug("API Response from %s: %s", method_name, response)
 
     def _handle_api_error(self, e, operation_description):
         log.error(f"Binance API Exception during {operation_description}: {e}")
@@ -46,12 +353,204 @@ class BasicBot:
              log.error(f"Full API Error Response: {e.response.text}")
         return None # Or re-raise specific custom exceptions
 
+    # --- Idempotent order submission ---
+    def _client_order_id(self):
+        if self.journal is not None:
+            return self.journal.next_client_order_id()
+        return f"{self._client_id_prefix}{next(self._client_ids)}"
+
+    @staticmethod
+    def _client_id_key(params):
+        # python-binance sends conditional types (STOP, ...) to the algo endpoint, which takes clientAlgoId
+        return "clientAlgoId" if params.get("type") == FUTURE_ORDER_TYPE_STOP else "newClientOrderId"
+
+    def _journal_order(self, client_id, order):
+        if self.journal is not None and isinstance(order, dict):
+            self.journal.record_order(client_id, order)
+
+    def _journal_status(self, client_id, status, symbol, error=None):
+        if self.journal is not None:
+            self.journal.record_status(client_id, status, symbol, error)
+
+    def _release_risk(self, client_id):
+        if self.risk is not None:
+            self.risk.release(client_id)
+
+    def _lookup_client_order(self, symbol, client_id, params=None):
+        """
+        Asks the exchange for an order by client order ID.
+        :param params: The create-order params it was sent with; the ID field they carry picks the
+                       endpoint (batch STOP orders go out with newClientOrderId, single ones with clientAlgoId)
+        :return: (order, known): the order or None, and whether the answer is certain
+                 (False if the lookup itself failed)
+        """
+        key = "clientAlgoId" if "clientAlgoId" in (params or {}) else "origClientOrderId"
+        try:
+            return self._call("futures_get_order", symbol=symbol, **{key: client_id}), True
+        except BinanceAPIException as e:
+            if e.code == ORDER_NOT_FOUND_CODE:
+                return None, True
+            log.warning(f"Lookup of order {client_id} on {symbol} failed: {e}")
+        except Exception as e:
+            log.warning(f"Lookup of order {client_id} on {symbol} failed: {e}")
+        return None, False
+
+    def _send_order(self, params, label, client_order_id=None):
+        """
+        Sends one create-order request under a client order ID that is
+        journaled before the first attempt. Throttled requests and requests
+        whose outcome is unknown are retried with exponential backoff; before
+        resending after an unknown outcome the exchange is asked for the
+        client ID, so an order that did get through is never placed twice.
+        :param params: Validated create-order params
+        :param label: Order type for log messages ("MARKET", "LIMIT", "STOP-LIMIT")
+        :param client_order_id: Client order ID to use instead of a generated one
+        :return: Order response, a RiskReject if a pre-trade check failed, or None on error
+        """
+        symbol = params["symbol"]
+        client_id = client_order_id or self._client_order_id()
+        params[self._client_id_key(params)] = client_id
+        if params["type"] != FUTURE_ORDER_TYPE_STOP: # The algo endpoint has no response types
+            params["newOrderRespType"] = ORDER_RESP_TYPE_RESULT # Default ACK omits fills the ledger books
+        description = f"placing {label.lower()} order for {symbol}"
+        if self.risk is not None:
+            if not params.get("price"):
+                self._refresh_risk_price(symbol)
+            reject = self.risk.check(symbol, params["side"], float(params["quantity"]),
+                                     float(params["price"]) if params.get("price") else None, client_id)
+            if reject is not None:
+                log.error(f"{label} order rejected by risk check: {reject}")
+                return reject
+        if self.journal is not None:
+            try:
+                self.journal.record_intent(client_id, params)
+            except JournalError as e:
+                self._release_risk(client_id)
+                log.error(f"{label} order not sent, it could not be journaled: {e}")
+                return None
+        self._log_request(f"futures_create_order ({label})", params)
+        unknown = False # Whether an earlier attempt may have placed the order
+        error = None
+        for attempt in range(self.order_retries + 1):
+            if attempt:
+                delay = min(self.retry_backoff * 2 ** (attempt - 1), RETRY_BACKOFF_MAX)
+                log.warning(f"Retrying {label} order {client_id} in {delay:.2f} s "
+                            f"(attempt {attempt + 1}/{self.order_retries + 1}) after: {error}")
+                time.sleep(delay)
+                if unknown:
+                    order, known = self._lookup_client_order(symbol, client_id, params)
+                    if order is not None:
+                        self._journal_order(client_id, order)
+                        log.info(f"{label.title()} order {client_id} was placed by an earlier attempt: {order}")
+                        return order
+                    if not known:
+                        continue # Can't tell whether it exists; resending could double it
+                    unknown = False
+            try:
+                order = self._call("futures_create_order", **params)
+            except BinanceAPIException as e:
+                error = e
+                if e.code in DUPLICATE_CLIENT_ID_CODES and attempt:
+                    unknown = True # An earlier attempt got through after all
+                    continue
+                if e.code in THROTTLED_CODES:
+                    continue
+                if e.status_code >= 500 or e.code in UNKNOWN_OUTCOME_CODES:
+                    unknown = True
+                    continue
+                self._journal_status(client_id, REJECTED, symbol, str(e))
+                self._release_risk(client_id)
+                return self._handle_api_error(e, description)
+            except BinanceOrderException as e: # Refused by the client library; nothing was sent
+                self._journal_status(client_id, REJECTED, symbol, str(e))
+                self._release_risk(client_id)
+                log.error(f"Order error while {description}: {e}")
+                return None
+            except Exception as e: # Timeouts, dropped connections, unreadable responses
+                error = e
+                unknown = True
+                continue
+            self._log_response(f"futures_create_order ({label})", order)
+            self._journal_order(client_id, order)
+            log.info(f"{label.title()} order placed successfully: {order}")
+            return order
+        if unknown:
+            self._journal_status(client_id, UNKNOWN, symbol, str(error))
+            log.error(f"Outcome of {description} is unknown (client order ID {client_id}); "
+                      f"it will be reconciled on the next start. Last error: {error}")
+        else: # An unknown outcome keeps its risk reservation until the order shows up or is found missing
+            self._journal_status(client_id, REJECTED, symbol, str(error))
+            self._release_risk(client_id)
+            log.error(f"Gave up {description} after {self.order_retries + 1} attempt(s): {error}")
+        return None
+
+    def reconcile_journal(self):
+        """
+        Resolves journaled orders whose outcome is unknown (the process died
+        or a request timed out): each is looked up in the open orders, then
+        by client order ID, and what the exchange has is journaled. Orders
+        the exchange has never seen are marked MISSING.
+        Intents younger than RECONCILE_GRACE are left alone, as they may still
+        be in flight in another process sharing the journal.
+        :return: {"placed": n, "missing": n, "unresolved": n}, or None without a journal
+        """
+        if self.journal is None:
+            return None
+        now = time.time()
+        entries = [e for e in self.journal.unresolved() # Skip intents another process may still be sending
+                   if e["status"] == UNKNOWN or now - e["ts"] >= RECONCILE_GRACE]
+        counts = {"placed": 0, "missing": 0, "unresolved": 0}
+        if not entries:
+            return counts
+        log.info(f"Reconciling {len(entries)} journaled order(s) with an unknown outcome.")
+        try:
+            open_orders = {o.get("clientOrderId"): o for o in self._call("futures_get_open_orders")}
+        except Exception as e:
+            log.warning(f"Open orders unavailable for reconcile, looking orders up one by one: {e}")
+            open_orders = {}
+        for entry in entries:
+            client_id, symbol = entry["client_order_id"], entry["symbol"]
+            order = open_orders.get(client_id)
+            known = True
+            if order is None:
+                order, known = self._lookup_client_order(symbol, client_id, entry["params"])
+            if order is not None:
+                self.journal.record_order(client_id, order)
+                counts["placed"] += 1
+                log.info(f"Journaled order {client_id} exists on {symbol}: {order.get('status')}")
+            elif known:
+                self.journal.record_status(client_id, MISSING, symbol)
+                self._release_risk(client_id)
+                counts["missing"] += 1
+                log.info(f"Journaled order {client_id} was never placed on {symbol}.")
+            else:
+                counts["unresolved"] += 1
+        self.journal.flush()
+        log.info(f"Reconcile finished: {counts['placed']} placed, {counts['missing']} never placed, "
+                 f"{counts['unresolved']} still unknown.")
+        return counts
+
     def get_account_balance(self, asset="USDT"):
         """Fetches the balance for a specific asset in the futures account."""
         log.info(f"Fetching account balance for asset: {asset}")
+        if self._cache_ready():
+            cached = self.order_cache.get_balance(asset)
+            # Without availableBalance (dropped by ACCOUNT_UPDATE, never sent for assets first seen
+            # on the stream) the cached entry is incomplete; the ledger or REST answers instead
+            if cached and "availableBalance" in cached:
+                log.info(f"Balance for {asset} (cached): {cached['balance']}")
+                return cached
+        if self.ledger is not None:
+            # Last REST balance adjusted by the fills since; refreshed by every reconcile
+            ledger_balance = self.ledger.balance(asset, max_age=RECONCILE_INTERVAL)
+            if ledger_balance is not None:
+                log.info(f"Balance for {asset} (ledger): {ledger_balance['balance']}")
+                return ledger_balance
         try:
-            balances = self.client.futures_account_balance()
+            balances = self._call("futures_account_balance")
             self._log_response("futures_account_balance", balances)
+            if self.ledger is not None:
+                self.ledger.load_balances(balances)
             for balance in balances:
                 if balance['asset'] == asset:
                     log.info(f"Balance for {asset}: {balance['balance']}")
@@ -70,7 +569,7 @@ class BasicBot:
         params = {"symbol": symbol, "leverage": leverage}
         self._log_request("futures_change_leverage", params)
         try:
-            response = self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+            response = self._call("futures_change_leverage", symbol=symbol, leverage=leverage)
             self._log_response("futures_change_leverage", response)
             log.info(f"Successfully set leverage for {symbol} to {response.get('leverage', 'N/A')}x. Max Notional: {response.get('maxNotionalValue', 'N/A')}")
             return response
@@ -80,13 +579,14 @@ class BasicBot:
             log.error(f"Unexpected error setting leverage for {symbol}: {e}")
             return None
 
-    def place_market_order(self, symbol: str, side: str, quantity: float):
+    def place_market_order(self, symbol: str, side: str, quantity: float, client_order_id: str = None):
         """
         Places a market order.
         :param symbol: Trading symbol (e.g., "BTCUSDT")
         :param side: "BUY" or "SELL"
         :param quantity: Amount to trade
-        :return: Order response or None on error
+        :param client_order_id: Client order ID to send (default: the next journaled one)
+        :return: Order response, a RiskReject if a pre-trade check failed, or None on error
         """
         side_map = {"BUY": SIDE_BUY, "SELL": SIDE_SELL}
         if side.upper() not in side_map:
@@ -100,26 +600,22 @@ class BasicBot:
             "type": ORDER_TYPE_MARKET,
             "quantity": str(quantity) # API expects string for quantity
         }
-        self._log_request("futures_create_order (MARKET)", params)
         try:
-            order = self.client.futures_create_order(**params)
-            self._log_response("futures_create_order (MARKET)", order)
-            log.info(f"Market order placed successfully: {order}")
-            return order
-        except (BinanceAPIException, BinanceOrderException) as e:
-            return self._handle_api_error(e, f"placing market order for {symbol}")
-        except Exception as e:
-            log.error(f"Unexpected error placing market order for {symbol}: {e}")
+            self._apply_symbol_rules(params)
+        except OrderValidationError as e:
+            log.error(f"MARKET order rejected locally: {e}")
             return None
+        return self._send_order(params, "MARKET", client_order_id)
 
-    def place_limit_order(self, symbol: str, side: str, quantity: float, price: float):
+    def place_limit_order(self, symbol: str, side: str, quantity: float, price: float, client_order_id: str = None):
         """
         Places a limit order.
         :param symbol: Trading symbol (e.g., "BTCUSDT")
         :param side: "BUY" or "SELL"
         :param quantity: Amount to trade
         :param price: Price for the limit order
-        :return: Order response or None on error
+        :param client_order_id: Client order ID to send (default: the next journaled one)
+        :return: Order response, a RiskReject if a pre-trade check failed, or None on error
         """
         side_map = {"BUY": SIDE_BUY, "SELL": SIDE_SELL}
         if side.upper() not in side_map:
@@ -135,17 +631,96 @@ class BasicBot:
             "quantity": str(quantity),
             "price": str(price) # API expects string for price
         }
-        self._log_request("futures_create_order (LIMIT)", params)
         try:
-            order = self.client.futures_create_order(**params)
-            self._log_response("futures_create_order (LIMIT)", order)
-            log.info(f"Limit order placed successfully: {order}")
-            return order
-        except (BinanceAPIException, BinanceOrderException) as e:
-            return self._handle_api_error(e, f"placing limit order for {symbol}")
+            self._apply_symbol_rules(params)
+        except OrderValidationError as e:
+            log.error(f"LIMIT order rejected locally: {e}")
+            return None
+        return self._send_order(params, "LIMIT", client_order_id)
+
+    # --- Order book pricing ---
+    def get_order_book(self, symbol: str):
+        """
+        Returns the symbol's live order book if the market-data stream has it
+        synced, else a one-off book built from a REST depth snapshot.
+        :param symbol: Trading symbol
+        :return: OrderBook or None on error
+        """
+        if self.market_data is not None:
+            book = self.market_data.book(symbol)
+            if book is not None:
+                return book
+        try:
+            snapshot = self._call("futures_order_book", symbol=symbol, limit=BOOK_SNAPSHOT_LIMIT)
+            self._log_response("futures_order_book", snapshot)
+            return OrderBook.from_snapshot(symbol, snapshot)
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, f"fetching order book for {symbol}")
         except Exception as e:
-            log.error(f"Unexpected error placing limit order for {symbol}: {e}")
+            log.error(f"Unexpected error fetching order book for {symbol}: {e}")
+            return None
+
+    def get_book_price(self, symbol: str, side: str, mode: str = "join", quantity: float = None):
+        """
+        Prices a limit order off the current order book.
+        :param side: "BUY" or "SELL"
+        :param mode: "join" (best price on our side: BUY at the bid, SELL at the ask),
+                     "improve" (one tick inside the spread, when there is room),
+                     "mid" (the midpoint), or "cross" (the best opposite price; with
+                     `quantity`, the price that would sweep that much of the book)
+        :return: Price or None if the book is unavailable or too thin
+        """
+        side, mode = side.upper(), mode.lower()
+        if side not in ("BUY", "SELL") or mode not in BOOK_PRICE_MODES:
+            log.error(f"Invalid book pricing: side={side}, mode={mode}. Modes: {', '.join(BOOK_PRICE_MODES)}.")
+            return None
+        book = self.get_order_book(symbol)
+        if book is None:
+            return None
+        bid, ask = book.top()
+        if bid is None or ask is None:
+            log.error(f"Order book for {symbol} has an empty side; cannot price a {mode} order.")
+            return None
+        buy = side == "BUY"
+        if mode == "join":
+            price = bid if buy else ask
+        elif mode == "mid":
+            price = (bid + ask) / 2
+        elif mode == "improve":
+            tick = self._tick_size(symbol)
+            price = bid if buy else ask
+            if tick and ask - bid > tick * 1.5: # Stay passive: never improve onto the other side
+                price = bid + tick if buy else ask - tick
+        elif quantity:
+            swept = book.sweep(side, quantity)
+            if swept is None:
+                log.error(f"Order book for {symbol} is too thin to cross {quantity}.")
+                return None
+            price = swept[0]
+        else:
+            price = ask if buy else bid
+        log.info(f"Book price for {side} {symbol} ({mode}): {price} (bid {bid}, ask {ask})")
+        return price
+
+    def _tick_size(self, symbol):
+        if self.symbol_rules is None:
+            return None
+        try:
+            return float(self.symbol_rules.get(symbol).tick_size)
+        except Exception as e:
+            log.warning(f"Tick size for {symbol} unavailable: {e}")
+            return None
+
+    def place_book_limit_order(self, symbol: str, side: str, quantity: float, mode: str = "join"):
+        """
+        Places a limit order priced off the current order book (see get_book_price).
+        :return: Order response, a RiskReject if a pre-trade check failed, or None on error
+        """
+        price = self.get_book_price(symbol, side, mode, quantity if mode == "cross" else None)
+        if price is None:
+            log.error(f"LIMIT order not placed: no {mode} price for {symbol}.")
             return None
+        return self.place_limit_order(symbol, side, quantity, price)
 
     def get_order_status(self, symbol: str, order_id: int):
         """
@@ -155,10 +730,15 @@ class BasicBot:
         :return: Order status details or None on error
         """
         log.info(f"Fetching status for order ID {order_id} on {symbol}")
+        if self._cache_ready():
+            cached = self.order_cache.get_order(order_id)
+            if cached:
+                log.info(f"Order Status for {order_id} (cached): {cached}")
+                return cached
         params = {"symbol": symbol, "orderId": order_id}
         self._log_request("futures_get_order", params)
         try:
-            order_status = self.client.futures_get_order(symbol=symbol, orderId=order_id)
+            order_status = self._call("futures_get_order", symbol=symbol, orderId=order_id)
             self._log_response("futures_get_order", order_status)
             log.info(f"Order Status for {order_id}: {order_status}")
             return order_status
@@ -179,7 +759,7 @@ class BasicBot:
         params = {"symbol": symbol, "orderId": order_id}
         self._log_request("futures_cancel_order", params)
         try:
-            cancel_response = self.client.futures_cancel_order(symbol=symbol, orderId=order_id)
+            cancel_response = self._call("futures_cancel_order", symbol=symbol, orderId=order_id)
             self._log_response("futures_cancel_order", cancel_response)
             log.info(f"Order {order_id} cancelled successfully: {cancel_response}")
             return cancel_response
@@ -196,10 +776,14 @@ class BasicBot:
         :return: List of open orders or None on error
         """
         log.info(f"Fetching open orders for symbol: {symbol if symbol else 'ALL'}")
+        if self._cache_ready():
+            open_orders = self.order_cache.get_open_orders(symbol)
+            log.info(f"Found {len(open_orders)} open order(s) (cached).")
+            return open_orders
         params = {"symbol": symbol} if symbol else {}
         self._log_request("futures_get_open_orders", params)
         try:
-            open_orders = self.client.futures_get_open_orders(**params)
+            open_orders = self._call("futures_get_open_orders", **params)
             self._log_response("futures_get_open_orders", open_orders)
             log.info(f"Found {len(open_orders)} open order(s).")
             return open_orders
@@ -210,7 +794,8 @@ class BasicBot:
             return None
             
     # --- Bonus: Stop-Limit Order ---
-    def place_stop_limit_order(self, symbol: str, side: str, quantity: float, price: float, stop_price: float):
+    def place_stop_limit_order(self, symbol: str, side: str, quantity: float, price: float, stop_price: float,
+                               client_order_id: str = None):
         """
         Places a Stop-Limit order.
         For a BUY order: it triggers when price >= stop_price, then a limit order at 'price' is placed.
@@ -223,7 +808,8 @@ class BasicBot:
         :param quantity: Amount to trade
         :param price: Price for the limit order part
         :param stop_price: Price at which the limit order is triggered
-        :return: Order response or None on error
+        :param client_order_id: Client order ID to send (default: the next journaled one)
+        :return: Order response, a RiskReject if a pre-trade check failed, or None on error
         """
         side_map = {"BUY": SIDE_BUY, "SELL": SIDE_SELL}
         if side.upper() not in side_map:
@@ -241,14 +827,175 @@ class BasicBot:
             "stopPrice": str(stop_price), # The trigger price
             "timeInForce": TIME_IN_FORCE_GTC # Or other, GTC is common
         }
-        self._log_request("futures_create_order (STOP-LIMIT)", params)
         try:
-            order = self.client.futures_create_order(**params)
-            self._log_response("futures_create_order (STOP-LIMIT)", order)
-            log.info(f"Stop-Limit order placed successfully: {order}")
-            return order
-        except (BinanceAPIException, BinanceOrderException) as e:
-            return self._handle_api_error(e, f"placing stop-limit order for {symbol}")
+            self._apply_symbol_rules(params)
+        except OrderValidationError as e:
+            log.error(f"STOP-LIMIT order rejected locally: {e}")
+            return None
+        return self._send_order(params, "STOP-LIMIT", client_order_id)
+
+    # --- Batch order management ---
+    def _batch_order_params(self, order):
+        """
+        Builds create-order params from an order spec dict with keys
+        symbol, side, type (MARKET, LIMIT or STOP_LIMIT), quantity and,
+        where relevant, price and stop_price.
+        """
+        side_map = {"BUY": SIDE_BUY, "SELL": SIDE_SELL}
+        side = str(order.get("side", "")).upper()
+        if side not in side_map:
+            raise ValueError(f"Invalid order side: {order.get('side')}. Must be 'BUY' or 'SELL'.")
+        order_type = str(order.get("type", ORDER_TYPE_LIMIT)).upper().replace("-", "_")
+        params = {
+            "symbol": str(order["symbol"]).upper(),
+            "side": side_map[side],
+            "quantity": str(order["quantity"]),
+        }
+        if order_type == ORDER_TYPE_MARKET:
+            params["type"] = ORDER_TYPE_MARKET
+        elif order_type == ORDER_TYPE_LIMIT:
+            params.update({"type": ORDER_TYPE_LIMIT, "timeInForce": TIME_IN_FORCE_GTC, "price": str(order["price"])})
+        elif order_type in ("STOP_LIMIT", FUTURE_ORDER_TYPE_STOP):
+            params.update({
+                "type": FUTURE_ORDER_TYPE_STOP,
+                "timeInForce": TIME_IN_FORCE_GTC,
+                "price": str(order["price"]),
+                "stopPrice": str(order["stop_price"]),
+            })
+        else:
+            raise ValueError(f"Unsupported order type for batch: {order.get('type')}")
+        return self._apply_symbol_rules(params)
+
+    def place_batch_orders(self, orders):
+        """
+        Places many orders using the multi-order endpoint, BATCH_ORDER_LIMIT orders per request.
+        :param orders: List of order spec dicts (see _batch_order_params)
+        :return: One result dict per input order, in input order:
+                 {"success": True, "order": <order response>} or
+                 {"success": False, "code": <error code or None>, "error": <message>}
+        """
+        log.info(f"Placing {len(orders)} order(s) in batches of {BATCH_ORDER_LIMIT}")
+        results = [None] * len(orders)
+        pending = [] # (index, params) of orders that passed local validation
+        for i, order in enumerate(orders):
+            try:
+                pending.append((i, self._batch_order_params(order)))
+            except (KeyError, ValueError) as e:
+                log.error(f"Invalid batch order #{i} {order}: {e}")
+                results[i] = {"success": False, "code": None, "error": f"Invalid order spec: {e}"}
+
+        for _, params in pending:
+            params["newClientOrderId"] = self._client_order_id()
+            if params["type"] != FUTURE_ORDER_TYPE_STOP: # As in _send_order: conditional orders get no response type
+                params["newOrderRespType"] = ORDER_RESP_TYPE_RESULT
+        if self.risk is not None:
+            for symbol in {params["symbol"] for _, params in pending if not params.get("price")}:
+                self._refresh_risk_price(symbol)
+            checked = []
+            for i, params in pending:
+                reject = self.risk.check(params["symbol"], params["side"], float(params["quantity"]),
+                                         float(params["price"]) if params.get("price") else None,
+                                         params["newClientOrderId"])
+                if reject is None:
+                    checked.append((i, params))
+                else:
+                    log.error(f"Batch order #{i} rejected by risk check: {reject}")
+                    results[i] = {"success": False, "code": None, "error": str(reject), "reject": reject}
+            pending = checked
+        if self.journal is not None and pending:
+            try:
+                self.journal.record_intents([(params["newClientOrderId"], params) for _, params in pending])
+            except JournalError as e:
+                log.error(f"Batch not sent, it could not be journaled: {e}")
+                for i, params in pending:
+                    results[i] = {"success": False, "code": None, "error": f"Journal unavailable: {e}"}
+                    self._release_risk(params["newClientOrderId"])
+                pending = []
+
+        for start in range(0, len(pending), BATCH_ORDER_LIMIT):
+            chunk = pending[start:start + BATCH_ORDER_LIMIT]
+            batch = [params for _, params in chunk]
+            self._log_request("futures_place_batch_order", batch)
+            unknown = False # Batches are not retried; reconcile resolves them on the next start
+            try:
+                responses = self._call("futures_place_batch_order", batchOrders=batch)
+                self._log_response("futures_place_batch_order", responses)
+            except (BinanceAPIException, BinanceOrderException) as e:
+                self._handle_api_error(e, f"placing batch of {len(chunk)} order(s)")
+                responses = [{"code": e.code, "msg": e.message}] * len(chunk)
+                unknown = isinstance(e, BinanceAPIException) and (e.status_code >= 500 or
+                                                                  e.code in UNKNOWN_OUTCOME_CODES)
+            except Exception as e:
+                log.error(f"Unexpected error placing batch of {len(chunk)} order(s): {e}")
+                responses = [{"code": None, "msg": str(e)}] * len(chunk)
+                unknown = True
+            for (i, params), response in zip(chunk, responses):
+                results[i] = self._batch_item_result(response)
+                client_id = params["newClientOrderId"]
+                if results[i]["success"]:
+                    self._journal_order(client_id, response)
+                else:
+                    self._journal_status(client_id, UNKNOWN if unknown else REJECTED, params["symbol"],
+                                         results[i]["error"])
+                    if not unknown:
+                        self._release_risk(client_id)
+
+        placed = sum(1 for r in results if r["success"])
+        log.info(f"Batch placement finished: {placed}/{len(orders)} order(s) accepted.")
+        return results
+
+    def cancel_batch_orders(self, symbol: str, order_ids):
+        """
+        Cancels many orders on one symbol, BATCH_CANCEL_LIMIT order IDs per request.
+        :param symbol: Trading symbol
+        :param order_ids: Order IDs to cancel
+        :return: One result dict per order ID (same shape as place_batch_orders)
+        """
+        order_ids = [int(order_id) for order_id in order_ids]
+        log.info(f"Cancelling {len(order_ids)} order(s) on {symbol} in batches of {BATCH_CANCEL_LIMIT}")
+        results = []
+        for start in range(0, len(order_ids), BATCH_CANCEL_LIMIT):
+            chunk = order_ids[start:start + BATCH_CANCEL_LIMIT]
+            params = {"symbol": symbol, "orderidlist": chunk}
+            self._log_request("futures_cancel_orders", params)
+            try:
+                responses = self._call("futures_cancel_orders", **params)
+                self._log_response("futures_cancel_orders", responses)
+            except BinanceAPIException as e:
+                self._handle_api_error(e, f"cancelling batch of {len(chunk)} order(s)")
+                responses = [{"code": e.code, "msg": e.message}] * len(chunk)
+            except Exception as e:
+                log.error(f"Unexpected error cancelling batch of {len(chunk)} order(s): {e}")
+                responses = [{"code": None, "msg": str(e)}] * len(chunk)
+            results.extend(self._batch_item_result(response) for response in responses)
+
+        cancelled = sum(1 for r in results if r["success"])
+        log.info(f"Batch cancel finished: {cancelled}/{len(order_ids)} order(s) cancelled.")
+        return results
+
+    def cancel_all_orders(self, symbol: str):
+        """
+        Cancels every open order on a symbol with a single request.
+        :param symbol: Trading symbol
+        :return: Exchange response or None on error
+        """
+        log.info(f"Cancelling all open orders on {symbol}")
+        params = {"symbol": symbol}
+        self._log_request("futures_cancel_all_open_orders", params)
+        try:
+            response = self._call("futures_cancel_all_open_orders", **params)
+            self._log_response("futures_cancel_all_open_orders", response)
+            log.info(f"All open orders on {symbol} cancelled: {response}")
+            return response
+        except BinanceAPIException as e:
+            return self._handle_api_error(e, f"cancelling all open orders on {symbol}")
         except Exception as e:
-            log.error(f"Unexpected error placing stop-limit order for {symbol}: {e}")
-            return None
\ No newline at end of file
+            log.error(f"Unexpected error cancelling all open orders on {symbol}: {e}")
+            return None
+
+    @staticmethod
+    def _batch_item_result(response):
+        # Batch endpoints answer failed items inline as {"code": ..., "msg": ...}
+        if "code" in response and "orderId" not in response:
+            return {"success": False, "code": response.get("code"), "error": response.get("msg")}
+        return {"success": True, "order": response}
@@ -0,0 +1,78 @@
+# benchmarks/algo_engine_load.py
+"""
+Hundreds of concurrent parent orders on one AlgoEngine: N TWAPs with
+book-priced limit children run against a local stub exchange (where limit
+orders rest and market orders fill), so every parent goes through the full
+cycle: slices, fill polling, stale-child cancel/replace and the market sweep
+at the deadline.
+
+Reports the threads the process needed, how late steps started after their
+scheduled time (timer wheel + worker-pool queueing), REST calls per second
+and the final parent states.
+
+Run from the project root:
+    python -m benchmarks.algo_engine_load --parents 300 --duration 30 --slices 5 --workers 8
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "WARNING") # Before logger_setup is imported
+
+import argparse
+import threading
+import time
+from collections import Counter
+
+from basic_bot import BasicBot
+from benchmarks.router_throughput import start_stub
+from execution_algos import TWAP, AlgoEngine
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Many concurrent TWAP parents on one AlgoEngine")
+    parser.add_argument('--parents', type=int, default=300)
+    parser.add_argument('--duration', type=float, default=30.0, help='TWAP duration in seconds')
+    parser.add_argument('--slices', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8, help='AlgoEngine worker threads')
+    parser.add_argument('--latency', type=float, default=0.002, help='Stub exchange latency in seconds')
+    args = parser.parse_args()
+
+    stub, url = start_stub(args.latency)
+    try:
+        bot = BasicBot("key", "secret", futures_url=url, rate_limit=False, validate_orders=False)
+        threads_before = threading.active_count()
+        engine = AlgoEngine(bot, workers=args.workers).start()
+        start = time.perf_counter()
+        parents = [engine.submit(TWAP("BTCUSDT" if i % 2 else "ETHUSDT", "BUY" if i % 3 else "SELL", 0.01 * (1 + i % 5),
+                                      duration=args.duration, slices=args.slices))
+                   for i in range(args.parents)]
+        peak_threads = threading.active_count()
+        while not engine.wait(timeout=0.5):
+            peak_threads = max(peak_threads, threading.active_count())
+        elapsed = time.perf_counter() - start
+        engine.stop()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    lags = list(engine.lags)
+    calls = sum(s["calls"] for s in bot.metrics.snapshot().values())
+    children = sum(len(p.children) for p in parents)
+    states = Counter(p.status for p in parents)
+    exact = sum(1 for p in parents if abs(p.filled - p.quantity) < 1e-9)
+    print(f"{args.parents} TWAP parents x {args.slices} slices over {args.duration:g} s, "
+          f"{args.workers} worker(s), stub latency {args.latency * 1000:g} ms")
+    print(f"threads: {threads_before} before, peak {peak_threads} (engine adds 1 timer + {args.workers} workers)")
+    print(f"finished in {elapsed:.2f} s; {engine.steps} steps, {children} child orders, "
+          f"{calls} REST calls ({calls / elapsed:,.0f}/s)")
+    print(f"step lag: p50 {percentile(lags, 0.5) * 1000:.1f} ms, p99 {percentile(lags, 0.99) * 1000:.1f} ms, "
+          f"max {max(lags, default=0) * 1000:.1f} ms")
+    print(f"parents: {dict(states)}; fill state matches quantity for {exact}/{args.parents}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/async_vs_sync.py
+"""
+Compares the blocking BasicBot against AsyncBot.gather() on a local stub exchange.
+
+Run from the project root:
+    python -m benchmarks.async_vs_sync --orders 50 --latency 0.02
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from async_bot import AsyncBot
+from basic_bot import BasicBot
+from logger_setup import log
+from stub_exchange import StubExchange
+
+
+def bench_sync(url, orders):
+    bot = BasicBot("stub-key", "stub-secret", futures_url=url, validate_orders=False) # AsyncBot does not validate either
+    start = time.perf_counter()
+    for i in range(orders):
+        bot.place_limit_order("BTCUSDT", "BUY", 0.001, 20000 + i)
+    return time.perf_counter() - start
+
+
+async def bench_async(url, orders, pool_size):
+    async with await AsyncBot.create("stub-key", "stub-secret", futures_url=url, pool_size=pool_size) as bot:
+        start = time.perf_counter()
+        results = await bot.gather(*(
+            bot.place_limit_order("BTCUSDT", "BUY", 0.001, 20000 + i) for i in range(orders)
+        ))
+        elapsed = time.perf_counter() - start
+    assert all(results), "some async orders failed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async order throughput against a stub exchange")
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.02, help="Simulated round-trip in seconds")
+    parser.add_argument('--pool-size', type=int, default=100)
+    args = parser.parse_args()
+
+    log.setLevel(logging.WARNING) # Keep per-order INFO lines out of the timings
+
+    stub = StubExchange(latency=args.latency)
+    url = stub.start()
+    try:
+        sync_s = bench_sync(url, args.orders)
+        async_s = asyncio.run(bench_async(url, args.orders, args.pool_size))
+    finally:
+        stub.stop()
+
+    print(f"{args.orders} limit orders, simulated RTT {args.latency * 1000:.1f} ms")
+    print(f"  sync  BasicBot : {sync_s:8.3f} s  ({args.orders / sync_s:9.1f} orders/s)")
+    print(f"  async AsyncBot : {async_s:8.3f} s  ({args.orders / async_s:9.1f} orders/s)")
+    print(f"  speed-up       : {sync_s / async_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
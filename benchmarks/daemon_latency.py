@@ -0,0 +1,78 @@
+# benchmarks/daemon_latency.py
+"""
+Cold vs. warm latency of CLI commands against a local stub exchange.
+
+Cold runs `python main.py <command>` (import python-binance, load .env, build
+a client, ping, run). Warm runs `python main.py --daemon <command>` against a
+`main.py serve` daemon, and "in-process" sends the same command straight to
+the daemon socket without starting a Python interpreter.
+
+Run from the project root:
+    python -m benchmarks.daemon_latency --runs 5 --latency 0.02
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import daemon
+from stub_exchange import StubExchange
+
+COMMANDS = [
+    ["balance"],
+    ["openorders"],
+    ["limit", "BUY", "0.002", "60000"],
+    ["market", "SELL", "0.002"],
+]
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold CLI vs. warm daemon command latency")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help="Simulated round-trip in seconds")
+    args = parser.parse_args()
+
+    stub = StubExchange(latency=args.latency)
+    url = stub.start()
+    workdir = tempfile.mkdtemp()
+    socket_path = os.path.join(workdir, "bot.sock")
+    env = dict(os.environ, BINANCE_FUTURES_API_URL=url,
+               BINANCE_TESTNET_API_KEY="stub-key", BINANCE_TESTNET_API_SECRET="stub-secret")
+    main_py = os.path.abspath("main.py")
+
+    def cli(*argv):
+        subprocess.run([sys.executable, main_py, *argv], env=env, cwd=workdir,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    server = subprocess.Popen([sys.executable, main_py, "--socket", socket_path, "serve"], env=env, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+        print(f"Median of {args.runs} runs, simulated RTT {args.latency * 1000:.1f} ms")
+        print(f"  {'command':28} {'cold CLI':>10} {'--daemon':>10} {'in-process':>11}")
+        for command in COMMANDS:
+            cold = timed(lambda: cli(*command), args.runs)
+            warm = timed(lambda: cli("--daemon", "--socket", socket_path, *command), args.runs)
+            direct = timed(lambda: daemon.forward(command, socket_path, workdir), args.runs)
+            print(f"  {' '.join(command):28} {cold:8.1f}ms {warm:8.1f}ms {direct:9.1f}ms")
+    finally:
+        server.terminate()
+        server.wait()
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# benchmarks/indicators_bench.py
+"""
+Indicator cost over a long kline series, three ways:
+
+    batch        indicators.sma()/ema()/... vectorized over the whole array
+    incremental  indicators.SMA/EMA/... with one O(1) update() per bar
+    naive        pure-Python recomputation over the lookback window on every
+                 bar (what signal code looping over a price list does)
+
+Batch runs over all --bars; the per-bar loops run over --loop-bars and
+--naive-bars and are projected linearly to --bars (they are O(1) and
+O(period) per bar respectively). Incremental results are checked against
+batch on the bars they cover.
+
+Run from the project root:
+    python -m benchmarks.indicators_bench --bars 10000000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+import indicators as ind
+from backtest import generate_klines
+
+PERIOD = 20
+LOOKBACK = 4 * PERIOD # Bars the naive EMA-type recomputations start from
+
+
+def naive_sma(c, i):
+    return sum(c[i - PERIOD + 1:i + 1]) / PERIOD
+
+
+def naive_ema(c, i):
+    alpha = 2.0 / (PERIOD + 1)
+    window = c[i - LOOKBACK + 1:i + 1]
+    value = sum(window[:PERIOD]) / PERIOD
+    for x in window[PERIOD:]:
+        value += alpha * (x - value)
+    return value
+
+
+def naive_rsi(c, i):
+    window = c[i - LOOKBACK:i + 1]
+    gain = loss = 0.0
+    for j in range(1, len(window)):
+        delta = window[j] - window[j - 1]
+        g, l = max(delta, 0.0), max(-delta, 0.0)
+        if j <= PERIOD:
+            gain += g / PERIOD
+            loss += l / PERIOD
+        else:
+            gain += (g - gain) / PERIOD
+            loss += (l - loss) / PERIOD
+    return 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def naive_atr(h, l, c, i):
+    value = 0.0
+    for n, j in enumerate(range(i - LOOKBACK + 1, i + 1)):
+        tr = max(h[j] - l[j], abs(h[j] - c[j - 1]), abs(l[j] - c[j - 1]))
+        value = value + tr / PERIOD if n < PERIOD else value + (tr - value) / PERIOD
+    return value
+
+
+def naive_bollinger(c, i):
+    window = c[i - PERIOD + 1:i + 1]
+    mean = sum(window) / PERIOD
+    std = math.sqrt(sum((x - mean) ** 2 for x in window) / PERIOD)
+    return mean, mean + 2 * std, mean - 2 * std
+
+
+def naive_zscore(c, i):
+    mean, upper, _ = naive_bollinger(c, i)
+    std = (upper - mean) / 2
+    return (c[i] - mean) / std if std else float("nan")
+
+
+def naive_vwap(h, l, c, v, i):
+    pv = vol = 0.0
+    for j in range(i - PERIOD + 1, i + 1):
+        pv += (h[j] + l[j] + c[j]) / 3 * v[j]
+        vol += v[j]
+    return pv / vol
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs incremental vs naive indicator cost")
+    parser.add_argument('--bars', type=int, default=10_000_000)
+    parser.add_argument('--loop-bars', type=int, default=1_000_000, help='Bars for the incremental loops')
+    parser.add_argument('--naive-bars', type=int, default=20_000, help='Bars for the naive loops')
+    args = parser.parse_args()
+
+    k = generate_klines("BENCH", args.bars, seed=7)
+    o, h, l, c, v = k.open, k.high, k.low, k.close, k.volume
+    n_loop = min(args.loop_bars, args.bars)
+    n_naive = min(args.naive_bars, args.bars)
+    # Python loops get lists: iterating NumPy scalars would penalise them unfairly
+    lo, lh, ll, lc, lv = (a[:n_loop].tolist() for a in (o, h, l, c, v))
+
+    cases = [
+        # name, batch, incremental factory + feed, naive
+        ("SMA", lambda: ind.sma(c, PERIOD), ind.SMA(PERIOD), "close", naive_sma),
+        ("EMA", lambda: ind.ema(c, PERIOD), ind.EMA(PERIOD), "close", naive_ema),
+        ("RSI", lambda: ind.rsi(c, PERIOD), ind.RSI(PERIOD), "close", naive_rsi),
+        ("ATR", lambda: ind.atr(h, l, c, PERIOD), ind.ATR(PERIOD), "bar", naive_atr),
+        ("Bollinger", lambda: ind.bollinger(c, PERIOD)[1], ind.Bollinger(PERIOD), "close", naive_bollinger),
+        ("VWAP", lambda: ind.vwap(h, l, c, v, PERIOD), ind.VWAP(PERIOD), "bar", naive_vwap),
+        ("z-score", lambda: ind.zscore(c, PERIOD), ind.ZScore(PERIOD), "close", naive_zscore),
+    ]
+    scale_loop = args.bars / n_loop
+    scale_naive = args.bars / n_naive
+    print(f"{args.bars:,} bars, period {PERIOD}; incremental measured on {n_loop:,} bars and naive on "
+          f"{n_naive:,}, both projected to {args.bars:,}")
+    print(f"{'indicator':10} {'batch s':>9} {'incr s':>9} {'naive s':>10} {'incr us/bar':>12} "
+          f"{'naive us/bar':>13} {'max |incr-batch|':>17}")
+    for name, batch, indicator, feed, naive in cases:
+        start = time.perf_counter()
+        expected = batch()
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if feed == "close":
+            update = indicator.update
+            got = [update(x) for x in lc]
+        else:
+            update = indicator.update_bar
+            got = [update(*bar) for bar in zip(lo, lh, ll, lc, lv)]
+        incr_seconds = time.perf_counter() - start
+        if name == "Bollinger":
+            got = [g[1] for g in got]
+        diff = np.nanmax(np.abs(np.asarray(got, dtype=np.float64) - expected[:n_loop]))
+
+        first = LOOKBACK + 1
+        start = time.perf_counter()
+        if naive in (naive_atr, naive_vwap):
+            args_ = (lh, ll, lc) if naive is naive_atr else (lh, ll, lc, lv)
+            for i in range(first, first + n_naive):
+                naive(*args_, i)
+        else:
+            for i in range(first, first + n_naive):
+                naive(lc, i)
+        naive_seconds = time.perf_counter() - start
+
+        print(f"{name:10} {batch_seconds:9.3f} {incr_seconds * scale_loop:9.2f} {naive_seconds * scale_naive:10.1f} "
+              f"{incr_seconds / n_loop * 1e6:12.3f} {naive_seconds / n_naive * 1e6:13.2f} {diff:17.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/journal_throughput.py
+"""
+Cost of the write-ahead order journal.
+
+1. Journal only: every order is an intent that must be committed before it
+   may be sent, plus the exchange's answer appended afterwards; orders/s
+   and intent commit latency from 1 and from many threads, with
+   synchronous=NORMAL (survives a process crash) and FULL (fsync per commit).
+   With many threads, intents queued during one commit share the next one.
+2. End to end against a zero-latency stub exchange: per-order time of
+   place_limit_order with and without the journal, and a run where a share
+   of orders is answered "execution status unknown" to check that retries
+   never place an order twice.
+
+Run from the project root:
+    python -m benchmarks.journal_throughput --orders 20000 --threads 1 8 32
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "ERROR") # Retries log a warning each
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from basic_bot import BasicBot
+from order_journal import OrderJournal
+from stub_exchange import StubExchange
+
+PARAMS = {"symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "timeInForce": "GTC", "quantity": "0.010",
+          "price": "60000.00"}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def journal_only(path, orders, threads, synchronous):
+    journal = OrderJournal(path, owner="bench", synchronous=synchronous)
+    latencies = []
+    per_thread = orders // threads
+
+    def run():
+        local = []
+        for i in range(per_thread):
+            client_id = journal.next_client_order_id()
+            start = time.perf_counter()
+            journal.record_intent(client_id, PARAMS)
+            local.append(time.perf_counter() - start)
+            journal.record_order(client_id, {"orderId": i, "symbol": "BTCUSDT", "status": "NEW"})
+        latencies.extend(local)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    journal.flush()
+    elapsed = time.perf_counter() - start
+    stats = journal.stats()
+    journal.close()
+    return per_thread * threads / elapsed, latencies, stats
+
+
+def per_order_us(url, orders, journal):
+    bot = BasicBot("stub-key", "stub-secret", futures_url=url, rate_limit=False, validate_orders=False,
+                   metrics=False, journal=journal, risk=False)
+    start = time.perf_counter()
+    for i in range(orders):
+        bot.place_limit_order("BTCUSDT", "BUY", 0.002, 60000 + i % 100)
+    elapsed = time.perf_counter() - start
+    if bot.journal is not None:
+        bot.journal.close()
+    return elapsed / orders * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order journal write cost and retry safety")
+    parser.add_argument('--orders', type=int, default=20000, help='Orders per journal-only run')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--stub-orders', type=int, default=1000, help='Orders per end-to-end run')
+    parser.add_argument('--unknown-rate', type=float, default=0.2,
+                        help='Share of orders the stub answers "status unknown" in the retry run')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="journal_bench_")
+    try:
+        print(f"Journal only ({args.orders:,} orders = intent + ack each, in {workdir})")
+        for synchronous in ("NORMAL", "FULL"):
+            for threads in args.threads:
+                path = os.path.join(workdir, f"{synchronous}-{threads}.db")
+                rate, latencies, stats = journal_only(path, args.orders, threads, synchronous)
+                print(f"  {synchronous:6} {threads:3} thread(s): {rate:10,.0f} orders/s  "
+                      f"intent p50 {percentile(latencies, 0.5) * 1e6:7.0f} us  "
+                      f"p99 {percentile(latencies, 0.99) * 1e6:7.0f} us  "
+                      f"{stats['entries'] / max(stats['commits'], 1):5.1f} entries/commit")
+
+        stub = StubExchange()
+        url = stub.start()
+        try:
+            per_order_us(url, args.stub_orders // 10, False) # Warm up the stub and the connection pool
+            plain = per_order_us(url, args.stub_orders, False)
+            journaled = per_order_us(url, args.stub_orders, os.path.join(workdir, "bot.db"))
+            print(f"place_limit_order on a zero-latency stub ({args.stub_orders:,} orders): "
+                  f"{plain:.0f} us without journal, {journaled:.0f} us with (+{journaled - plain:.0f} us)")
+        finally:
+            stub.stop()
+
+        stub = StubExchange(unknown_rate=args.unknown_rate)
+        url = stub.start()
+        try:
+            bot = BasicBot("stub-key", "stub-secret", futures_url=url, rate_limit=False, validate_orders=False,
+                           journal=os.path.join(workdir, "retry.db"), retry_backoff=0.001, risk=False)
+            placed = sum(1 for i in range(args.stub_orders)
+                         if bot.place_limit_order("BTCUSDT", "BUY", 0.002, 60000 + i % 100))
+            print(f"With {args.unknown_rate:.0%} 'status unknown' answers: {placed}/{args.stub_orders} orders "
+                  f"confirmed, {len(stub.order_history)} on the exchange ({stub.unknown_answers} unknown answers "
+                  f"resolved by lookup), {len(bot.journal.unresolved())} unresolved")
+            bot.journal.close()
+        finally:
+            stub.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
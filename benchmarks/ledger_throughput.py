@@ -0,0 +1,135 @@
+# benchmarks/ledger_throughput.py
+"""
+Cost of keeping the position/PnL ledger.
+
+1. Fills/s through apply_order (REST order responses) and apply_event
+   (ORDER_TRADE_UPDATE partial fills) with 1 to many open positions: the
+   per-fill cost must not grow with the number of positions or orders seen.
+2. The same fills reported twice (REST response, then stream event), which
+   must be applied once.
+3. What the `positions`/`pnl` views, a balance lookup and a snapshot save
+   cost with many positions open.
+
+Run from the project root:
+    python -m benchmarks.ledger_throughput --fills 200000 --symbols 1 100 10000
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "ERROR")
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from ledger import PositionLedger
+
+
+def symbol_names(count):
+    return [f"S{i:05d}USDT" for i in range(count)]
+
+
+def order_responses(symbols, fills, seed=1):
+    rnd = random.Random(seed)
+    orders = []
+    for order_id in range(1, fills + 1):
+        qty = rnd.randint(1, 50) / 1000
+        price = round(100 + rnd.uniform(-5, 5), 2)
+        orders.append({"orderId": order_id, "symbol": rnd.choice(symbols), "side": rnd.choice(("BUY", "SELL")),
+                       "type": "MARKET", "status": "FILLED", "executedQty": f"{qty:.3f}",
+                       "avgPrice": f"{price:.2f}", "cumQuote": f"{qty * price:.5f}"})
+    return orders
+
+
+def trade_events(symbols, fills, parts=4, seed=2):
+    """ORDER_TRADE_UPDATE events: every order fills in `parts` partial fills."""
+    rnd = random.Random(seed)
+    events = []
+    for order_id in range(1, fills // parts + 1):
+        symbol, side = rnd.choice(symbols), rnd.choice(("BUY", "SELL"))
+        executed = quote = 0.0
+        for part in range(parts):
+            qty, price = rnd.randint(1, 50) / 1000, round(100 + rnd.uniform(-5, 5), 2)
+            executed += qty
+            quote += qty * price
+            events.append({"e": "ORDER_TRADE_UPDATE", "o": {
+                "s": symbol, "i": order_id, "S": side, "o": "LIMIT", "m": True,
+                "X": "FILLED" if part == parts - 1 else "PARTIALLY_FILLED",
+                "l": f"{qty:.3f}", "L": f"{price:.2f}", "z": f"{executed:.3f}", "ap": f"{quote / executed:.8f}",
+                "n": f"{qty * price * 0.0002:.8f}", "N": "USDT"}})
+    return events
+
+
+def timed(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Position ledger fill throughput and view costs")
+    parser.add_argument('--fills', type=int, default=200000, help='Fills per run')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1, 100, 10000],
+                        help='Number of symbols the fills are spread over (open positions)')
+    args = parser.parse_args()
+
+    print(f"Fill throughput ({args.fills:,} fills per run)")
+    for count in args.symbols:
+        symbols = symbol_names(count)
+        orders = order_responses(symbols, args.fills)
+        ledger = PositionLedger()
+        elapsed = timed(ledger.apply_order, orders)
+        events = trade_events(symbols, args.fills)
+        stream_ledger = PositionLedger()
+        stream_elapsed = timed(stream_ledger.apply_event, events)
+        print(f"  {count:6,} symbol(s): apply_order {args.fills / elapsed:10,.0f} fills/s "
+              f"({elapsed / args.fills * 1e6:4.1f} us)   apply_event {len(events) / stream_elapsed:10,.0f} fills/s "
+              f"({stream_elapsed / len(events) * 1e6:4.1f} us)")
+
+    symbols = symbol_names(args.symbols[-1])
+    orders = order_responses(symbols, args.fills)
+    ledger = PositionLedger()
+    timed(ledger.apply_order, orders)
+    # Live, the stream event of a fill arrives around its REST response
+    duplicate_events = [{"e": "ORDER_TRADE_UPDATE", "o": {
+        "s": o["symbol"], "i": o["orderId"], "S": o["side"], "o": "MARKET", "m": False, "X": "FILLED",
+        "l": o["executedQty"], "L": o["avgPrice"], "z": o["executedQty"], "ap": o["avgPrice"]}} for o in orders]
+    both = PositionLedger()
+    elapsed = timed(lambda pair: (both.apply_order(pair[0]), both.apply_event(pair[1])),
+                    list(zip(orders, duplicate_events)))
+    applied = sum(p.fills for p in both.positions.values())
+    print(f"{len(orders):,} fills each reported by REST and by the stream: {applied:,} applied, realized PnL "
+          f"{'matches' if abs(both.realized - ledger.realized) < 1e-6 else 'DIFFERS'} "
+          f"({elapsed / len(orders) * 1e6:.1f} us per pair)")
+
+    ledger.load_balances([{"asset": f"A{i}", "balance": "1.0", "availableBalance": "1.0"} for i in range(20)]
+                         + [{"asset": "USDT", "balance": "1000000", "crossWalletBalance": "1000000",
+                             "availableBalance": "1000000"}])
+    open_positions = sum(1 for p in ledger.positions.values() if p.qty)
+    for label, function, repeat in (("positions_view()", ledger.positions_view, 20),
+                                    ("pnl()", ledger.pnl, 20),
+                                    ("balance('A7')", lambda: ledger.balance("A7", 60), 100000)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        print(f"{label:<17} with {open_positions:,} open positions: "
+              f"{(time.perf_counter() - start) / repeat * 1e6:10.1f} us")
+
+    workdir = tempfile.mkdtemp(prefix="ledger_bench_")
+    try:
+        ledger.path = os.path.join(workdir, "ledger.json")
+        start = time.perf_counter()
+        ledger.save(force=True)
+        saved = time.perf_counter() - start
+        reloaded = PositionLedger(ledger.path)
+        print(f"Snapshot of {open_positions:,} positions / {len(ledger._orders):,} tracked orders: "
+              f"{os.path.getsize(ledger.path) / 1e6:.1f} MB in {saved * 1e3:.0f} ms, reloaded "
+              f"{'identical' if reloaded.pnl()['symbols'] == ledger.pnl()['symbols'] else 'DIFFERENT'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/logging_overhead.py
+"""
+Order-path overhead of logging: off vs. classic synchronous handlers vs. the
+queued background pipeline, at INFO and DEBUG (full payloads), in text and
+JSON-lines format.
+
+Two numbers are reported per mode: the wall time per place_limit_order()
+against a zero-latency stub exchange, and the time the placing thread spends
+in the log calls alone (replaying the log calls one order makes).
+
+Run from the project root:
+    python -m benchmarks.logging_overhead --orders 2000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import logger_setup
+from basic_bot import BasicBot
+from stub_exchange import StubExchange
+
+MODES = [
+    # label, queued, level, format
+    ("off", True, "CRITICAL", "text"),
+    ("sync   INFO  text", False, "INFO", "text"),
+    ("queued INFO  text", True, "INFO", "text"),
+    ("sync   DEBUG text", False, "DEBUG", "text"),
+    ("queued DEBUG text", True, "DEBUG", "text"),
+    ("queued DEBUG json", True, "DEBUG", "json"),
+]
+
+PAYLOAD = {"symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "timeInForce": "GTC",
+           "quantity": "0.002", "price": "60000.0"}
+
+
+def log_calls_only(log, bot, n):
+    """The log calls place_limit_order makes, without the HTTP request."""
+    start = time.perf_counter()
+    for _ in range(n):
+        log.info("Placing LIMIT order: BUY 0.002 BTCUSDT @ 60000.0")
+        bot._log_request("futures_create_order (LIMIT)", PAYLOAD)
+        bot._log_response("futures_create_order (LIMIT)", PAYLOAD)
+        log.info(f"Limit order placed successfully: {PAYLOAD}")
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead on the order path")
+    parser.add_argument('--orders', type=int, default=2000)
+    args = parser.parse_args()
+
+    stub = StubExchange()
+    url = stub.start()
+    workdir = tempfile.mkdtemp()
+    real_stdout = sys.stdout
+    results = []
+    try:
+        for label, queued, level, log_format in MODES:
+            sys.stdout = open(os.devnull, "w") # Console handler binds to the current stdout
+            log = logger_setup.setup_logger(queued=queued, level=level, log_format=log_format,
+                                            log_file=os.path.join(workdir, f"{len(results)}.log"))
+            bot = BasicBot("stub-key", "stub-secret", futures_url=url, rate_limit=False, validate_orders=False,
+                           risk=False) # Resting orders would soon hit the open-order limit
+            start = time.perf_counter()
+            for i in range(args.orders):
+                bot.place_limit_order("BTCUSDT", "BUY", 0.002, 60000 + i % 100)
+            per_order = (time.perf_counter() - start) / args.orders * 1e6
+            emit = log_calls_only(log, bot, args.orders)
+            logger_setup.flush_logs()
+            sys.stdout.close()
+            sys.stdout = real_stdout
+            results.append((label, per_order, emit))
+    finally:
+        sys.stdout = real_stdout
+        logger_setup.setup_logger(level=logging.WARNING)
+        stub.stop()
+
+    baseline = results[0][1]
+    print(f"{args.orders} limit orders against a zero-latency stub")
+    print(f"  {'mode':20} {'us/order':>10} {'vs off':>9} {'log calls us/order':>20}")
+    for label, per_order, emit in results:
+        print(f"  {label:20} {per_order:10.1f} {per_order - baseline:+9.1f} {emit:20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/market_data_throughput.py
+"""
+Market-data messages per second on one core: replays a recorded depth +
+aggTrade session (the wire format of the combined stream, with the REST
+snapshots where they arrived) through MarketData, with and without a best
+bid/ask read after every message, and through a naive dict-per-side book
+that finds the best level with max()/min() on every read.
+
+The default fixture, fixtures/market_data_events.jsonl, is a synthetic
+recording written by this script (--write-fixture); --generate replays a
+larger synthetic session of the same shape instead. Every pass checks the
+rebuilt books against the state the session was generated from.
+
+Run from the project root:
+    python -m benchmarks.market_data_throughput --repeat 100
+    python -m benchmarks.market_data_throughput --generate 200000 --symbols 20
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "WARNING") # Snapshot loads log at INFO
+
+import argparse
+import json
+import random
+import time
+
+from market_data import MarketData
+
+FIXTURE = "fixtures/market_data_events.jsonl"
+SYMBOLS = [("BTCUSDT", 60000.0, 1), ("ETHUSDT", 3000.0, 2), ("SOLUSDT", 150.0, 3), ("BNBUSDT", 600.0, 2)]
+
+
+def record_session(symbols=3, messages=1500, levels=100, seed=1):
+    """
+    Generates a stream session: per symbol a few diffs, then the REST snapshot
+    taken mid-stream, then diffs and trades interleaved across symbols.
+    :return: (JSONL lines, {symbol: (bids, asks)} final state as {price string: qty string})
+    """
+    rng = random.Random(seed)
+    specs = [(f"{SYMBOLS[i % len(SYMBOLS)][0][:-4]}{i // len(SYMBOLS) or ''}USDT",) + SYMBOLS[i % len(SYMBOLS)][1:]
+             for i in range(symbols)]
+    state = {}
+    for symbol, price, decimals in specs:
+        tick = 10 ** -decimals
+        mid = round(price / tick)
+        bids = {mid - k: round(rng.uniform(0.1, 20), 3) for k in range(levels)}
+        asks = {mid + 1 + k: round(rng.uniform(0.1, 20), 3) for k in range(levels)}
+        state[symbol] = {"mid": mid, "bids": bids, "asks": asks, "u": rng.randrange(10 ** 9, 2 * 10 ** 9),
+                         "decimals": decimals, "agg": rng.randrange(10 ** 8), "snapshot_at": rng.randrange(3, 8),
+                         "diffs": 0}
+    lines = []
+    clock = 1760000000000
+
+    def fmt_price(s, t):
+        return f"{t / 10 ** s['decimals']:.{s['decimals']}f}"
+
+    def diff(symbol, s):
+        changes = {"b": {}, "a": {}}
+        if rng.random() < 0.15: # Mid moves one tick, clearing the level that would cross
+            if rng.random() < 0.5:
+                s["mid"] += 1
+                changes["a"][s["mid"]] = 0.0
+                changes["b"][s["mid"]] = round(rng.uniform(0.1, 5), 3)
+            else:
+                changes["b"][s["mid"]] = 0.0
+                changes["a"][s["mid"]] = round(rng.uniform(0.1, 5), 3)
+                s["mid"] -= 1
+        for _ in range(rng.randint(1, 8)):
+            distance = min(int(rng.expovariate(0.15)), levels + 20)
+            if rng.random() < 0.5:
+                changes["b"][s["mid"] - distance] = 0.0 if rng.random() < 0.3 else round(rng.uniform(0.01, 20), 3)
+            else:
+                changes["a"][s["mid"] + 1 + distance] = 0.0 if rng.random() < 0.3 else round(rng.uniform(0.01, 20), 3)
+        for key, side in (("b", s["bids"]), ("a", s["asks"])):
+            for t, qty in changes[key].items():
+                if qty:
+                    side[t] = qty
+                else:
+                    side.pop(t, None)
+        first = s["u"] + 1
+        s["u"] += rng.randint(1, 30)
+        event = {"e": "depthUpdate", "E": clock, "T": clock - 2, "s": symbol, "U": first, "u": s["u"],
+                 "pu": first - 1,
+                 "b": [[fmt_price(s, t), f"{q:.3f}"] for t, q in changes["b"].items()],
+                 "a": [[fmt_price(s, t), f"{q:.3f}"] for t, q in changes["a"].items()]}
+        return {"stream": f"{symbol.lower()}@depth@100ms", "data": event}
+
+    def snapshot(symbol, s):
+        return {"snapshot": {"lastUpdateId": s["u"], "E": clock, "T": clock - 2,
+                             "bids": [[fmt_price(s, t), f"{s['bids'][t]:.3f}"] for t in sorted(s["bids"], reverse=True)],
+                             "asks": [[fmt_price(s, t), f"{s['asks'][t]:.3f}"] for t in sorted(s["asks"])]},
+                "symbol": symbol}
+
+    def trade(symbol, s):
+        buyer_maker = rng.random() < 0.5
+        t = max(s["bids"]) if buyer_maker else min(s["asks"])
+        s["agg"] += 1
+        event = {"e": "aggTrade", "E": clock, "s": symbol, "a": s["agg"], "p": fmt_price(s, t),
+                 "q": f"{rng.uniform(0.001, 2):.3f}", "f": s["agg"] * 3, "l": s["agg"] * 3 + 2, "T": clock - 1,
+                 "m": buyer_maker}
+        return {"stream": f"{symbol.lower()}@aggTrade", "data": event}
+
+    for _ in range(messages):
+        clock += rng.randint(1, 20)
+        symbol, *_ = specs[rng.randrange(len(specs))]
+        s = state[symbol]
+        if rng.random() < 0.35:
+            lines.append(json.dumps(trade(symbol, s), separators=(",", ":")))
+            continue
+        lines.append(json.dumps(diff(symbol, s), separators=(",", ":")))
+        s["diffs"] += 1
+        if s["diffs"] == s["snapshot_at"]: # The snapshot covers this diff; the next ones continue from it
+            lines.append(json.dumps(snapshot(symbol, s), separators=(",", ":")))
+    expected = {symbol: ({fmt_price(s, t): q for t, q in s["bids"].items()},
+                         {fmt_price(s, t): q for t, q in s["asks"].items()}) for symbol, s in state.items()}
+    return lines, expected
+
+
+def check(market_data, expected):
+    for symbol, (bids, asks) in expected.items():
+        book = market_data.books[symbol]
+        depth = book.depth(10 ** 6)
+        got_bids = {p: q for p, q in depth["bids"]}
+        got_asks = {p: q for p, q in depth["asks"]}
+        want_bids = {float(p): q for p, q in bids.items()}
+        want_asks = {float(p): q for p, q in asks.items()}
+        if not book.synced or got_bids != want_bids or got_asks != want_asks:
+            raise AssertionError(f"{symbol} book does not match the recorded session")
+
+
+def replay(lines, symbols, read_top):
+    market_data = MarketData(symbols)
+    books = market_data.books
+    apply_message = market_data.apply_message
+    loads = json.loads
+    for line in lines:
+        message = loads(line)
+        if "snapshot" in message:
+            books[message["symbol"]].load_snapshot(message["snapshot"])
+            continue
+        apply_message(message)
+        if read_top:
+            book = books[message["data"]["s"]]
+            if book.synced:
+                book.top()
+    return market_data
+
+
+def replay_naive(lines, symbols):
+    books = {s: ({}, {}) for s in symbols}
+    loads = json.loads
+    for line in lines:
+        message = loads(line)
+        if "snapshot" in message:
+            bids, asks = books[message["symbol"]]
+            bids.clear()
+            asks.clear()
+            bids.update((float(p), float(q)) for p, q in message["snapshot"]["bids"])
+            asks.update((float(p), float(q)) for p, q in message["snapshot"]["asks"])
+            continue
+        event = message["data"]
+        if event["e"] != "depthUpdate":
+            continue
+        bids, asks = books[event["s"]]
+        for side, levels in ((bids, event["b"]), (asks, event["a"])):
+            for p, q in levels:
+                q = float(q)
+                if q:
+                    side[float(p)] = q
+                else:
+                    side.pop(float(p), None)
+        if bids and asks:
+            max(bids), min(asks)
+    return books
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market-data stream messages/sec through local L2 books")
+    parser.add_argument('--fixture', type=str, default=FIXTURE)
+    parser.add_argument('--repeat', type=int, default=100, help='Passes over the fixture')
+    parser.add_argument('--generate', type=int, default=0, help='Replay a synthetic session of N messages instead')
+    parser.add_argument('--symbols', type=int, default=10, help='Symbols in the generated session')
+    parser.add_argument('--levels', type=int, default=500, help='Snapshot levels per side in the generated session')
+    parser.add_argument('--write-fixture', type=str, default=None, help='Write a small session to this path and exit')
+    args = parser.parse_args()
+
+    if args.write_fixture:
+        lines, _ = record_session()
+        with open(args.write_fixture, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"Wrote {len(lines)} line(s) to {args.write_fixture}")
+        return
+
+    expected = None
+    if args.generate:
+        lines, expected = record_session(args.symbols, args.generate, args.levels, seed=7)
+        repeat = 1
+    else:
+        with open(args.fixture) as f:
+            lines = [line for line in f if line.strip()]
+        repeat = args.repeat
+    symbols = [json.loads(line)["symbol"] for line in lines if line.startswith('{"snapshot"')]
+    messages = sum(1 for line in lines if not line.startswith('{"snapshot"')) * repeat
+    print(f"{messages:,} messages ({len(symbols)} symbols, {repeat} pass(es)); one core")
+
+    for label, run in (("MarketData", lambda: replay(lines, symbols, False)),
+                       ("MarketData + top()", lambda: replay(lines, symbols, True)),
+                       ("naive dict book", lambda: replay_naive(lines, symbols))):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = run()
+        elapsed = time.perf_counter() - start
+        if expected is not None and isinstance(result, MarketData):
+            check(result, expected)
+        print(f"{label:20} {elapsed:7.2f} s {messages / elapsed:12,.0f} msgs/s {elapsed / messages * 1e6:8.2f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
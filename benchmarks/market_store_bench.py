@@ -0,0 +1,147 @@
+# benchmarks/market_store_bench.py
+"""
+Ingest and range-query throughput of the market history store.
+
+1. Ingest: millions of synthetic aggTrades appended in pages the size the
+   fetcher writes (1000 rows) and in large batches: rows/s, on-disk size and
+   compression ratio of the sealed chunks.
+2. Range queries: random [start, end) windows of several lengths, cold (the
+   chunk is inflated into the decoded cache first) and warm (memory-mapped):
+   latency per query and rows/s, plus a full scan with read_chunks().
+3. End to end: `fetch` of klines and aggTrades for a few symbols from a
+   local stub_exchange.py (enforcing the 2400/min weight limit) through
+   BasicBot's rate-limit scheduler, then the same fetch again to resume.
+
+Run from the project root:
+    python -m benchmarks.market_store_bench --rows 10000000 --queries 2000
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "WARNING")
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from market_store import AGG_TRADES, MarketStore
+
+START_MS = 1704067200000 # 2024-01-01
+
+
+def synthetic_trades(rows, seed=1, first_id=0, start_ms=START_MS):
+    """aggTrades shaped like a liquid futures symbol: ~4 trades/s, tick-sized price steps."""
+    rng = np.random.default_rng(seed)
+    agg_id = first_id + np.arange(rows, dtype=np.int64)
+    times = start_ms + np.cumsum(rng.integers(0, 500, rows, dtype=np.int64))
+    price = np.round(60000 + np.cumsum(rng.integers(-3, 4, rows)) * 0.1, 1)
+    quantity = np.round(rng.lognormal(-4.0, 1.2, rows), 3) + 0.001
+    trades = rng.integers(1, 6, rows, dtype=np.int64)
+    first = 3 * first_id + np.concatenate(([0], np.cumsum(trades[:-1])))
+    return {"agg_id": agg_id, "time": times, "price": price, "quantity": quantity, "first_id": first,
+            "last_id": first + trades - 1, "buyer_maker": rng.random(rows) < 0.5}
+
+
+def percentile(values, q):
+    values = np.sort(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if len(values) else 0.0
+
+
+def ingest(root, trades, page, chunk_rows):
+    store = MarketStore(root, chunk_rows=chunk_rows)
+    rows = len(trades["time"])
+    start = time.perf_counter()
+    for offset in range(0, rows, page):
+        store.append(AGG_TRADES, "BTCUSDT", {name: values[offset:offset + page] for name, values in trades.items()})
+    return store, time.perf_counter() - start
+
+
+def time_queries(store, windows):
+    latencies, returned = [], 0
+    for start_ms, end_ms in windows:
+        began = time.perf_counter()
+        columns = store.read(AGG_TRADES, "BTCUSDT", start_ms, end_ms, columns=["time", "price", "quantity"])
+        returned += len(columns["time"])
+        latencies.append(time.perf_counter() - began)
+    return np.array(latencies) * 1e6, returned
+
+
+def run_fetch(symbols, hours, workers):
+    from basic_bot import BasicBot
+    from history_fetcher import HistoryFetcher
+    from stub_exchange import StubExchange
+    stub = StubExchange(weight_limit=2400) # The exchange's per-minute request-weight limit
+    url = stub.start()
+    root = tempfile.mkdtemp(prefix="fetch_bench_")
+    try:
+        bot = BasicBot("key", "secret", futures_url=url, journal=False, ledger=False, risk=False)
+        fetcher = HistoryFetcher(bot, MarketStore(root), workers=workers)
+        end = START_MS + hours * 3600000
+        began = time.perf_counter()
+        summaries = fetcher.fetch(symbols, START_MS, end, intervals=("1m",), agg_trades=True)
+        elapsed = time.perf_counter() - began
+        rows = sum(s["rows"] for s in summaries)
+        pages = sum(s["pages"] for s in summaries)
+        print(f"fetch {len(symbols)} symbols x {hours}h (1m klines + aggTrades, {workers} workers): {rows:,} rows "
+              f"in {pages} pages, {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s); "
+              f"{stub.request_count} requests, weight {stub.used_weight} used this minute, {stub.rejected_429} answered 429")
+        resumed = fetcher.fetch(symbols, START_MS, end, intervals=("1m",), agg_trades=True)
+        print(f"  re-run: {sum(s['rows'] for s in resumed)} new rows, {sum(s['pages'] for s in resumed)} pages")
+    finally:
+        stub.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market store ingest and range-query throughput")
+    parser.add_argument('--rows', type=int, default=10000000, help='Synthetic aggTrades to ingest')
+    parser.add_argument('--chunk-rows', type=int, default=1 << 20, help='Rows per sealed chunk')
+    parser.add_argument('--queries', type=int, default=2000, help='Random range queries per window length')
+    parser.add_argument('--fetch-symbols', type=int, default=4, help='Symbols fetched from the stub (0 skips)')
+    parser.add_argument('--fetch-hours', type=int, default=1, help='Hours of history fetched per symbol')
+    args = parser.parse_args()
+
+    trades = synthetic_trades(args.rows)
+    raw_bytes = sum(values.nbytes for values in trades.values())
+    workdir = tempfile.mkdtemp(prefix="market_store_bench_")
+    try:
+        print(f"Ingest {args.rows:,} aggTrades ({raw_bytes / 1e6:,.0f} MB raw, {args.chunk_rows:,}-row chunks)")
+        for page in (1000, 1 << 20):
+            store, elapsed = ingest(os.path.join(workdir, f"page{page}"), trades, page, args.chunk_rows)
+            info = store.info(AGG_TRADES, "BTCUSDT")
+            print(f"  {page:>9,}-row appends: {args.rows / elapsed:12,.0f} rows/s  {info['chunks']} chunks "
+                  f"{info['compressed_bytes'] / 1e6:,.1f} MB ({info['raw_bytes'] / max(info['compressed_bytes'], 1):.1f}x) "
+                  f"+ {info['tail_rows']:,} tail rows")
+
+        rng = np.random.default_rng(2)
+        first, last = int(trades["time"][0]), int(trades["time"][-1])
+        print(f"Range queries over {(last - first) / 86400000:.1f} days ({args.queries:,} per window, "
+              f"columns time/price/quantity)")
+        for label, length in (("1 minute", 60000), ("1 hour", 3600000), ("1 day", 86400000)):
+            starts = rng.integers(first, max(last - length, first + 1), args.queries)
+            windows = [(int(s), int(s) + length) for s in starts]
+            for cache in ("cold", "warm"):
+                if cache == "cold":
+                    store = MarketStore(os.path.join(workdir, "page1000"), chunk_rows=args.chunk_rows)
+                    shutil.rmtree(os.path.join(store.root, AGG_TRADES, "BTCUSDT", ".decoded"), ignore_errors=True)
+                latencies, returned = time_queries(store, windows)
+                print(f"  {label:<9} {cache}: p50 {percentile(latencies, 0.5):9.1f} us  "
+                      f"p99 {percentile(latencies, 0.99):9.1f} us  {returned / (latencies.sum() / 1e6):14,.0f} rows/s "
+                      f"({returned / args.queries:,.0f} rows per query)")
+
+        began = time.perf_counter()
+        volume = sum(float(part["quantity"].sum()) for part in store.read_chunks(AGG_TRADES, "BTCUSDT"))
+        elapsed = time.perf_counter() - began
+        print(f"Full scan with read_chunks (sum of quantity): {args.rows / elapsed:,.0f} rows/s, "
+              f"{'matches' if np.isclose(volume, trades['quantity'].sum()) else 'DIFFERS'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.fetch_symbols:
+        run_fetch([f"S{i:02d}USDT" for i in range(args.fetch_symbols)], args.fetch_hours, workers=4)
+
+
+if __name__ == "__main__":
+    main()
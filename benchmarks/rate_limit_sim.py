@@ -0,0 +1,90 @@
+# benchmarks/rate_limit_sim.py
+"""
+Sustained-throughput harness for the client-side RequestScheduler.
+
+Several threads hammer a rate-limited stub exchange through one BasicBot,
+once without the scheduler and once with it, and report successful ops/sec
+alongside the number of 429 and 418 (ban) responses. Queries exercise the
+request-weight limit; a second pass places orders against the order-count
+limits, which the scheduler resyncs from the X-MBX-ORDER-COUNT-* headers.
+
+Run from the project root:
+    python -m benchmarks.rate_limit_sim --weight-limit 50 --order-limit 20 --window 1 --seconds 6
+"""
+import argparse
+import logging
+import threading
+import time
+
+from basic_bot import BasicBot
+from logger_setup import log
+from rate_limiter import RequestScheduler
+from stub_exchange import StubExchange
+
+
+def run(args, use_scheduler, orders=False):
+    # The order-count windows are scaled like the weight window: 10 s -> window, 1 min -> 6 x window
+    order_windows = (args.window, 6 * args.window)
+    stub = StubExchange(latency=args.latency, weight_limit=args.weight_limit, window=args.window,
+                        order_limit_10s=args.order_limit, order_limit_1m=4 * args.order_limit,
+                        order_windows=order_windows)
+    url = stub.start()
+    scheduler = RequestScheduler(weight_limit=args.weight_limit, weight_interval=args.window,
+                                 order_limit_10s=args.order_limit, order_limit_1m=4 * args.order_limit,
+                                 order_interval_10s=order_windows[0], order_interval_1m=order_windows[1])
+    # Orders are not retried, so throttled ones show up as 429s instead of backoff sleeps
+    bot = BasicBot("stub-key", "stub-secret", futures_url=url, scheduler=scheduler, rate_limit=use_scheduler,
+                   journal=False, ledger=False, risk=False, order_retries=0)
+
+    ok = [0] * args.threads
+    deadline = time.monotonic() + args.seconds
+
+    def worker(n):
+        while time.monotonic() < deadline:
+            if orders:
+                result = bot.place_limit_order("BTCUSDT", "BUY", 0.002, 50000)
+            else:
+                result = bot.get_open_orders("BTCUSDT")
+            if result is not None:
+                ok[n] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    stub.stop()
+    return sum(ok) / elapsed, stub.rejected_429, stub.rejected_418, stub.rejected_orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustained ops/sec against a rate-limited stub exchange")
+    parser.add_argument('--weight-limit', type=int, default=50, help="Request weight allowed per window")
+    parser.add_argument('--order-limit', type=int, default=20,
+                        help="Orders allowed per window (4x that per 6 windows, like 300/10s and 1200/min)")
+    parser.add_argument('--window', type=float, default=1.0, help="Rate-limit window in seconds")
+    parser.add_argument('--seconds', type=float, default=6.0, help="Duration of each run")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.005, help="Simulated round-trip in seconds")
+    args = parser.parse_args()
+
+    log.setLevel(logging.CRITICAL) # Failed calls would otherwise flood the console
+
+    ceiling = args.weight_limit / args.window
+    print(f"Limit: {args.weight_limit} weight / {args.window:g}s (ceiling {ceiling:.1f} ops/s), "
+          f"{args.threads} threads, {args.seconds:g}s per run")
+    for label, use_scheduler in (("without scheduler", False), ("with scheduler", True)):
+        ops, r429, r418, _ = run(args, use_scheduler)
+        print(f"  {label:18}: {ops:7.1f} ok ops/s   429s={r429:<6} 418s={r418}")
+    ceiling = min(args.order_limit, 4 * args.order_limit / 6) / args.window
+    print(f"Orders: {args.order_limit} / {args.window:g}s and {4 * args.order_limit} / {6 * args.window:g}s "
+          f"(ceiling {ceiling:.1f} orders/s)")
+    for label, use_scheduler in (("without scheduler", False), ("with scheduler", True)):
+        ops, _, _, rejected = run(args, use_scheduler, orders=True)
+        print(f"  {label:18}: {ops:7.1f} ok orders/s   order-count 429s={rejected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/risk_check_latency.py
+"""
+Cost of the pre-trade risk gate.
+
+1. RiskEngine.check alone, with many symbols, open positions and open
+   orders tracked: per-check latency (p50/p99/max) for orders that pass and
+   reserve exposure, and for orders that are rejected.
+2. Through BasicBot.place_limit_order with an in-process client that answers
+   instantly: per-order time with and without the gate, so the difference is
+   everything the gate adds (check, reservation, acknowledgement update).
+
+Run from the project root:
+    python -m benchmarks.risk_check_latency --checks 200000 --symbols 100 --open-orders 150
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "CRITICAL") # Rejects log an error each
+
+import argparse
+import itertools
+import random
+import time
+
+from basic_bot import BasicBot
+from ledger import PositionLedger
+from risk import RiskEngine, RiskLimits
+
+BUDGET_US = 50.0
+
+
+class InstantClient:
+    """Just enough of the python-binance Client for place_limit_order: every order fills at once."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def futures_ping(self):
+        return {}
+
+    def futures_create_order(self, **params):
+        return {"orderId": next(self._ids), "symbol": params["symbol"], "status": "FILLED",
+                "clientOrderId": params.get("newClientOrderId"), "side": params["side"], "type": params["type"],
+                "price": params["price"], "avgPrice": params["price"], "origQty": params["quantity"],
+                "executedQty": params["quantity"], "cumQuote": str(float(params["quantity"]) * float(params["price"]))}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def loaded_engine(symbols, open_orders):
+    """An engine with a position and a live price on every symbol and `open_orders` acknowledged orders."""
+    ledger = PositionLedger()
+    engine = RiskEngine(RiskLimits(max_open_orders=open_orders + 100), ledger=ledger)
+    for i, symbol in enumerate(symbols):
+        ledger.apply_fill(symbol, "BUY" if i % 2 else "SELL", 1.0, 100.0)
+        engine.set_price(symbol, 100.0)
+    for i in range(open_orders):
+        engine.apply_order({"clientOrderId": f"open-{i}", "symbol": symbols[i % len(symbols)], "status": "NEW",
+                            "side": "BUY" if i % 2 else "SELL", "origQty": "0.5", "executedQty": "0"})
+    return engine
+
+
+def time_checks(engine, orders, release):
+    latencies = []
+    clock = time.perf_counter_ns
+    for i, (symbol, side, quantity, price) in enumerate(orders):
+        client_id = f"bench-{i}"
+        start = clock()
+        engine.check(symbol, side, quantity, price, client_id)
+        latencies.append(clock() - start)
+        if release:
+            engine.release(client_id) # Keep the state constant between checks
+    return [ns / 1000 for ns in latencies]
+
+
+def per_order_us(orders, risk):
+    bot = BasicBot(None, None, client=InstantClient(), rate_limit=False, validate_orders=False, metrics=False,
+                   journal=False, risk=risk)
+    if bot.risk is not None:
+        bot.risk.set_price("BTCUSDT", 60000.0)
+    start = time.perf_counter()
+    for i in range(orders):
+        bot.place_limit_order("BTCUSDT", "BUY" if i % 2 else "SELL", 0.01, 60000 + i % 50 - 25)
+    return (time.perf_counter() - start) / orders * 1e6
+
+
+def report(label, latencies):
+    p99 = percentile(latencies, 0.99)
+    print(f"  {label:<28} p50 {percentile(latencies, 0.5):6.2f} us  p99 {p99:6.2f} us  "
+          f"max {max(latencies):8.1f} us  {'OK' if p99 < BUDGET_US else 'OVER'} (budget {BUDGET_US:.0f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-trade risk check latency")
+    parser.add_argument('--checks', type=int, default=200000, help='Checks per scenario')
+    parser.add_argument('--symbols', type=int, default=100, help='Symbols with a position and open orders')
+    parser.add_argument('--open-orders', type=int, default=150, help='Acknowledged open orders tracked')
+    parser.add_argument('--orders', type=int, default=20000, help='Orders per BasicBot run')
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    symbols = [f"S{i:04d}USDT" for i in range(args.symbols)]
+    engine = loaded_engine(symbols, args.open_orders)
+    print(f"RiskEngine.check ({args.checks:,} checks, {args.symbols} symbols, {args.open_orders} open orders)")
+    passing = [(rnd.choice(symbols), rnd.choice(("BUY", "SELL")), 0.1, round(100 + rnd.uniform(-2, 2), 2))
+               for _ in range(args.checks)]
+    report("pass + reserve (limit)", time_checks(engine, passing, release=True))
+    market = [(symbol, side, quantity, None) for symbol, side, quantity, _ in passing]
+    report("pass + reserve (market)", time_checks(engine, market, release=True))
+    banded = [(symbol, side, quantity, 150.0) for symbol, side, quantity, _ in passing]
+    report("reject: price band", time_checks(engine, banded, release=False))
+    oversized = [(symbol, side, 10000.0, None) for symbol, side, _, _ in passing]
+    report("reject: order notional", time_checks(engine, oversized, release=False))
+    engine.engage_kill_switch("benchmark")
+    report("reject: kill switch", time_checks(engine, passing, release=False))
+    engine.release_kill_switch()
+    print(f"  rejects counted: {engine.rejects}")
+
+    per_order_us(args.orders // 10, False) # Warm up
+    plain = per_order_us(args.orders, False)
+    gated = per_order_us(args.orders, RiskEngine())
+    print(f"BasicBot.place_limit_order with an instant client ({args.orders:,} orders): "
+          f"{plain:.1f} us without the gate, {gated:.1f} us with (+{gated - plain:.1f} us per order)")
+
+
+if __name__ == "__main__":
+    main()
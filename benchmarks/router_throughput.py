@@ -0,0 +1,102 @@
+# benchmarks/router_throughput.py
+"""
+Order throughput for many accounts: one process placing every account's
+orders in turn (how main.py works today) vs. OrderRouter with 1..N worker
+processes, against a local stub exchange running in its own process.
+
+With exchange latency the router wins by overlapping round-trips across
+accounts; with --latency 0 the client-side CPU cost dominates and throughput
+scales with the number of cores available to the workers.
+
+Run from the project root:
+    python -m benchmarks.router_throughput --accounts 8 --orders 800 --latency 0.01 --workers 1 2 4
+"""
+import os
+
+os.environ.setdefault("TRADING_BOT_LOG_LEVEL", "WARNING") # Before logger_setup is imported (also by workers)
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from basic_bot import BasicBot
+from order_router import OrderRouter
+
+BOT_OPTIONS = {"rate_limit": False, "validate_orders": False, "metrics": False}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(latency):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-m", "stub_exchange", "--port", str(port), "--latency", str(latency)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/fapi"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/v1/ping", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("stub exchange did not start")
+
+
+def make_orders(accounts, count):
+    return [(accounts[i % len(accounts)]["name"],
+             {"symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "quantity": 0.002, "price": 50000 + i % 100})
+            for i in range(count)]
+
+
+def run_single(accounts, orders, url):
+    bots = {a["name"]: BasicBot(a["api_key"], a["api_secret"], futures_url=url, **BOT_OPTIONS) for a in accounts}
+    start = time.perf_counter()
+    ok = sum(1 for account, o in orders
+             if bots[account].place_limit_order(o["symbol"], o["side"], o["quantity"], o["price"]))
+    return time.perf_counter() - start, ok
+
+
+def run_router(accounts, orders, url, workers):
+    with OrderRouter(accounts, workers=workers, futures_url=url, bot_options=BOT_OPTIONS) as router:
+        start = time.perf_counter()
+        futures = [router.place(account, order) for account, order in orders]
+        ok = sum(1 for f in futures if f.result())
+        return time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-process vs OrderRouter order throughput")
+    parser.add_argument('--accounts', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=800)
+    parser.add_argument('--latency', type=float, default=0.01, help='Stub exchange latency in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    accounts = [{"name": f"sub{i}", "api_key": f"key{i}", "api_secret": f"secret{i}"} for i in range(args.accounts)]
+    orders = make_orders(accounts, args.orders)
+    stub, url = start_stub(args.latency)
+    try:
+        print(f"{args.orders} orders over {args.accounts} accounts, stub latency {args.latency * 1000:.0f} ms, "
+              f"{os.cpu_count()} core(s)")
+        elapsed, ok = run_single(accounts, orders, url)
+        baseline = args.orders / elapsed
+        print(f"{'single process':22} {elapsed:7.2f} s {baseline:9.0f} orders/s   ({ok} ok)")
+        for workers in args.workers:
+            elapsed, ok = run_router(accounts, orders, url, workers)
+            rate = args.orders / elapsed
+            print(f"{f'router, {workers} worker(s)':22} {elapsed:7.2f} s {rate:9.0f} orders/s   "
+                  f"({ok} ok, x{rate / baseline:.1f})")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
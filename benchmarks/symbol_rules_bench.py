@@ -0,0 +1,43 @@
+# benchmarks/symbol_rules_bench.py
+"""
+Micro-benchmark for local order rounding/validation with SymbolRules.
+
+Run from the project root:
+    python -m benchmarks.symbol_rules_bench --orders 100000
+"""
+import argparse
+import random
+import time
+
+from stub_exchange import STUB_SYMBOLS
+from symbol_rules import OrderValidationError, SymbolRules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate N random orders against cached symbol filters")
+    parser.add_argument('--orders', type=int, default=100000)
+    args = parser.parse_args()
+
+    rules = SymbolRules.from_exchange_info({"symbols": STUB_SYMBOLS})
+    rng = random.Random(42)
+    orders = [
+        (rng.choice(("BTCUSDT", "ETHUSDT")), rng.choice(("BUY", "SELL")),
+         round(rng.uniform(0.0005, 2.0), 6), round(rng.uniform(1000, 70000), 4))
+        for _ in range(args.orders)
+    ]
+
+    rejected = 0
+    start = time.perf_counter()
+    for symbol, side, quantity, price in orders:
+        try:
+            rules.get(symbol).normalize(side, quantity, price)
+        except OrderValidationError:
+            rejected += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Validated {args.orders} orders in {elapsed:.3f} s "
+          f"({elapsed / args.orders * 1e6:.2f} us/order, {rejected} rejected locally)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,16 @@ API_KEY = os.getenv("BINANCE_TESTNET_API_KEY")
 API_SECRET = os.getenv("BINANCE_TESTNET_API_SECRET")
 
 FUTURES_TESTNET_URL = "https://testnet.binancefuture.com"
+# Override to point the CLI at another endpoint, e.g. a local stub_exchange.py
+FUTURES_API_URL = os.getenv("BINANCE_FUTURES_API_URL", f"{FUTURES_TESTNET_URL}/fapi")
+FUTURES_STREAM_URL = os.getenv("BINANCE_FUTURES_STREAM_URL", "wss://fstream.binancefuture.com/ws")
+FUTURES_MARKET_STREAM_URL = os.getenv("BINANCE_FUTURES_MARKET_STREAM_URL", "wss://fstream.binancefuture.com/stream")
+# Write-ahead order journal (SQLite); shared by every process using the same file
+ORDER_JOURNAL_PATH = os.getenv("TRADING_BOT_JOURNAL", "order_journal.db")
+# Pre-trade risk limits (JSON); built-in defaults while the file does not exist
+RISK_LIMITS_PATH = os.getenv("TRADING_BOT_RISK_LIMITS", "risk_limits.json")
+# Historical klines/aggTrades downloaded by `main.py fetch` (market_store.py)
+MARKET_STORE_PATH = os.getenv("TRADING_BOT_MARKET_STORE", "market_history")
 
 if not API_KEY or not API_SECRET:
     raise ValueError("API_KEY and API_SECRET must be set in .env file or environment variables.")
\ No newline at end of file
@@ -0,0 +1,123 @@
+# daemon.py
+"""
+Persistent bot daemon and thin client.
+
+`python main.py serve` keeps one connected BasicBot (HTTP connection pool,
+cached trading rules, optional user-data stream) alive and listens on a Unix
+socket. `python main.py --daemon <command> ...` sends its arguments there
+instead of importing python-binance, loading .env, building a client and
+pinging the exchange on every invocation.
+
+Protocol: the client sends one JSON line {"argv": [...], "cwd": "..."}; the
+daemon replies with one JSON line {"output": "...", "status": 0} and closes.
+"""
+import argparse
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+
+from logger_setup import log
+
+DEFAULT_SOCKET_PATH = os.getenv("TRADING_BOT_SOCKET", "/tmp/trading_bot.sock")
+
+_request = threading.local() # Output buffer of the command the current handler thread is running
+
+
+class DaemonArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser whose usage, help and errors go to the client of the command being served on this thread."""
+
+    def _print_message(self, message, file=None):
+        out = getattr(_request, "out", None)
+        if out is None:
+            super()._print_message(message, file)
+        elif message:
+            out.write(message)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        status = 0
+        out = io.StringIO()
+        try:
+            request = json.loads(line)
+            log.info(f"Daemon: running command {request['argv']}")
+            _request.out = out
+            self.server.handler(request["argv"], request.get("cwd", os.getcwd()), out)
+        except SystemExit as e: # argparse errors and --help
+            status = e.code if isinstance(e.code, int) else 2
+        except Exception as e:
+            log.error(f"Daemon: command failed: {e}")
+            out.write(f"Error: {e}\n")
+            status = 1
+        finally:
+            _request.out = None
+        self.wfile.write(json.dumps({"output": out.getvalue(), "status": status}).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path, handler):
+    """
+    Serves commands on a Unix socket until SIGTERM/SIGINT.
+    :param socket_path: Filesystem path of the socket (replaced if stale)
+    :param handler: Callable(argv, cwd, out) that runs one CLI command, writing to out
+    :return: False without serving if another daemon already answers on socket_path
+    """
+    if is_running(socket_path):
+        log.error(f"A bot daemon is already listening on {socket_path}; not starting another.")
+        return False
+    if os.path.exists(socket_path): # Left behind by a daemon that died: safe to replace
+        os.unlink(socket_path)
+    server = _Server(socket_path, _RequestHandler)
+    server.handler = handler
+    os.chmod(socket_path, 0o600) # The daemon trades with our API keys; keep it private
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    log.info(f"Bot daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        log.info("Bot daemon stopped.")
+    return True
+
+
+def is_running(socket_path):
+    """True if a daemon accepts connections on socket_path."""
+    if not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt # Unwinds serve_forever() in the main thread
+
+
+def forward(argv, socket_path, cwd):
+    """
+    Sends a command line to the daemon.
+    :return: (output text, exit status)
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({"argv": argv, "cwd": cwd}).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            reply = json.loads(f.readline())
+    return reply["output"], reply["status"]
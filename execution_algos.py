@@ -0,0 +1,603 @@
+# execution_algos.py
+"""
+Execution algorithms: a parent order is split into child orders over time so
+its size doesn't hit the book at once.
+
+    TWAP     equal slices over the duration
+    VWAP     slices sized by the symbol's historical volume over the same
+             time of day
+    Iceberg  one small visible limit order at a time until the parent is done
+
+All parents run on one AlgoEngine. A hashed timer wheel on a single thread
+decides when each parent next needs attention and a small fixed pool of
+worker threads makes the REST calls, so hundreds of parents don't need a
+thread each. A parent is only ever stepped by one worker at a time.
+
+Each step refreshes the working child's fills, cancels it when it has gone
+stale (unfilled for `stale_after` seconds, a new slice is due, or the book
+moved away from its price) and sends the next child for whatever the schedule
+says is due. At the end of the duration the remainder is swept with a market
+order (finish="market") or left unfilled (finish="cancel"). Parent fill
+quantity and average price come from the children's executedQty/avgPrice as
+reported by the exchange. Fill polling is free when the bot runs the
+user-data stream (status lookups hit the local order cache).
+"""
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from logger_setup import log
+
+TICK = 0.05 # Timer wheel resolution in seconds
+WHEEL_SLOTS = 1024
+DEFAULT_WORKERS = 4
+POLL_INTERVAL = 2.0 # Seconds between fill checks of a working child
+MAX_CHILD_FAILURES = 3 # Consecutive child placement failures before the parent fails
+PROFILE_DAYS = 5 # Past days averaged into a VWAP volume profile
+PRICE_MODES = ("join", "improve", "mid", "cross", "market")
+ACTIVE_STATUSES = ("PENDING", "WORKING")
+OPEN_CHILD_STATUSES = ("NEW", "PARTIALLY_FILLED")
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class Timer:
+    __slots__ = ("deadline", "tick", "callback", "args", "cancelled")
+
+    def __init__(self, deadline, tick, callback, args):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tick=TICK, slots=WHEEL_SLOTS, now=0.0):
+        """
+        Hashed timing wheel: O(1) schedule and cancel, and each advance only
+        looks at the slots for the ticks that passed.
+        :param tick: Resolution in seconds; timers fire on the first advance at or after their tick
+        :param slots: Slots in the wheel; timers further out than one turn wait in their slot
+        """
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = math.floor(now / tick) # Last tick processed
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, deadline, callback, *args):
+        """Runs callback(*args) on the first advance() at or after `deadline`."""
+        with self._lock:
+            tick = max(math.ceil(deadline / self.tick), self.current + 1)
+            timer = Timer(deadline, tick, callback, args)
+            self.slots[tick % len(self.slots)].append(timer)
+            self.pending += 1
+        return timer
+
+    def advance(self, now):
+        """
+        Fires every timer due by `now`, in deadline order.
+        :return: Number of timers fired
+        """
+        target = math.floor(now / self.tick)
+        due = []
+        with self._lock:
+            if target <= self.current:
+                return 0
+            n = len(self.slots)
+            for tick in range(self.current + 1, self.current + 1 + min(target - self.current, n)):
+                slot = self.slots[tick % n]
+                if slot:
+                    keep = [t for t in slot if t.tick > target]
+                    if len(keep) != len(slot):
+                        due += [t for t in slot if t.tick <= target]
+                        self.slots[tick % n] = keep
+            self.current = target
+            self.pending -= len(due)
+        due.sort(key=lambda t: t.deadline)
+        fired = 0
+        for timer in due:
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+
+class Child:
+    __slots__ = ("order_id", "order_type", "price", "quantity", "executed", "avg_price", "status", "placed_at")
+
+    def __init__(self, order, placed_at):
+        self.order_id = order["orderId"]
+        self.order_type = order.get("type", "LIMIT")
+        self.price = float(order.get("price") or 0)
+        self.quantity = float(order.get("origQty") or 0)
+        self.executed = 0.0
+        self.avg_price = 0.0
+        self.status = "NEW"
+        self.placed_at = placed_at
+
+    @property
+    def open(self):
+        return self.status in OPEN_CHILD_STATUSES
+
+
+class ParentOrder:
+    algo = "PARENT"
+
+    def __init__(self, symbol, side, quantity, duration=None, interval=POLL_INTERVAL, price_mode="join",
+                 limit_price=None, stale_after=None, finish="market", display_quantity=None, reprice=False,
+                 poll_interval=POLL_INTERVAL):
+        """
+        :param symbol: Trading symbol
+        :param side: "BUY" or "SELL"
+        :param quantity: Total quantity to execute
+        :param duration: Seconds until the schedule must be complete (None: no deadline)
+        :param interval: Seconds between schedule slices
+        :param price_mode: How limit children are priced off the book ("join", "improve", "mid",
+                           "cross"), "market" for market children, or None for `limit_price` alone
+        :param limit_price: Worst price any limit child may use (BUY never above, SELL never below)
+        :param stale_after: Seconds a child may rest unfilled before it is cancelled and
+                            its remainder re-sent at a fresh price (default: one interval)
+        :param finish: At the deadline, "market" sweeps the remainder, "cancel" leaves it unfilled
+        :param display_quantity: Largest child quantity (None: whatever is due)
+        :param reprice: Also replace a resting child as soon as the book price moves away from it
+        :param poll_interval: Seconds between fill checks of a working child
+        """
+        side = side.upper()
+        if side not in ("BUY", "SELL"):
+            raise ValueError(f"Invalid order side: {side}. Must be 'BUY' or 'SELL'.")
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        if price_mode not in PRICE_MODES + (None,):
+            raise ValueError(f"price_mode must be one of {', '.join(PRICE_MODES)} (or None with limit_price)")
+        if price_mode is None and limit_price is None:
+            raise ValueError("A limit_price is needed when price_mode is None")
+        if finish not in ("market", "cancel"):
+            raise ValueError("finish must be 'market' or 'cancel'")
+        self.id = None # Set by AlgoEngine.submit
+        self.symbol = symbol.upper()
+        self.side = side
+        self.quantity = float(quantity)
+        self.duration = duration
+        self.interval = interval
+        self.price_mode = price_mode
+        self.limit_price = limit_price
+        self.stale_after = stale_after if stale_after is not None else interval
+        self.finish = finish
+        self.display_quantity = display_quantity
+        self.reprice = reprice
+        self.poll_interval = min(poll_interval, interval)
+        self.status = "PENDING"
+        self.reason = None
+        self.filled = 0.0
+        self.notional = 0.0
+        self.children = [] # Every child sent, oldest first
+        self.child = None # The working child, if any
+        self.started_at = None
+        self.end_time = None
+        self.failures = 0
+        self._cancel_requested = False
+        self._done = threading.Event()
+        self._step_lock = threading.Lock() # Held by the worker stepping this parent
+
+    # --- Schedule (overridden by the algorithms) ---
+    def on_start(self, bot, now):
+        """Called on the first step."""
+
+    def target(self, now):
+        """Cumulative quantity that should be executed by `now`."""
+        return self.quantity
+
+    def next_slice(self, now):
+        """Time of the next schedule change after `now`, or None."""
+        return None
+
+    # --- State ---
+    @property
+    def remaining(self):
+        return max(self.quantity - self.filled, 0.0)
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else 0.0
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "algo": self.algo,
+            "symbol": self.symbol,
+            "side": self.side,
+            "quantity": self.quantity,
+            "filled": round(self.filled, 12),
+            "avgPrice": round(self.avg_price, 8),
+            "status": self.status,
+            "reason": self.reason,
+            "children": len(self.children),
+        }
+
+    def wait(self, timeout=None):
+        """Blocks until the parent is finished; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Requests cancellation; the working child is cancelled on the next step."""
+        self._cancel_requested = True
+
+    # --- Stepping ---
+    def step(self, bot, now):
+        """
+        Runs one scheduling decision.
+        :return: Seconds until the next step, or None when the parent is finished
+        """
+        if self.started_at is None:
+            self.started_at = now
+            self.end_time = now + self.duration if self.duration is not None else None
+            self.status = "WORKING"
+            self.on_start(bot, now)
+            log.info(f"Algo {self.id} started: {self.algo} {self.side} {self.quantity} {self.symbol}")
+        child = self.child
+        if child is not None and child.open:
+            self._refresh(bot, child)
+        if self._cancel_requested:
+            if child is not None and child.open:
+                self._cancel_child(bot, child)
+            return self._finish("CANCELED", "cancelled by user")
+        filters = self._filters(bot)
+        if self._round(self.remaining, filters) <= 0:
+            return self._finish("FILLED")
+
+        expired = self.end_time is not None and now >= self.end_time
+        if child is not None and child.open:
+            if child.order_type == "MARKET":
+                return self.poll_interval
+            if not (expired or self._is_stale(bot, child, now, filters)):
+                return self._delay(now)
+            self._cancel_child(bot, child)
+            if child.open:
+                return self.poll_interval # Cancel failed; the next refresh tells us what happened
+            if self._round(self.remaining, filters) <= 0:
+                return self._finish("FILLED")
+        self.child = None
+
+        if expired:
+            quantity = self._round(self.remaining, filters, market=True)
+            if self.finish == "market" and quantity > 0 and quantity >= self._min_quantity(filters):
+                if self._place(bot, quantity, market=True, now=now) or self.failures < MAX_CHILD_FAILURES:
+                    return self.poll_interval
+            return self._finish("EXPIRED", f"{self.remaining:g} unfilled at the deadline")
+
+        due = min(self.target(now) - self.filled, self.remaining)
+        if self.display_quantity:
+            due = min(due, self.display_quantity)
+        quantity = self._round(due, filters, market=self.price_mode == "market")
+        minimum = self._min_quantity(filters)
+        if quantity > 0 and quantity >= minimum:
+            self._place(bot, quantity, market=self.price_mode == "market", now=now)
+        elif self.end_time is None and self.remaining < minimum:
+            return self._finish("EXPIRED", f"remaining {self.remaining:g} is below the minimum quantity")
+        if self.failures >= MAX_CHILD_FAILURES:
+            return self._finish("FAILED", f"{self.failures} consecutive child orders failed")
+        return self._delay(now)
+
+    def _delay(self, now):
+        upcoming = [t for t in (self.next_slice(now), self.end_time) if t is not None and t > now]
+        if upcoming:
+            return max(min(min(upcoming) - now, self.poll_interval), 0.0)
+        return self.poll_interval
+
+    def _is_stale(self, bot, child, now, filters):
+        if now - child.placed_at >= self.stale_after:
+            return True
+        due = self._round(self.target(now) - self.filled, filters)
+        if self.display_quantity is None and due > child.quantity - child.executed + 1e-12:
+            return True # A new slice is due: replace the child with one for the whole amount
+        if self.reprice and self.price_mode not in (None, "market"):
+            price = self._price(bot)
+            return price is not None and abs(price - child.price) > (bot._tick_size(self.symbol) or 0) / 2
+        return False
+
+    def _price(self, bot):
+        if self.price_mode is None:
+            return self.limit_price
+        price = bot.get_book_price(self.symbol, self.side, self.price_mode)
+        if price is not None and self.limit_price is not None:
+            price = min(price, self.limit_price) if self.side == "BUY" else max(price, self.limit_price)
+        return price
+
+    def _place(self, bot, quantity, market, now):
+        if market:
+            order = bot.place_market_order(self.symbol, self.side, quantity)
+        else:
+            price = self._price(bot)
+            order = bot.place_limit_order(self.symbol, self.side, quantity, price) if price is not None else None
+        if not order:
+            self.failures += 1
+            log.warning(f"Algo {self.id}: child order for {quantity} {self.symbol} failed "
+                        f"({self.failures}/{MAX_CHILD_FAILURES}).")
+            return None
+        self.failures = 0
+        child = Child(order, now)
+        self.children.append(child)
+        self.child = child
+        self._update(child, order)
+        return child
+
+    def _refresh(self, bot, child):
+        order = bot.get_order_status(self.symbol, child.order_id)
+        if order:
+            self._update(child, order)
+
+    def _cancel_child(self, bot, child):
+        response = bot.cancel_order(self.symbol, child.order_id)
+        if response:
+            self._update(child, response)
+        else:
+            self._refresh(bot, child) # Most likely filled meanwhile
+
+    def _update(self, child, order):
+        """Folds a child's latest executedQty/avgPrice into the parent's fill state."""
+        executed = float(order.get("executedQty") or 0)
+        avg_price = float(order.get("avgPrice") or 0)
+        if executed > child.executed:
+            self.filled += executed - child.executed
+            self.notional += executed * avg_price - child.executed * child.avg_price
+            child.executed = executed
+            child.avg_price = avg_price
+        child.status = order.get("status", child.status)
+
+    def _filters(self, bot):
+        if getattr(bot, "symbol_rules", None) is None:
+            return None
+        try:
+            return bot.symbol_rules.get(self.symbol)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _round(quantity, filters, market=False):
+        if quantity <= 1e-12:
+            return 0.0
+        return float(filters.round_quantity(quantity, market=market)) if filters is not None else quantity
+
+    @staticmethod
+    def _min_quantity(filters):
+        return float(filters.min_qty) if filters is not None else 0.0
+
+    def _finish(self, status, reason=None):
+        self.status = status
+        self.reason = reason
+        self.child = None
+        log.info(f"Algo {self.id} {status}: filled {self.filled:g}/{self.quantity:g} {self.symbol} "
+                 f"@ {self.avg_price:g} in {len(self.children)} child order(s)" + (f" ({reason})" if reason else ""))
+        self._done.set()
+        return None
+
+
+class TWAP(ParentOrder):
+    algo = "TWAP"
+
+    def __init__(self, symbol, side, quantity, duration, slices=10, **kwargs):
+        """
+        :param duration: Seconds to spread the order over
+        :param slices: Equal slices; one is released every duration / slices seconds
+        """
+        if duration <= 0 or slices < 1:
+            raise ValueError("TWAP needs a positive duration and at least one slice")
+        super().__init__(symbol, side, quantity, duration=duration, interval=duration / slices, **kwargs)
+        self.slices = slices
+        self.weights = [1.0 / slices] * slices
+
+    def _slice_index(self, now):
+        return min(int((now - self.started_at) / self.interval), self.slices - 1)
+
+    def target(self, now):
+        return self.quantity * min(sum(self.weights[:self._slice_index(now) + 1]), 1.0)
+
+    def next_slice(self, now):
+        index = self._slice_index(now)
+        return self.started_at + (index + 1) * self.interval if index + 1 < self.slices else None
+
+
+class VWAP(TWAP):
+    algo = "VWAP"
+
+    def __init__(self, symbol, side, quantity, duration, slices=10, profile=None, profile_days=PROFILE_DAYS,
+                 **kwargs):
+        """
+        :param profile: Relative volume per slice (default: fetched from the last
+                        `profile_days` days of 1m klines for the same time of day)
+        """
+        super().__init__(symbol, side, quantity, duration, slices, **kwargs)
+        self.profile_days = profile_days
+        if profile is not None:
+            self.weights = normalize_profile(profile, slices)
+        self._fetch_profile = profile is None
+
+    def on_start(self, bot, now):
+        if self._fetch_profile:
+            self.weights = normalize_profile(
+                volume_profile(bot, self.symbol, int(now * 1000), self.duration, self.slices, self.profile_days),
+                self.slices)
+            log.info(f"Algo {self.id} VWAP profile: {[round(w, 3) for w in self.weights]}")
+
+
+class Iceberg(ParentOrder):
+    algo = "ICEBERG"
+
+    def __init__(self, symbol, side, quantity, display_quantity, limit_price=None, price_mode="join",
+                 duration=None, reprice=None, finish="cancel", **kwargs):
+        """
+        :param display_quantity: Quantity of each visible child
+        :param limit_price: Fixed price (with price_mode=None) or worst price when pegged to the book
+        :param reprice: Re-peg a resting child when the book moves (default: when pegged)
+        """
+        if display_quantity <= 0:
+            raise ValueError("display_quantity must be positive")
+        if reprice is None:
+            reprice = price_mode is not None
+        if kwargs.get("stale_after") is None:
+            kwargs["stale_after"] = float("inf")
+        super().__init__(symbol, side, quantity, duration=duration, price_mode=price_mode, limit_price=limit_price,
+                         display_quantity=display_quantity, reprice=reprice, finish=finish, **kwargs)
+
+
+def normalize_profile(profile, slices):
+    """Scales a volume profile to `slices` weights summing to 1 (uniform if it is empty)."""
+    profile = [max(float(v), 0.0) for v in profile][:slices]
+    profile += [0.0] * (slices - len(profile))
+    total = sum(profile)
+    if total <= 0:
+        return [1.0 / slices] * slices
+    return [v / total for v in profile]
+
+
+def volume_profile(bot, symbol, start_ms, duration, slices, days=PROFILE_DAYS):
+    """
+    Volume per slice over the same time-of-day window on each of the last `days` days.
+    :return: List of `slices` volumes (empty on error, i.e. fall back to TWAP)
+    """
+    window_ms = int(duration * 1000)
+    slice_ms = window_ms / slices
+    volumes = [0.0] * slices
+    try:
+        for day in range(1, days + 1):
+            begin = start_ms - day * DAY_MS
+            klines = bot._call("futures_klines", symbol=symbol, interval="1m", startTime=begin,
+                               endTime=begin + window_ms - 1, limit=min(max(window_ms // 60000, 1), 1500))
+            for k in klines:
+                index = int((int(k[0]) - begin) // slice_ms)
+                if 0 <= index < slices:
+                    volumes[index] += float(k[5])
+    except Exception as e:
+        log.warning(f"Volume profile for {symbol} unavailable, using equal slices: {e}")
+        return []
+    return volumes
+
+
+class AlgoEngine:
+    def __init__(self, bot, workers=DEFAULT_WORKERS, tick=TICK, clock=time.time):
+        """
+        :param bot: BasicBot the children are sent through
+        :param workers: Threads making REST calls for all parents (0: run steps inline in advance())
+        :param tick: Timer wheel resolution in seconds
+        :param clock: Time source in seconds (e.g. a SimulatedExchange clock, with workers=0)
+        """
+        self.bot = bot
+        self.clock = clock
+        self.wheel = TimerWheel(tick, now=clock())
+        self.parents = {} # id -> ParentOrder
+        self.steps = 0
+        self.lags = deque(maxlen=10000) # Seconds each step started after its deadline
+        self._ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AlgoWorker") if workers else None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Starts the timer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="AlgoEngine", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, cancel=True, timeout=10.0):
+        """
+        Stops the engine.
+        :param cancel: Cancel the working child of every active parent first
+        """
+        if cancel:
+            active = [p for p in self.parents.values() if p.active]
+            for parent in active:
+                parent.cancel()
+                self._wake(parent)
+            for parent in active:
+                parent.wait(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.advance()
+            self._stop.wait(self.wheel.tick)
+
+    def advance(self, now=None):
+        """Runs every step due by `now` (default: the clock); the timer thread calls this each tick."""
+        return self.wheel.advance(self.clock() if now is None else now)
+
+    def submit(self, parent: ParentOrder):
+        """Starts working a parent order; returns it (with its id set)."""
+        parent.id = next(self._ids)
+        self.parents[parent.id] = parent
+        self._schedule(parent, self.clock())
+        log.info(f"Algo {parent.id} submitted: {parent.algo} {parent.side} {parent.quantity} {parent.symbol}")
+        return parent
+
+    def cancel(self, parent_id):
+        parent = self.parents.get(parent_id)
+        if parent is None or not parent.active:
+            return False
+        parent.cancel()
+        self._wake(parent)
+        return True
+
+    def _wake(self, parent):
+        """Steps a parent as soon as possible instead of at its next timer."""
+        if self._pool is None:
+            self._step(parent, self.clock())
+        else:
+            self._schedule(parent, self.clock())
+
+    def _schedule(self, parent, deadline):
+        self.wheel.schedule(deadline, self._fire, parent, deadline)
+
+    def _fire(self, parent, deadline):
+        if self._pool is not None:
+            self._pool.submit(self._step, parent, deadline)
+        else:
+            self._step(parent, deadline)
+
+    def _step(self, parent, deadline):
+        if not parent._step_lock.acquire(blocking=False):
+            return # Already being stepped (e.g. an early wake-up from cancel); that step reschedules
+        try:
+            if not parent.active and parent.started_at is not None:
+                return
+            now = self.clock()
+            self.lags.append(now - deadline)
+            with self._stats_lock:
+                self.steps += 1
+            try:
+                delay = parent.step(self.bot, now)
+            except Exception as e:
+                log.error(f"Algo {parent.id} step failed: {e}")
+                parent.failures += 1
+                delay = parent.poll_interval if parent.failures < MAX_CHILD_FAILURES else \
+                    parent._finish("FAILED", f"step error: {e}")
+            if delay is not None:
+                self._schedule(parent, now + delay)
+        finally:
+            parent._step_lock.release()
+
+    def wait(self, timeout=None):
+        """Blocks until every submitted parent is finished; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for parent in list(self.parents.values()):
+            left = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not parent.wait(left):
+                return False
+        return True
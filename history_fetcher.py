@@ -0,0 +1,179 @@
+# history_fetcher.py
+"""
+Downloads historical klines and aggTrades into a MarketStore.
+
+Every (dataset, symbol) pair is one job; a small thread pool runs jobs
+concurrently and every page goes through BasicBot._call, so the bot's shared
+RequestScheduler keeps the whole download under the exchange's request-weight
+limit (a 1500-kline page weighs 10, an aggTrades page 20) however many
+workers are running.
+
+Jobs resume after the last stored row: klines from its open time plus one
+interval, aggTrades from its aggregate trade ID plus one. Only closed klines
+are stored, so a download cut short or run again later picks up exactly where
+the store ends. The store is append-only: a start time before a series' last
+row does not fill gaps behind it, and one after it leaves a gap.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from binance.exceptions import BinanceAPIException
+
+from logger_setup import log
+from market_store import AGG_TRADES, klines_dataset
+
+DEFAULT_WORKERS = 4
+KLINES_PAGE = 1500 # Most klines per request (weight 10)
+AGG_TRADES_PAGE = 1000 # Most aggTrades per request (weight 20)
+AGG_TRADES_WINDOW_MS = 3600000 # startTime/endTime may be at most one hour apart for aggTrades
+MAX_RETRIES = 5 # Consecutive failed pages before a job gives up (rerun to resume)
+RETRY_DELAY = 1.0 # Seconds, doubled after every failure
+INTERVAL_MS = {"m": 60000, "h": 3600000, "d": 86400000, "w": 604800000}
+
+
+def interval_ms(interval):
+    """Length of a kline interval such as '1m', '4h' or '1d' in milliseconds."""
+    try:
+        return int(interval[:-1]) * INTERVAL_MS[interval[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported kline interval: {interval}")
+
+
+def kline_columns(rows):
+    """REST kline rows -> store columns."""
+    return {
+        "open_time": np.array([r[0] for r in rows], dtype=np.int64),
+        "open": np.array([r[1] for r in rows], dtype=np.float64),
+        "high": np.array([r[2] for r in rows], dtype=np.float64),
+        "low": np.array([r[3] for r in rows], dtype=np.float64),
+        "close": np.array([r[4] for r in rows], dtype=np.float64),
+        "volume": np.array([r[5] for r in rows], dtype=np.float64),
+        "quote_volume": np.array([r[7] for r in rows], dtype=np.float64),
+        "trades": np.array([r[8] for r in rows], dtype=np.int64),
+        "taker_buy_volume": np.array([r[9] for r in rows], dtype=np.float64),
+    }
+
+
+def agg_trade_columns(trades):
+    """REST aggTrades -> store columns."""
+    return {
+        "agg_id": np.array([t["a"] for t in trades], dtype=np.int64),
+        "time": np.array([t["T"] for t in trades], dtype=np.int64),
+        "price": np.array([t["p"] for t in trades], dtype=np.float64),
+        "quantity": np.array([t["q"] for t in trades], dtype=np.float64),
+        "first_id": np.array([t["f"] for t in trades], dtype=np.int64),
+        "last_id": np.array([t["l"] for t in trades], dtype=np.int64),
+        "buyer_maker": np.array([t["m"] for t in trades], dtype=bool),
+    }
+
+
+class HistoryFetcher:
+    def __init__(self, bot, store, workers=DEFAULT_WORKERS):
+        """
+        :param bot: BasicBot whose client and rate-limit scheduler the requests go through
+        :param store: MarketStore the rows are appended to
+        :param workers: Jobs downloaded concurrently
+        """
+        self.bot = bot
+        self.store = store
+        self.workers = workers
+
+    def fetch(self, symbols, start, end=None, intervals=("1m",), agg_trades=False):
+        """
+        Downloads klines for every interval (and aggTrades if asked) of every
+        symbol between start and end.
+        :param start: First time in ms
+        :param end: End time in ms, exclusive (default: now)
+        :return: One summary dict per job: dataset, symbol, rows, pages, seconds, error
+        """
+        end = end if end is not None else int(time.time() * 1000)
+        for interval in intervals:
+            interval_ms(interval) # Reject a bad interval before any download starts
+        jobs = [(klines_dataset(interval), symbol.upper()) for symbol in symbols for interval in intervals]
+        if agg_trades:
+            jobs += [(AGG_TRADES, symbol.upper()) for symbol in symbols]
+        log.info(f"Fetching {len(jobs)} series from {start} to {end} with {self.workers} worker(s)")
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="HistoryFetch") as pool:
+            return list(pool.map(lambda job: self._run(job[0], job[1], start, end), jobs))
+
+    def _run(self, dataset, symbol, start, end):
+        summary = {"dataset": dataset, "symbol": symbol, "rows": 0, "pages": 0, "seconds": 0.0, "error": None}
+        began = time.perf_counter()
+        try:
+            if dataset == AGG_TRADES:
+                self._fetch_agg_trades(symbol, start, end, summary)
+            else:
+                self._fetch_klines(symbol, dataset[len("klines_"):], start, end, summary)
+        except Exception as e:
+            summary["error"] = str(e)
+            log.error(f"Fetching {dataset} {symbol} stopped after {summary['rows']} rows: {e}. "
+                      f"Run the fetch again to resume.")
+        summary["seconds"] = time.perf_counter() - began
+        log.info(f"Fetched {summary['rows']} {dataset} rows for {symbol} in {summary['pages']} pages "
+                 f"({summary['seconds']:.1f}s)")
+        return summary
+
+    def _page(self, endpoint, **params):
+        """One request, retried with backoff; rate-limit answers also pause the shared scheduler."""
+        delay = RETRY_DELAY
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self.bot._call(endpoint, **params)
+            except BinanceAPIException as e:
+                if e.status_code < 500 and e.status_code not in (418, 429) or attempt == MAX_RETRIES - 1:
+                    raise
+                log.warning(f"{endpoint} {params.get('symbol')} failed ({e.status_code}), retrying in {delay:.0f}s")
+            except Exception as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                log.warning(f"{endpoint} {params.get('symbol')} failed ({e}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+            delay *= 2
+
+    def _fetch_klines(self, symbol, interval, start, end, summary):
+        dataset, step = klines_dataset(interval), interval_ms(interval)
+        last = self.store.last_time(dataset, symbol)
+        cursor = max(start, last + step) if last is not None else start
+        while cursor < end:
+            rows = self._page("futures_klines", symbol=symbol, interval=interval, startTime=cursor,
+                              endTime=end - 1, limit=KLINES_PAGE)
+            summary["pages"] += 1
+            now = int(time.time() * 1000)
+            complete = [r for r in rows if r[0] < end and r[6] < now] # Never store a candle still open
+            if complete:
+                summary["rows"] += self.store.append(dataset, symbol, kline_columns(complete))
+            if len(rows) < KLINES_PAGE or len(complete) < len(rows):
+                break
+            cursor = rows[-1][0] + step
+
+    def _first_agg_trade_id(self, symbol, start, end, summary):
+        """ID of the first aggregate trade at or after start, found by one-hour windows; None if none before end."""
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + AGG_TRADES_WINDOW_MS, end) - 1
+            trades = self._page("futures_aggregate_trades", symbol=symbol, startTime=window_start,
+                                endTime=window_end, limit=1)
+            summary["pages"] += 1
+            if trades:
+                return trades[0]["a"]
+            window_start = window_end + 1
+        return None
+
+    def _fetch_agg_trades(self, symbol, start, end, summary):
+        last_time = self.store.last_time(AGG_TRADES, symbol)
+        if last_time is not None and last_time >= end - 1:
+            return
+        if last_time is not None and last_time >= start:
+            from_id = self.store.last_value(AGG_TRADES, symbol, "agg_id") + 1
+        else:
+            from_id = self._first_agg_trade_id(symbol, start, end, summary)
+        while from_id is not None:
+            trades = self._page("futures_aggregate_trades", symbol=symbol, fromId=from_id, limit=AGG_TRADES_PAGE)
+            summary["pages"] += 1
+            in_range = [t for t in trades if t["T"] < end]
+            if in_range:
+                summary["rows"] += self.store.append(AGG_TRADES, symbol, agg_trade_columns(in_range))
+            if len(trades) < AGG_TRADES_PAGE or len(in_range) < len(trades):
+                break
+            from_id = trades[-1]["a"] + 1
@@ -0,0 +1,511 @@
+# indicators.py
+"""
+Strategy support: technical indicators over NumPy kline arrays, a ring-buffer
+kline store per symbol, and signals that map onto BasicBot.place_*_order.
+
+Every indicator comes in two forms that produce the same numbers:
+
+    batch        sma(), ema(), rsi(), atr(), bollinger(), vwap(), zscore()
+                 vectorized over whole arrays (history, backtests)
+    incremental  SMA, EMA, RSI, ATR, Bollinger, VWAP, ZScore
+                 O(1) update() per new bar (live streams)
+
+Values are NaN until an indicator has seen enough bars. EMA-type indicators
+are seeded with the simple mean of their first `period` inputs; RSI and ATR
+use Wilder smoothing (alpha = 1/period); standard deviations are population
+(ddof=0), as in the usual Bollinger Band definition.
+
+    def ema_cross():
+        fast, slow = EMA(9), EMA(21)
+        return {"fast": fast, "slow": slow, "cross": Crossover(fast, slow)}
+
+    store = KlineStore(indicators=ema_cross)
+    values = store.on_kline_event(event) # Kline websocket payload; indicators update on closed bars
+    if values and values["cross"] > 0:
+        execute_signal(bot, Signal(event["s"], "BUY", "MARKET", 0.01, reason="EMA 9/21 cross up"))
+"""
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+
+from backtest import KLINE_COLUMNS, KLINE_DTYPES, Klines
+from logger_setup import log
+
+_NAN = float("nan")
+EWM_BLOCK = 4096 # Max bars per closed-form block in the vectorized EMA recursion
+ROLLING_CHUNK = 1 << 18 # Rows per sliding-window chunk for rolling standard deviations
+PREFIX_SUM_CHUNK = 4096 # Bars per restarted prefix sum in rolling_sum()
+
+
+# --- Batch (vectorized) ---
+def _ewm(values, alpha, start, seed):
+    """
+    y[start] = seed, y[t] = y[t-1] + alpha * (x[t] - y[t-1]) afterwards; NaN before `start`.
+    The recursion is evaluated a block at a time in closed form,
+    y[j] = d^j * (prev + alpha * sum_{i<=j} x[i] * d^-i) with d = 1 - alpha,
+    with blocks short enough that d^-i stays far from overflow.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if start >= len(x):
+        return out
+    out[start] = seed
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[start + 1:] = x[start + 1:]
+        return out
+    block = max(1, min(EWM_BLOCK, int(150 / -math.log10(decay))))
+    exponents = np.arange(1, block + 1)
+    powers = decay ** exponents
+    inverse = decay ** -exponents
+    prev = seed
+    for i in range(start + 1, len(x), block):
+        chunk = x[i:i + block]
+        m = len(chunk)
+        y = powers[:m] * (prev + alpha * np.cumsum(chunk * inverse[:m]))
+        out[i:i + m] = y
+        prev = y[-1]
+    return out
+
+
+def rolling_sum(values, period):
+    """Sum over the last `period` values (NaN for the first period - 1)."""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    # Prefix sums restart every chunk so their magnitude (and rounding error) stays bounded
+    chunk = max(PREFIX_SUM_CHUNK, period)
+    for i in range(period - 1, len(x), chunk):
+        sums = np.cumsum(np.concatenate(([0.0], x[i - period + 1:i + chunk])))
+        out[i:i + len(sums) - period] = sums[period:] - sums[:-period]
+    return out
+
+
+def sma(values, period):
+    return rolling_sum(values, period) / period
+
+
+def ema(values, period):
+    x = np.asarray(values, dtype=np.float64)
+    if len(x) < period:
+        return np.full(len(x), np.nan)
+    return _ewm(x, 2.0 / (period + 1), period - 1, float(x[:period].mean()))
+
+
+def rsi(close, period=14):
+    """Wilder RSI; the first value is at index `period`."""
+    c = np.asarray(close, dtype=np.float64)
+    out = np.full(len(c), np.nan)
+    if len(c) <= period:
+        return out
+    delta = np.diff(c)
+    gains = np.maximum(delta, 0.0)
+    losses = np.maximum(-delta, 0.0)
+    alpha = 1.0 / period
+    avg_gain = _ewm(gains, alpha, period - 1, float(gains[:period].mean()))[period - 1:]
+    avg_loss = _ewm(losses, alpha, period - 1, float(losses[:period].mean()))[period - 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[period:] = np.where(avg_loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return out
+
+
+def true_range(high, low, close):
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    tr = h - l
+    if len(c) > 1:
+        prev = c[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(h[1:] - prev), np.abs(l[1:] - prev)))
+    return tr
+
+
+def atr(high, low, close, period=14):
+    """Wilder ATR; the first value is at index period - 1."""
+    tr = true_range(high, low, close)
+    if len(tr) < period:
+        return np.full(len(tr), np.nan)
+    return _ewm(tr, 1.0 / period, period - 1, float(tr[:period].mean()))
+
+
+def rolling_mean_std(values, period):
+    """Rolling mean and population standard deviation (NaN for the first period - 1 bars)."""
+    x = np.asarray(values, dtype=np.float64)
+    mean = np.full(len(x), np.nan)
+    std = np.full(len(x), np.nan)
+    if len(x) < period:
+        return mean, std
+    windows = np.lib.stride_tricks.sliding_window_view(x, period)
+    # Two-pass per window (no sum-of-squares cancellation), chunked to bound the temporaries
+    for i in range(0, len(windows), ROLLING_CHUNK):
+        chunk = windows[i:i + ROLLING_CHUNK]
+        m = chunk.mean(axis=1)
+        mean[period - 1 + i:period - 1 + i + len(chunk)] = m
+        std[period - 1 + i:period - 1 + i + len(chunk)] = np.sqrt(((chunk - m[:, None]) ** 2).mean(axis=1))
+    return mean, std
+
+
+def bollinger(close, period=20, k=2.0):
+    """:return: (middle, upper, lower) bands"""
+    mid, std = rolling_mean_std(close, period)
+    return mid, mid + k * std, mid - k * std
+
+
+def zscore(values, period=20):
+    """(x - rolling mean) / rolling std; NaN where the window is flat."""
+    x = np.asarray(values, dtype=np.float64)
+    mean, std = rolling_mean_std(x, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0.0, (x - mean) / std, np.nan)
+
+
+def vwap(high, low, close, volume, period=None):
+    """
+    Volume-weighted typical price ((high + low + close) / 3).
+    :param period: Rolling window in bars (None: cumulative from the first bar)
+    """
+    tp = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+          + np.asarray(close, dtype=np.float64)) / 3.0
+    v = np.asarray(volume, dtype=np.float64)
+    if period is None:
+        pv, cv = np.cumsum(tp * v), np.cumsum(v)
+    else:
+        pv, cv = rolling_sum(tp * v, period), rolling_sum(v, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cv > 0.0, pv / cv, np.nan)
+
+
+def crossover(fast, slow):
+    """+1 where `fast` crosses above `slow`, -1 where it crosses below, else 0."""
+    diff = np.sign(np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64))
+    out = np.zeros(len(diff), dtype=np.int8)
+    prev, cur = diff[:-1], diff[1:]
+    out[1:][(prev < 0) & (cur > 0)] = 1
+    out[1:][(prev > 0) & (cur < 0)] = -1
+    return out
+
+
+# --- Incremental (O(1) per bar) ---
+class Indicator:
+    value = _NAN
+
+    def update(self, x):
+        raise NotImplementedError
+
+    def update_bar(self, open, high, low, close, volume):
+        """Feeds one closed kline; close-based indicators use the close."""
+        return self.update(close)
+
+
+class SMA(Indicator):
+    def __init__(self, period):
+        self.period = period
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+        self._since_resync = 0
+
+    def update(self, x):
+        window = self._window
+        if len(window) == self.period:
+            self._sum -= window[0]
+        window.append(x)
+        self._sum += x
+        self._since_resync += 1
+        if self._since_resync >= self.period: # Bound float drift of the running sum (amortized O(1))
+            self._sum = math.fsum(window)
+            self._since_resync = 0
+        if len(window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+
+class EMA(Indicator):
+    def __init__(self, period, alpha=None):
+        """
+        :param alpha: Smoothing factor (default 2 / (period + 1); Wilder uses 1 / period)
+        """
+        self.period = period
+        self.alpha = 2.0 / (period + 1) if alpha is None else alpha
+        self._count = 0
+        self._seed_sum = 0.0
+
+    def update(self, x):
+        if self._count < self.period:
+            self._count += 1
+            self._seed_sum += x
+            if self._count == self.period:
+                self.value = self._seed_sum / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RSI(Indicator):
+    def __init__(self, period=14):
+        self.period = period
+        self._prev = None
+        self._gain = EMA(period, alpha=1.0 / period)
+        self._loss = EMA(period, alpha=1.0 / period)
+
+    def update(self, x):
+        if self._prev is not None:
+            delta = x - self._prev
+            gain = self._gain.update(delta if delta > 0.0 else 0.0)
+            loss = self._loss.update(-delta if delta < 0.0 else 0.0)
+            if loss == 0.0:
+                self.value = 100.0
+            elif loss == loss: # Not NaN (warmed up)
+                self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        self._prev = x
+        return self.value
+
+
+class ATR(Indicator):
+    def __init__(self, period=14):
+        self.period = period
+        self._prev_close = None
+        self._smooth = EMA(period, alpha=1.0 / period)
+
+    def update_bar(self, open, high, low, close, volume):
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = self._smooth.update(tr)
+        return self.value
+
+    def update(self, x):
+        raise TypeError("ATR needs high/low/close; use update_bar()")
+
+
+class _RollingStats:
+    """Sliding-window mean and population variance with Welford-style add/remove updates."""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._since_resync = 0
+
+    def push(self, x):
+        window = self.window
+        if len(window) < self.period:
+            window.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(window)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = window[0]
+            window.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.period
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            self._since_resync += 1
+            if self._since_resync >= self.period: # Recompute exactly once per window to bound drift
+                self.mean = math.fsum(window) / self.period
+                self.m2 = math.fsum((v - self.mean) ** 2 for v in window)
+                self._since_resync = 0
+        return len(window) == self.period
+
+    @property
+    def std(self):
+        return math.sqrt(max(self.m2, 0.0) / self.period)
+
+
+class Bollinger(Indicator):
+    value = (_NAN, _NAN, _NAN)
+
+    def __init__(self, period=20, k=2.0):
+        self.k = k
+        self._stats = _RollingStats(period)
+
+    def update(self, x):
+        if self._stats.push(x):
+            mid, std = self._stats.mean, self._stats.std
+            self.value = (mid, mid + self.k * std, mid - self.k * std)
+        return self.value
+
+
+class ZScore(Indicator):
+    def __init__(self, period=20):
+        self._stats = _RollingStats(period)
+
+    def update(self, x):
+        if self._stats.push(x):
+            std = self._stats.std
+            self.value = (x - self._stats.mean) / std if std > 0.0 else _NAN
+        return self.value
+
+
+class VWAP(Indicator):
+    def __init__(self, period=None):
+        """
+        :param period: Rolling window in bars (None: cumulative)
+        """
+        self.period = period
+        self._window = deque(maxlen=period) if period else None
+        self._pv = 0.0
+        self._volume = 0.0
+
+    def update_bar(self, open, high, low, close, volume):
+        pv = (high + low + close) / 3.0 * volume
+        window = self._window
+        if window is not None:
+            if len(window) == self.period:
+                old_pv, old_volume = window[0]
+                self._pv -= old_pv
+                self._volume -= old_volume
+            window.append((pv, volume))
+        self._pv += pv
+        self._volume += volume
+        if (window is None or len(window) == self.period) and self._volume > 0.0:
+            self.value = self._pv / self._volume
+        return self.value
+
+    def update(self, x):
+        raise TypeError("VWAP needs high/low/close/volume; use update_bar()")
+
+
+class Crossover(Indicator):
+    """+1 on the bar where `fast` crosses above `slow`, -1 when it crosses below, else 0."""
+    value = 0
+
+    def __init__(self, fast: Indicator = None, slow: Indicator = None):
+        """
+        :param fast, slow: Indicators to follow in update_bar() (registered before this one in a
+                           KlineStore); call update(fast_value, slow_value) directly otherwise
+        """
+        self.fast = fast
+        self.slow = slow
+        self._prev_sign = 0
+
+    def update_bar(self, open, high, low, close, volume):
+        return self.update(self.fast.value, self.slow.value)
+
+    def update(self, fast, slow=None):
+        diff = fast - slow
+        sign = 1 if diff > 0 else -1 if diff < 0 else 0 # NaN (warming up) counts as 0
+        self.value = sign if self._prev_sign == -sign else 0
+        self._prev_sign = sign
+        return self.value
+
+
+# --- Kline store ---
+class KlineRing:
+    """
+    Fixed-capacity kline history for one symbol. Every column is written
+    twice (at i and i + capacity), so the latest n bars are always a
+    contiguous NumPy view and appends never copy.
+    """
+
+    def __init__(self, symbol, capacity=1000):
+        self.symbol = symbol
+        self.capacity = capacity
+        self._columns = {c: np.zeros(2 * capacity, dtype=KLINE_DTYPES[c]) for c in KLINE_COLUMNS}
+        self._head = 0 # Next slot to write
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def last_open_time(self):
+        return int(self._columns["open_time"][self._head - 1]) if self._count else None
+
+    def append(self, open_time, open, high, low, close, volume):
+        """
+        Adds a bar, or overwrites the latest one if it has the same open time (an in-progress kline update).
+        :return: True if a new bar was added
+        """
+        last = self.last_open_time
+        if last is not None and open_time <= last:
+            if open_time < last:
+                log.debug(f"Ignoring out-of-order {self.symbol} kline {open_time} (latest {last})")
+                return False
+            slot, added = (self._head - 1) % self.capacity, False
+        else:
+            slot, added = self._head, True
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        for column, value in zip(KLINE_COLUMNS, (open_time, open, high, low, close, volume)):
+            data = self._columns[column]
+            data[slot] = data[slot + self.capacity] = value
+        return added
+
+    def array(self, column, n=None):
+        """The latest n values of a column, oldest first (a view into the buffer)."""
+        n = self._count if n is None else min(n, self._count)
+        end = (self._head - 1) % self.capacity + self.capacity + 1
+        return self._columns[column][end - n:end]
+
+    def klines(self, n=None):
+        """The latest n bars as a Klines of views, for the batch indicator functions."""
+        return Klines(self.symbol, *(self.array(c, n) for c in KLINE_COLUMNS))
+
+
+class KlineStore:
+    def __init__(self, capacity=1000, indicators=None):
+        """
+        :param capacity: Bars of history kept per symbol
+        :param indicators: Callable returning a fresh {name: Indicator} for each new symbol;
+                           they are updated once per closed bar
+        """
+        self.capacity = capacity
+        self.indicators_factory = indicators
+        self.rings = {}
+        self.indicators = {}
+        self._last_closed = {} # symbol -> open time of the last bar fed to the indicators
+
+    def ring(self, symbol):
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = KlineRing(symbol, self.capacity)
+            self.indicators[symbol] = self.indicators_factory() if self.indicators_factory else {}
+        return ring
+
+    def on_kline(self, symbol, open_time, open, high, low, close, volume, closed=True):
+        """
+        Records a kline (closed or in progress).
+        :return: {name: value} of the symbol's indicators after a newly closed bar, else None
+        """
+        self.ring(symbol).append(open_time, open, high, low, close, volume)
+        if not closed or open_time <= self._last_closed.get(symbol, -1):
+            return None
+        self._last_closed[symbol] = open_time
+        indicators = self.indicators[symbol]
+        for indicator in indicators.values():
+            indicator.update_bar(open, high, low, close, volume)
+        return self.values(symbol)
+
+    def on_kline_event(self, event):
+        """Applies a kline websocket payload ({"e": "kline", "s": ..., "k": {...}})."""
+        k = event["k"]
+        return self.on_kline(event["s"], int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]),
+                             float(k["c"]), float(k["v"]), closed=bool(k["x"]))
+
+    def values(self, symbol):
+        return {name: indicator.value for name, indicator in self.indicators.get(symbol, {}).items()}
+
+
+# --- Signals ---
+Signal = namedtuple("Signal", "symbol side order_type quantity price stop_price reason",
+                    defaults=(None, None, ""))
+Signal.__doc__ = "An order to place: order_type is MARKET, LIMIT or STOP_LIMIT."
+
+
+def execute_signal(bot, signal: Signal):
+    """
+    Places a signal's order through the matching BasicBot.place_*_order method.
+    :return: Order response, or None if the order failed (already logged by the bot)
+    """
+    log.info(f"Signal {signal.side} {signal.quantity} {signal.symbol} ({signal.order_type}): {signal.reason}")
+    order_type = signal.order_type.upper().replace("-", "_")
+    if order_type == "MARKET":
+        return bot.place_market_order(signal.symbol, signal.side, signal.quantity)
+    if order_type == "LIMIT":
+        return bot.place_limit_order(signal.symbol, signal.side, signal.quantity, signal.price)
+    if order_type == "STOP_LIMIT":
+        return bot.place_stop_limit_order(signal.symbol, signal.side, signal.quantity, signal.price, signal.stop_price)
+    log.error(f"Unsupported signal order type: {signal.order_type}")
+    return None
@@ -0,0 +1,544 @@
+# ledger.py
+"""
+Local position and PnL ledger, updated incrementally from fills.
+
+Every order the bot sees (create/cancel/status responses, open-order lists
+and ORDER_TRADE_UPDATE events of the user-data stream) is folded in by its
+cumulative executedQty/avgPrice: the part not seen before is one fill,
+applied to the symbol's position in O(1) (size, average entry, realized PnL,
+fees). The same fill reported twice, by a REST response and a stream event,
+is applied once. Unrealized PnL, margin in use and a cross-margin
+liquidation-price estimate are derived from the positions and the latest
+mark (live order book mid when market data is streamed, else the last fill
+or reconcile price).
+
+The ledger lives in memory, is snapshotted to a JSON file so one-off CLI
+runs can answer `positions`/`pnl` without REST, and is periodically
+reconciled against futures_position_information/futures_account_balance to
+catch drift (fills the process never saw, funding, transfers). Several
+processes may share one snapshot (a daemon, cron runs, router workers): each
+save takes a file lock and first folds in the fills other processes wrote.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from logger_setup import log
+
+LEDGER_SNAPSHOT_PATH = "ledger_{owner}.json" # One file per account
+MARGIN_ASSET = "USDT"
+DEFAULT_LEVERAGE = 20 # The exchange default until set_leverage or a reconcile says otherwise
+MAINTENANCE_MARGIN_RATE = 0.004 # First-tier rate; the exchange's brackets rise with notional
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0004
+SNAPSHOT_INTERVAL = 10.0
+RECONCILE_INTERVAL = 60.0
+MAX_CLOSED_ORDERS = 10000 # Finished orders remembered so late duplicates are not re-applied
+QTY_TOLERANCE = 1e-9
+FINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+
+class Position:
+    __slots__ = ("symbol", "qty", "entry", "realized", "fees", "leverage", "mark", "mark_time", "fills")
+
+    def __init__(self, symbol, leverage=DEFAULT_LEVERAGE):
+        self.symbol = symbol
+        self.qty = 0.0 # Signed: positive long, negative short
+        self.entry = 0.0
+        self.realized = 0.0
+        self.fees = 0.0
+        self.leverage = leverage
+        self.mark = 0.0
+        self.mark_time = 0.0
+        self.fills = 0
+
+    def apply_fill(self, signed_qty, price):
+        """Applies one fill; returns the PnL it realized."""
+        realized = 0.0
+        if self.qty == 0.0 or self.qty * signed_qty > 0:
+            total = self.qty + signed_qty
+            self.entry = (self.qty * self.entry + signed_qty * price) / total
+            self.qty = total
+        else:
+            closed = min(abs(self.qty), abs(signed_qty))
+            realized = closed * (price - self.entry) * (1 if self.qty > 0 else -1)
+            remaining = self.qty + signed_qty
+            if abs(remaining) <= QTY_TOLERANCE:
+                remaining = 0.0
+                self.entry = 0.0
+            elif remaining * self.qty < 0: # Flipped sides; the rest opens at the fill price
+                self.entry = price
+            self.qty = remaining
+        self.realized += realized
+        self.fills += 1
+        return realized
+
+    def unrealized(self):
+        return self.qty * (self.mark - self.entry) if self.qty and self.mark else 0.0
+
+    def notional(self):
+        return abs(self.qty) * (self.mark or self.entry)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PositionLedger:
+    def __init__(self, path=None, margin_asset=MARGIN_ASSET, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE,
+                 maintenance_margin_rate=MAINTENANCE_MARGIN_RATE, mark_source=None):
+        """
+        :param path: Snapshot file (loaded now if it exists); None keeps the ledger in memory only
+        :param margin_asset: Asset PnL, fees and margin are counted in
+        :param maker_fee: Fee rate assumed for fills seen after the order rested
+        :param taker_fee: Fee rate assumed for market orders and fills in the create response
+        :param maintenance_margin_rate: Rate used for liquidation-price estimates
+        :param mark_source: Optional callable(symbol) -> live mark price or None
+        """
+        self.path = path
+        self.margin_asset = margin_asset
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.mark_source = mark_source
+        self.positions = {} # symbol -> Position
+        self.wallet = None # Margin-asset wallet balance; None until a reconcile or snapshot provides it
+        self.balances = {} # asset -> last REST balance dict, for get_account_balance
+        self.balance_time = 0.0
+        self.wallet_change = 0.0 # Realized PnL - fees + other balance changes since balance_time
+        self._balance_basis = (0.0, 0.0) # (unrealized PnL, margin in use) at balance_time
+        self.funding = 0.0
+        self.fees = 0.0
+        self.realized = 0.0
+        self.last_reconcile = 0.0
+        self.drifts = 0
+        self.updated = 0.0
+        self._orders = {} # orderId -> [executedQty, cumulative quote, symbol, side, time applied] seen so far
+        self._closed = OrderedDict() # orderId -> None, oldest first
+        self._dirty = False
+        self._disk_version = None # mtime_ns of the snapshot as last read or written here
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+        if path:
+            atexit.register(self.save) # Keep the fills of a one-off run
+
+    def position(self, symbol):
+        position = self.positions.get(symbol)
+        if position is None:
+            position = self.positions[symbol] = Position(symbol)
+        return position
+
+    # --- Fills ---
+    def apply_fill(self, symbol, side, qty, price, fee=None, taker=True):
+        """
+        Applies one fill in O(1).
+        :param side: "BUY" or "SELL"
+        :param fee: Commission in the margin asset, or None to estimate it from the fee rates
+        :param taker: Which fee rate the estimate uses
+        """
+        with self._lock:
+            self._apply_fill(symbol, side, qty, price, fee, taker)
+
+    def _apply_fill(self, symbol, side, qty, price, fee, taker):
+        position = self.position(symbol)
+        if price <= 0: # Some responses carry no price; the position still changes
+            price = position.mark or position.entry
+            if price <= 0:
+                log.warning(f"Ledger: {side} {qty} {symbol} fill without a price; left for the reconcile.")
+                return
+        realized = position.apply_fill(qty if side == "BUY" else -qty, price)
+        if fee is None:
+            fee = qty * price * (self.taker_fee if taker else self.maker_fee)
+        position.fees += fee
+        position.mark = price
+        position.mark_time = time.time()
+        self.realized += realized
+        self.fees += fee
+        self.wallet_change += realized - fee
+        if self.wallet is not None:
+            self.wallet += realized - fee
+        self.updated = position.mark_time
+        self._dirty = True
+
+    def _fill_delta(self, order_id, executed, quote, symbol, side):
+        """Returns (qty, price) of the part of an order not applied yet, or None."""
+        seen = self._orders.get(order_id)
+        if seen is None:
+            seen = self._orders[order_id] = [0.0, 0.0, symbol, side, 0.0]
+        qty = executed - seen[0]
+        if qty <= QTY_TOLERANCE:
+            return None
+        price = (quote - seen[1]) / qty
+        seen[0], seen[1], seen[4] = executed, quote, time.time()
+        return qty, price
+
+    def _finish_order(self, order_id, status):
+        if status in FINAL_STATUSES:
+            if order_id not in self._closed:
+                self._closed[order_id] = None
+                while len(self._closed) > MAX_CLOSED_ORDERS:
+                    evicted, _ = self._closed.popitem(last=False)
+                    self._orders.pop(evicted, None)
+
+    def apply_order(self, order, created=False):
+        """
+        Applies whatever an order response shows as executed beyond what was seen before.
+        :param order: Order dict in the REST shape (executedQty, avgPrice, status, ...)
+        :param created: The response of the create request (its fills took liquidity)
+        """
+        if not isinstance(order, dict) or "orderId" not in order:
+            return
+        executed = float(order.get("executedQty") or 0)
+        if executed <= 0 and order.get("status") not in FINAL_STATUSES:
+            return
+        avg_price = float(order.get("avgPrice") or 0) or float(order.get("price") or 0)
+        quote = float(order.get("cumQuote") or 0) or executed * avg_price
+        taker = created or order.get("type") not in ("LIMIT",)
+        with self._lock:
+            delta = (self._fill_delta(order["orderId"], executed, quote, order["symbol"], order["side"])
+                     if executed > 0 else None)
+            if delta:
+                self._apply_fill(order["symbol"], order["side"], delta[0], delta[1], None, taker)
+            self._finish_order(order["orderId"], order.get("status"))
+
+    def apply_event(self, event):
+        """Applies one user-data stream event (ORDER_TRADE_UPDATE fills, ACCOUNT_UPDATE balance changes)."""
+        event_type = event.get("e")
+        if event_type == "ORDER_TRADE_UPDATE":
+            o = event["o"]
+            executed = float(o.get("z") or 0)
+            with self._lock:
+                if executed > 0:
+                    delta = self._fill_delta(o["i"], executed, executed * float(o.get("ap") or 0), o["s"], o["S"])
+                    if delta:
+                        qty, price = delta
+                        last_qty = float(o.get("l") or 0)
+                        fee = None
+                        if abs(qty - last_qty) <= QTY_TOLERANCE: # Exactly this trade: use its own numbers
+                            price = float(o.get("L") or 0) or price
+                            if o.get("N") == self.margin_asset:
+                                fee = float(o.get("n") or 0)
+                        self._apply_fill(o["s"], o["S"], qty, price, fee, not o.get("m", False))
+                self._finish_order(o["i"], o.get("X"))
+        elif event_type == "ACCOUNT_UPDATE":
+            # "bc" excludes realized PnL and commission, which the fills already carry
+            with self._lock:
+                for b in event["a"].get("B", []):
+                    if b["a"] == self.margin_asset and float(b.get("bc") or 0):
+                        change = float(b["bc"])
+                        if event["a"].get("m") == "FUNDING_FEE":
+                            self.funding += change
+                        self.wallet_change += change
+                        if self.wallet is not None:
+                            self.wallet += change
+                        self._dirty = True
+
+    def set_leverage(self, symbol, leverage):
+        with self._lock:
+            self.position(symbol).leverage = int(leverage)
+            self._dirty = True
+
+    def set_mark(self, symbol, price, when=None):
+        with self._lock:
+            position = self.position(symbol)
+            position.mark = price
+            position.mark_time = when or time.time()
+
+    # --- Reconcile ---
+    def reconcile(self, positions, balances):
+        """
+        Replaces local state with the exchange's: positions from
+        futures_position_information, wallet from futures_account_balance.
+        Differences are logged as drift.
+        :return: Number of symbols (and the wallet) that had drifted
+        """
+        drifted = 0
+        now = time.time()
+        with self._lock:
+            remote = {}
+            for p in positions:
+                if p.get("positionSide", "BOTH") != "BOTH": # Hedge mode is not tracked
+                    continue
+                remote[p["symbol"]] = p
+            for symbol in set(remote) | set(s for s, p in self.positions.items() if p.qty):
+                p = remote.get(symbol)
+                position = self.position(symbol)
+                qty = float(p["positionAmt"]) if p else 0.0
+                entry = float(p["entryPrice"]) if p else 0.0
+                if abs(position.qty - qty) > QTY_TOLERANCE or (qty and abs(position.entry - entry) > 1e-8 * entry):
+                    drifted += 1
+                    log.warning(f"Ledger drift on {symbol}: local {position.qty:g} @ {position.entry:g}, "
+                                f"exchange {qty:g} @ {entry:g}")
+                position.qty, position.entry = qty, entry
+                if p:
+                    if p.get("leverage"):
+                        position.leverage = int(float(p["leverage"]))
+                    if float(p.get("markPrice") or 0):
+                        position.mark, position.mark_time = float(p["markPrice"]), now
+            self._set_balances(balances)
+            balance = self.balances.get(self.margin_asset)
+            if balance is not None:
+                wallet = float(balance.get("crossWalletBalance") or balance["balance"])
+                if self.wallet is not None and abs(self.wallet - wallet) > 1e-6:
+                    drifted += 1
+                    log.warning(f"Ledger drift on {self.margin_asset} wallet: local {self.wallet:.8f}, "
+                                f"exchange {wallet:.8f}")
+                self.wallet = wallet
+            self.last_reconcile = now
+            self.drifts += drifted
+            self._dirty = True
+        log.info(f"Ledger reconciled with the exchange: {drifted} drift(s).")
+        return drifted
+
+    # --- Views ---
+    def _mark(self, position):
+        if self.mark_source is not None:
+            live = self.mark_source(position.symbol)
+            if live:
+                position.mark, position.mark_time = live, time.time()
+        return position.mark
+
+    def liquidation_price(self, symbol):
+        """
+        Cross-margin liquidation-price estimate for one position, holding
+        the other positions at their marks; None if flat or unknown.
+        """
+        with self._lock:
+            return self._liquidation_price(symbol, *self._totals())
+
+    def _totals(self):
+        unrealized = maintenance = 0.0
+        for position in self.positions.values():
+            if position.qty:
+                self._mark(position)
+                unrealized += position.unrealized()
+                maintenance += position.notional() * self.maintenance_margin_rate
+        return unrealized, maintenance
+
+    def _liquidation_price(self, symbol, unrealized, maintenance):
+        position = self.positions.get(symbol)
+        if position is None or not position.qty or self.wallet is None:
+            return None
+        qty = position.qty
+        others_upnl = unrealized - position.unrealized()
+        others_maintenance = maintenance - position.notional() * self.maintenance_margin_rate
+        denominator = qty - abs(qty) * self.maintenance_margin_rate
+        if not denominator:
+            return None
+        price = (others_maintenance + qty * position.entry - self.wallet - others_upnl) / denominator
+        return price if price > 0 else None
+
+    def _margin(self):
+        return sum(p.notional() / p.leverage for p in self.positions.values() if p.qty)
+
+    def positions_view(self):
+        """One dict per open position: size, entry, mark, PnL, margin and liquidation estimate."""
+        with self._lock:
+            unrealized, maintenance = self._totals()
+            return [{
+                "symbol": p.symbol, "positionAmt": p.qty, "entryPrice": p.entry, "markPrice": p.mark,
+                "markTime": p.mark_time, "unrealizedPnl": p.unrealized(), "realizedPnl": p.realized,
+                "fees": p.fees, "leverage": p.leverage, "margin": p.notional() / p.leverage,
+                "liquidationPrice": self._liquidation_price(p.symbol, unrealized, maintenance),
+            } for p in sorted(self.positions.values(), key=lambda p: p.symbol) if p.qty]
+
+    def pnl(self):
+        """Account-level totals plus realized/unrealized PnL per symbol traded."""
+        with self._lock:
+            unrealized, maintenance = self._totals()
+            margin = self._margin()
+            equity = self.wallet + unrealized if self.wallet is not None else None
+            return {
+                "realizedPnl": self.realized, "fees": self.fees, "funding": self.funding,
+                "unrealizedPnl": unrealized, "netPnl": self.realized - self.fees + self.funding + unrealized,
+                "wallet": self.wallet, "equity": equity, "marginInUse": margin, "maintenanceMargin": maintenance,
+                "marginRatio": maintenance / equity if equity else None,
+                "lastReconcile": self.last_reconcile, "drifts": self.drifts, "updated": self.updated,
+                "symbols": {p.symbol: {"realizedPnl": p.realized, "unrealizedPnl": p.unrealized(), "fees": p.fees,
+                                       "fills": p.fills}
+                            for p in sorted(self.positions.values(), key=lambda p: p.symbol) if p.fills or p.qty},
+            }
+
+    def balance(self, asset, max_age):
+        """
+        The asset's last REST balance, adjusted by the fills and balance
+        changes applied since (and, for availableBalance, by the change in
+        unrealized PnL and position margin); None if older than max_age seconds.
+        Margin held by open orders placed since is not known here.
+        """
+        with self._lock:
+            balance = self.balances.get(asset)
+            if balance is None or time.time() - self.balance_time > max_age:
+                return None
+            balance = dict(balance)
+            if asset == self.margin_asset:
+                for key in ("balance", "crossWalletBalance"):
+                    if key in balance:
+                        balance[key] = format(float(balance[key]) + self.wallet_change, ".8f")
+                if "availableBalance" in balance:
+                    unrealized, margin = self._totals()[0], self._margin()
+                    available = (float(balance["availableBalance"]) + self.wallet_change
+                                 + unrealized - self._balance_basis[0] - (margin - self._balance_basis[1]))
+                    balance["availableBalance"] = format(available, ".8f")
+            return balance
+
+    def load_balances(self, balances):
+        """Stores a futures_account_balance response for balance() lookups."""
+        with self._lock:
+            self._set_balances(balances)
+            balance = self.balances.get(self.margin_asset)
+            if balance is not None:
+                self.wallet = float(balance.get("crossWalletBalance") or balance["balance"])
+
+    def _set_balances(self, balances):
+        self.balances = {b["asset"]: dict(b) for b in balances}
+        self.balance_time = time.time()
+        self.wallet_change = 0.0
+        self._balance_basis = (self._totals()[0], self._margin())
+
+    # --- Snapshots ---
+    def snapshot(self):
+        with self._lock:
+            return {
+                "saved": time.time(), "wallet": self.wallet, "realized": self.realized, "fees": self.fees,
+                "funding": self.funding, "lastReconcile": self.last_reconcile, "drifts": self.drifts,
+                "updated": self.updated,
+                "positions": {s: p.to_dict() for s, p in self.positions.items() if p.qty or p.fills},
+                "orders": {str(order_id): seen for order_id, seen in self._orders.items()},
+                "closed": list(self._closed),
+            }
+
+    def _disk_changed(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self._disk_version
+        except OSError:
+            return False
+
+    def save(self, force=False):
+        """
+        Writes the snapshot file if anything changed since the last save, here
+        or in another process sharing the file (whose fills are merged in first).
+        """
+        if not self.path or not (self._dirty or force or self._disk_changed()):
+            return False
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX) # Released when the file is closed
+                if self._disk_changed():
+                    self._merge(self._read())
+                    if not (self._dirty or force): # Nothing new here or merged in; the file is current
+                        return False
+                self._dirty = False
+                data = self.snapshot()
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self._disk_version = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self._dirty = True
+            log.warning(f"Could not save ledger snapshot {self.path}: {e}")
+            return False
+        return True
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                version = os.fstat(f.fileno()).st_mtime_ns
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable ledger snapshot {self.path}: {e}")
+            return None
+        self._disk_version = version
+        return data
+
+    def _merge(self, data):
+        """
+        Applies the fills another process recorded in the snapshot and this
+        one has not seen. Fills from before this ledger's last reconcile are
+        only marked as seen: the exchange positions it adopted include them.
+        """
+        if data is None:
+            return
+        merged = 0
+        with self._lock:
+            for order_id, seen in data.get("orders", {}).items():
+                if len(seen) < 5 or not seen[2]: # Written by a version that didn't keep symbol/side
+                    continue
+                executed, quote, symbol, side, applied = seen
+                delta = self._fill_delta(int(order_id), executed, quote, symbol, side)
+                if delta and applied > self.last_reconcile:
+                    self._apply_fill(symbol, side, delta[0], delta[1], None, True)
+                    merged += 1
+            for order_id in data.get("closed", []):
+                self._finish_order(order_id, "FILLED")
+        if merged:
+            log.info(f"Ledger: merged {merged} fill(s) saved by another process into {self.path}.")
+
+    def load(self):
+        data = self._read()
+        if data is None:
+            return
+        with self._lock:
+            self.wallet = data.get("wallet")
+            self.realized = data.get("realized", 0.0)
+            self.fees = data.get("fees", 0.0)
+            self.funding = data.get("funding", 0.0)
+            self.last_reconcile = data.get("lastReconcile", 0.0)
+            self.drifts = data.get("drifts", 0)
+            self.updated = data.get("updated", 0.0)
+            for symbol, fields in data.get("positions", {}).items():
+                position = self.position(symbol)
+                for name, value in fields.items():
+                    if name in Position.__slots__:
+                        setattr(position, name, value)
+            self._orders = {int(order_id): (list(seen) + [None, None, 0.0])[:5]
+                            for order_id, seen in data.get("orders", {}).items()}
+            self._closed = OrderedDict((order_id, None) for order_id in data.get("closed", []))
+        log.info(f"Ledger snapshot loaded: {sum(1 for p in self.positions.values() if p.qty)} open position(s).")
+
+
+class LedgerSync:
+    def __init__(self, bot, ledger, reconcile_interval=RECONCILE_INTERVAL, snapshot_interval=SNAPSHOT_INTERVAL):
+        """
+        Background thread that snapshots the ledger and reconciles it over REST.
+        :param bot: BasicBot whose reconcile_positions() is called
+        :param reconcile_interval: Seconds between REST reconciles (None disables them)
+        :param snapshot_interval: Seconds between snapshot saves (when something changed)
+        """
+        self.bot = bot
+        self.ledger = ledger
+        self.reconcile_interval = reconcile_interval
+        self.snapshot_interval = snapshot_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="LedgerSync", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.ledger.save()
+
+    def _run(self):
+        next_reconcile = time.monotonic() # Start from the exchange's view
+        while not self._stop.is_set():
+            if self.reconcile_interval and time.monotonic() >= next_reconcile:
+                self.bot.reconcile_positions()
+                next_reconcile = time.monotonic() + self.reconcile_interval
+            self.ledger.save()
+            wait = self.snapshot_interval
+            if self.reconcile_interval:
+                wait = min(wait, max(next_reconcile - time.monotonic(), 0.0))
+            self._stop.wait(wait)
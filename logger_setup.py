@@ -1,29 +1,159 @@
 # logger_setup.py
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import re
 import sys
+import time
 
-def setup_logger():
+LOG_FILE = os.getenv("TRADING_BOT_LOG_FILE", "trading_bot.log")
+LOG_LEVEL = os.getenv("TRADING_BOT_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("TRADING_BOT_LOG_FORMAT", "text") # "text" or "json" (compact JSON lines)
+LOG_MAX_BYTES = int(os.getenv("TRADING_BOT_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.getenv("TRADING_BOT_LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("TRADING_BOT_LOG_BACKUPS", 7))
+
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record, for bulk ingestion."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Rotates on a time schedule and also whenever the file exceeds max_bytes.
+    Scheduled rollovers are named <file>.<interval start>, size rollovers
+    within an interval <file>.<interval start>.<n> (n = 1, 2, ...).
+    """
+
+    def __init__(self, filename, max_bytes=0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+        self.sizeMatch = re.compile(self.extMatch.pattern.rstrip("$") + r"(\.\d+)?$", re.ASCII)
+
+    def doRollover(self):
+        if int(time.time()) >= self.rolloverAt:
+            super().doRollover()
+            return
+        # A size rollover keeps the interval's schedule; the interval-dated name is reserved for
+        # the scheduled rollover (which replaces an existing file of that name), so number it
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        start = self.rolloverAt - self.interval
+        stamp = time.strftime(self.suffix, time.gmtime(start) if self.utc else time.localtime(start))
+        n = 1
+        while os.path.exists(self.rotation_filename(f"{self.baseFilename}.{stamp}.{n}")):
+            n += 1
+        self.rotate(self.baseFilename, self.rotation_filename(f"{self.baseFilename}.{stamp}.{n}"))
+        if self.backupCount > 0:
+            for path in self.getFilesToDelete():
+                os.remove(path)
+        if not self.delay:
+            self.stream = self._open()
+
+    def getFilesToDelete(self):
+        """Backups beyond backupCount, oldest first, counting both scheduled and numbered size rollovers."""
+        directory, base = os.path.split(self.baseFilename)
+        prefix = base + "."
+        backups = [os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.startswith(prefix) and self.sizeMatch.match(name[len(prefix):])]
+        if len(backups) <= self.backupCount:
+            return []
+        backups.sort(key=os.path.getmtime)
+        return backups[:len(backups) - self.backupCount]
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            self.stream.seek(0, 2) # Non-posix-compliant platforms may not append
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them, so message interpolation,
+    formatting and I/O all happen on the listener thread. Log arguments are
+    therefore rendered when the record is written, not when it is emitted.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logger(queued=True, level=LOG_LEVEL, log_format=LOG_FORMAT, log_file=LOG_FILE):
+    """
+    Configures the "TradingBot" logger.
+    :param queued: Hand records to a background thread for formatting and I/O
+                   (the calling thread only pays for a queue put)
+    :param level: Logger level; DEBUG adds full request/response payloads
+    :param log_format: "text" for the classic format, "json" for compact JSON lines
+    :param log_file: Rotating log file (rotated daily and at LOG_MAX_BYTES)
+    """
+    global _listener
     logger = logging.getLogger("TradingBot")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(level)
+    logger.propagate = False
 
     # Prevent duplicate handlers if called multiple times
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
     if logger.hasHandlers():
         logger.handlers.clear()
 
+    if log_format == "json":
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     # Console Handler
     ch = logging.StreamHandler(sys.stdout)
     ch.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     ch.setFormatter(formatter)
-    logger.addHandler(ch)
 
     # File Handler
-    fh = logging.FileHandler('trading_bot.log')
+    fh = SizeAndTimeRotatingFileHandler(log_file, max_bytes=LOG_MAX_BYTES, when=LOG_ROTATE_WHEN,
+                                        backupCount=LOG_BACKUP_COUNT, delay=True)
     fh.setLevel(logging.DEBUG) # Log more details to file
     fh.setFormatter(formatter)
-    logger.addHandler(fh)
+
+    if queued:
+        _listener = logging.handlers.QueueListener(queue.SimpleQueue(), ch, fh, respect_handler_level=True)
+        logger.addHandler(_DeferredQueueHandler(_listener.queue))
+        _listener.start()
+    else:
+        logger.addHandler(ch)
+        logger.addHandler(fh)
 
     return logger
 
+
+def flush_logs():
+    """Blocks until every queued record has been written (also runs at exit)."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+atexit.register(lambda: _listener is not None and _listener.stop())
+
 # Get the logger instance
-log = setup_logger()
\ No newline at end of file
+log = setup_logger()
@@ -1,23 +1,85 @@
 # main.py
 import argparse
-from basic_bot import BasicBot
-import config # To load API keys
 from logger_setup import log # Use our configured logger
 import json # For pretty printing dicts
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timezone
+import daemon
+from risk import RiskReject
+# basic_bot/config are imported lazily in create_bot() so that thin-client
+# invocations (--daemon) don't pay for importing python-binance and dotenv.
 
-def print_order_details(order_response):
-    if order_response:
-        print("\n--- Order Details ---")
+def load_orders_file(path, default_symbol):
+    """
+    Reads order specs for batch placement from a CSV (with a header row) or JSONL file.
+    Recognised fields: symbol, side, type, quantity, price, stop_price.
+    Rows without a symbol use the --symbol value.
+    """
+    with open(path, newline='') as f:
+        if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson', '.json'):
+            orders = [json.loads(line) for line in f if line.strip()]
+        else:
+            orders = [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+                      for row in csv.DictReader(f)]
+    for order in orders:
+        order.setdefault('symbol', default_symbol)
+    return orders
+
+def print_batch_results(results, action, out=sys.stdout):
+    ok = sum(1 for r in results if r['success'])
+    print(f"\n--- Batch {action} Results: {ok}/{len(results)} succeeded ---", file=out)
+    for i, result in enumerate(results):
+        if result['success']:
+            order = result['order']
+            print(f"#{i}: OK     orderId={order.get('orderId')} status={order.get('status')}", file=out)
+        else:
+            print(f"#{i}: FAILED code={result['code']} {result['error']}", file=out)
+
+def print_order_details(order_response, out=sys.stdout):
+    if isinstance(order_response, RiskReject):
+        print(f"Order rejected by the pre-trade risk check: {order_response}", file=out)
+    elif order_response:
+        print("\n--- Order Details ---", file=out)
         # Pretty print the JSON response
-        print(json.dumps(order_response, indent=2))
-        print(f"Status: {order_response.get('status')}")
-        print(f"Order ID: {order_response.get('orderId')}")
+        print(json.dumps(order_response, indent=2), file=out)
+        print(f"Status: {order_response.get('status')}", file=out)
+        print(f"Order ID: {order_response.get('orderId')}", file=out)
     else:
-        print("Order placement failed or no response received.")
+        print("Order placement failed or no response received.", file=out)
+
+BOOK_PRICES = ('join', 'improve', 'mid', 'cross') # Limit prices taken from the order book (see BasicBot.get_book_price)
 
-def main():
-    parser = argparse.ArgumentParser(description="Simplified Binance Futures Trading Bot")
+def limit_price(value):
+    """argparse type for limit prices: a number, or a book pricing mode."""
+    if value.lower() in BOOK_PRICES:
+        return value.lower()
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a price or one of: {', '.join(BOOK_PRICES)}")
+
+def history_time(value):
+    """Milliseconds since the epoch, or an ISO date/datetime (UTC unless it has an offset)."""
+    if value.isdigit():
+        return int(value)
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected milliseconds or an ISO date such as 2024-01-01 or 2024-01-01T12:00")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+def build_parser():
+    # Usage, help and errors of commands run by the daemon go back to its client
+    parser = daemon.DaemonArgumentParser(description="Simplified Binance Futures Trading Bot")
     parser.add_argument('--symbol', type=str, default="BTCUSDT", help="Trading symbol (e.g., BTCUSDT)")
+    parser.add_argument('--daemon', action='store_true', help="Forward the command to a running 'serve' daemon")
+    parser.add_argument('--socket', type=str, default=daemon.DEFAULT_SOCKET_PATH,
+                        help=f"Daemon Unix socket path (default: {daemon.DEFAULT_SOCKET_PATH})")
 
     subparsers = parser.add_subparsers(dest='command', help='Sub-command help')
     subparsers.required = True
@@ -31,7 +93,8 @@ def main():
     parser_limit = subparsers.add_parser('limit', help='Place a limit order')
     parser_limit.add_argument('side', type=str, choices=['BUY', 'SELL'], help='Order side (BUY or SELL)')
     parser_limit.add_argument('quantity', type=float, help='Quantity to trade')
-    parser_limit.add_argument('price', type=float, help='Price for the limit order')
+    parser_limit.add_argument('price', type=limit_price,
+                              help=f"Price for the limit order, or one of {', '.join(BOOK_PRICES)} to price it off the order book")
 
     # Stop-Limit order sub-parser (Bonus)
     parser_stop_limit = subparsers.add_parser('stoplimit', help='Place a stop-limit order')
@@ -59,86 +122,530 @@ def main():
     parser_leverage = subparsers.add_parser('leverage', help='Set leverage for the symbol')
     parser_leverage.add_argument('leverage', type=int, help='Leverage value (e.g., 5 for 5x)')
 
+    # Batch order placement sub-parser
+    parser_batch = subparsers.add_parser('batch', help='Place orders from a CSV or JSONL file in batches of 5')
+    parser_batch.add_argument('file', type=str, help='CSV (with header) or JSONL file of orders: symbol,side,type,quantity,price,stop_price')
 
-    args = parser.parse_args()
+    # Cancel-all / batch cancel sub-parser
+    parser_cancel_all = subparsers.add_parser('cancelall', help='Cancel all open orders for the symbol, or only the given order IDs')
+    parser_cancel_all.add_argument('order_ids', type=int, nargs='*', help='Order IDs to cancel in batches (default: all open orders)')
+    # Order book sub-parser
+    parser_book = subparsers.add_parser('book', help='Show the order book for the symbol (live if the daemon streams it)')
+    parser_book.add_argument('--depth', type=int, default=10, help='Levels to show per side (default: 10)')
 
-    log.info(f"Starting bot with command: {args.command}")
+    # Metrics sub-parser
+    parser_stats = subparsers.add_parser('stats', help='Show per-endpoint latency/error/weight metrics (most useful with --daemon)')
+    parser_stats.add_argument('--prometheus', action='store_true', help='Print in Prometheus text exposition format')
 
+    # Ledger sub-parsers (answered from the local ledger, no REST call unless --reconcile)
+    ledger_view = argparse.ArgumentParser(add_help=False)
+    ledger_view.add_argument('--reconcile', action='store_true', help='Reconcile the ledger with the exchange first (REST)')
+    subparsers.add_parser('positions', parents=[ledger_view], help='Show open positions from the local ledger')
+    subparsers.add_parser('pnl', parents=[ledger_view], help='Show realized/unrealized PnL and margin from the local ledger')
+
+    # Order journal sub-parser
+    parser_journal = subparsers.add_parser('journal', help='Show journaled orders (client order IDs and last known status)')
+    parser_journal.add_argument('--limit', type=int, default=20, help='Most recent orders to show (default: 20)')
+    parser_journal.add_argument('--unresolved', action='store_true', help='Only orders whose outcome is unknown')
+    parser_journal.add_argument('--reconcile', action='store_true', help='Look unresolved orders up on the exchange first')
+
+    # Pre-trade risk sub-parser
+    parser_risk = subparsers.add_parser('risk', help='Show pre-trade risk state, or engage/release the kill switch')
+    parser_risk.add_argument('action', nargs='?', choices=['status', 'kill', 'resume'], default='status',
+                             help='status (default), kill (refuse every new order) or resume')
+    parser_risk.add_argument('--reason', type=str, default='manual', help='Reason recorded with the kill switch')
+    parser_risk.add_argument('--keep-orders', action='store_true', help='Do not cancel open orders when engaging the kill switch')
+
+    # Market history sub-parser
+    parser_fetch = subparsers.add_parser('fetch', help='Download historical klines/aggTrades into the local market store')
+    parser_fetch.add_argument('symbols', type=str, nargs='?', default=None,
+                              help='Comma-separated symbols (default: --symbol)')
+    parser_fetch.add_argument('--start', type=history_time, default=None,
+                              help='First time: ms or ISO date, UTC (required unless --info)')
+    parser_fetch.add_argument('--end', type=history_time, default=None, help='End time, exclusive (default: now)')
+    parser_fetch.add_argument('--klines', type=str, default='1m',
+                              help="Comma-separated kline intervals (default: 1m, '' for none)")
+    parser_fetch.add_argument('--agg-trades', action='store_true', help='Also download aggregate trades')
+    parser_fetch.add_argument('--store', type=str, default=None,
+                              help='Store directory (default: TRADING_BOT_MARKET_STORE or market_history)')
+    parser_fetch.add_argument('--workers', type=int, default=4, help='Series downloaded concurrently (default: 4)')
+    parser_fetch.add_argument('--info', action='store_true', help='Show what the store holds instead of downloading')
+
+    # Execution algo sub-parser
+    parser_algo = subparsers.add_parser('algo', help='Work a parent order with an execution algorithm (TWAP, VWAP, iceberg)')
+    algo_subparsers = parser_algo.add_subparsers(dest='algo_command', help='Algorithm or action')
+    algo_subparsers.required = True
+    algo_order = argparse.ArgumentParser(add_help=False)
+    algo_order.add_argument('side', type=str, choices=['BUY', 'SELL'], help='Order side (BUY or SELL)')
+    algo_order.add_argument('quantity', type=float, help='Total quantity to execute')
+    algo_order.add_argument('--price-mode', type=str, choices=['join', 'improve', 'mid', 'cross', 'market', 'fixed'],
+                            default='join', help="How children are priced: off the book, as market orders, or 'fixed' at --limit-price (default: join)")
+    algo_order.add_argument('--limit-price', type=float, default=None, help='Worst price any limit child may use')
+    algo_order.add_argument('--stale-after', type=float, default=None, help='Seconds before an unfilled child is cancelled and re-priced')
+    algo_order.add_argument('--wait', action='store_true', help='With --daemon: wait for the parent to finish instead of returning its ID')
+    for name, help_text in (('twap', 'Equal slices over --duration'), ('vwap', 'Slices sized by the historical volume profile')):
+        parser_twap = algo_subparsers.add_parser(name, parents=[algo_order], help=help_text)
+        parser_twap.add_argument('--duration', type=float, required=True, help='Seconds to spread the order over')
+        parser_twap.add_argument('--slices', type=int, default=10, help='Number of slices (default: 10)')
+        parser_twap.add_argument('--finish', type=str, choices=['market', 'cancel'], default='market',
+                                 help='At the deadline, sweep the remainder with a market order (default) or leave it')
+        if name == 'vwap':
+            parser_twap.add_argument('--profile-days', type=int, default=5, help='Past days averaged into the volume profile (default: 5)')
+    parser_iceberg = algo_subparsers.add_parser('iceberg', parents=[algo_order], help='Show only --display at a time')
+    parser_iceberg.add_argument('--display', type=float, required=True, help='Visible quantity of each child order')
+    parser_iceberg.add_argument('--duration', type=float, default=None, help='Give up (leave the rest unfilled) after this many seconds')
+    parser_algo_status = algo_subparsers.add_parser('status', help='Show parent orders running in the daemon')
+    parser_algo_status.add_argument('algo_id', type=int, nargs='?', help='Parent order ID (default: all)')
+    parser_algo_cancel = algo_subparsers.add_parser('cancel', help='Cancel a parent order running in the daemon')
+    parser_algo_cancel.add_argument('algo_id', type=int, help='Parent order ID')
+
+    # Multi-account router sub-parser
+    parser_route = subparsers.add_parser('route', help='Place orders for many accounts through a multi-process router')
+    parser_route.add_argument('file', type=str, help='CSV (with header) or JSONL file of orders: account,symbol,side,type,quantity,price,stop_price')
+    parser_route.add_argument('--accounts', type=str, required=True, help='JSON file of account credentials (see order_router.py)')
+    parser_route.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser_route.add_argument('--shard-by', type=str, choices=['account', 'symbol'], default='account',
+                              help='Keep each account (default) or each account/symbol pair on one worker')
+
+    # Daemon sub-parser
+    parser_serve = subparsers.add_parser('serve', help='Run a daemon holding a warm bot; use --daemon to send it commands')
+    parser_serve.add_argument('--user-stream', action='store_true', help='Also run the user-data stream so queries are served from cache')
+    parser_serve.add_argument('--market-data', type=str, default=None,
+                              help='Comma-separated symbols to keep live order books for (e.g. BTCUSDT,ETHUSDT)')
+    parser_serve.add_argument('--reconcile-interval', type=float, default=60.0,
+                              help='Seconds between ledger reconciles with the exchange (default: 60, 0 disables)')
+
+    return parser
+
+def create_bot():
+    """Imports the API stack and builds a connected BasicBot from config."""
+    from basic_bot import BasicBot
+    import config # To load API keys
+    return BasicBot(api_key=config.API_KEY, api_secret=config.API_SECRET, futures_url=config.FUTURES_API_URL,
+                    journal=config.ORDER_JOURNAL_PATH, risk=config.RISK_LIMITS_PATH)
+
+def run_route(args, out=sys.stdout):
+    """Places the orders of a multi-account orders file through an OrderRouter and prints per-order results."""
+    from order_router import OrderRouter, OrderRouterError, load_accounts
     try:
-        bot = BasicBot(api_key=config.API_KEY, api_secret=config.API_SECRET)
-    except Exception as e:
-        log.critical(f"Failed to initialize bot. Exiting. Error: {e}")
-        print(f"Critical Error: Failed to initialize bot. Check logs. Error: {e}")
+        accounts = load_accounts(args.accounts)
+        orders = load_orders_file(args.file, args.symbol.upper())
+    except (OSError, ValueError, KeyError) as e:
+        log.error(f"Could not read accounts/orders: {e}")
+        print(f"Could not read accounts/orders: {e}", file=out)
         return
+    default_account = accounts[0]["name"]
+    log.info(f"CLI: Route {len(orders)} order(s) across {len(accounts)} account(s)")
+    with OrderRouter(accounts, workers=args.workers, shard_by=args.shard_by) as router:
+        futures = []
+        for order in orders:
+            account = order.pop('account', default_account)
+            try:
+                futures.append((account, router.place(account, order)))
+            except (OrderRouterError, KeyError, ValueError) as e:
+                futures.append((account, e))
+        print(f"\n--- Routed Orders ({len(orders)}) ---", file=out)
+        for i, (account, future) in enumerate(futures):
+            try:
+                order = future if isinstance(future, Exception) else future.result()
+            except OrderRouterError as e:
+                order = e
+            if isinstance(order, dict):
+                print(f"#{i} {account}: OK     orderId={order.get('orderId')} status={order.get('status')}", file=out)
+            else:
+                print(f"#{i} {account}: FAILED {order if order is not None else 'see log for the API error'}", file=out)
+
+def build_parent_order(args, symbol):
+    """Builds the TWAP/VWAP/Iceberg parent order described by parsed `algo` arguments."""
+    from execution_algos import TWAP, VWAP, Iceberg
+    options = {"price_mode": None if args.price_mode == 'fixed' else args.price_mode,
+               "limit_price": args.limit_price, "stale_after": args.stale_after}
+    side = args.side.upper()
+    if args.algo_command == 'twap':
+        return TWAP(symbol, side, args.quantity, args.duration, args.slices, finish=args.finish, **options)
+    if args.algo_command == 'vwap':
+        return VWAP(symbol, side, args.quantity, args.duration, args.slices, profile_days=args.profile_days,
+                    finish=args.finish, **options)
+    return Iceberg(symbol, side, args.quantity, args.display, duration=args.duration, **options)
+
+def format_age(timestamp, now):
+    if not timestamp:
+        return "never"
+    seconds = now - timestamp
+    return f"{seconds:.0f}s ago" if seconds < 120 else f"{seconds / 60:.0f}m ago" if seconds < 7200 else f"{seconds / 3600:.1f}h ago"
+
+def print_positions(positions, out=sys.stdout):
+    now = time.time()
+    print(f"\n--- Positions ({len(positions)}) ---", file=out)
+    if not positions:
+        print("No open positions.", file=out)
+    for p in positions:
+        liquidation = f"{p['liquidationPrice']:.2f}" if p['liquidationPrice'] else "n/a"
+        print(f"{p['symbol']:<10} {'LONG' if p['positionAmt'] > 0 else 'SHORT':<5} {abs(p['positionAmt']):g} "
+              f"@ {p['entryPrice']:.4f}  mark {p['markPrice']:.4f} ({format_age(p['markTime'], now)})  "
+              f"uPnL {p['unrealizedPnl']:+.4f}  margin {p['margin']:.2f} ({p['leverage']}x)  "
+              f"liq ~{liquidation}", file=out)
+
+def print_pnl(pnl, asset, out=sys.stdout):
+    now = time.time()
+    def amount(value):
+        return f"{value:,.4f}" if value is not None else "unknown until a reconcile"
+    print(f"\n--- PnL ({asset}) ---", file=out)
+    for label, key in (("Realized", "realizedPnl"), ("Fees", "fees"), ("Funding", "funding"),
+                       ("Unrealized", "unrealizedPnl"), ("Net", "netPnl"), ("Wallet", "wallet"),
+                       ("Equity", "equity"), ("Margin in use", "marginInUse"), ("Maintenance", "maintenanceMargin")):
+        print(f"{label + ':':<15}{amount(pnl[key])}", file=out)
+    print(f"{'Reconciled:':<15}{format_age(pnl['lastReconcile'], now)} ({pnl['drifts']} drift(s) corrected)", file=out)
+    for symbol, s in pnl['symbols'].items():
+        print(f"  {symbol:<10} realized {s['realizedPnl']:+.4f}  unrealized {s['unrealizedPnl']:+.4f}  "
+              f"fees {s['fees']:.4f}  fills {s['fills']}", file=out)
+
+def print_risk_status(status, out=sys.stdout):
+    print("\n--- Pre-trade Risk ---", file=out)
+    print(f"Kill switch:   {'ENGAGED (' + status['killSwitch'] + ')' if status['killSwitch'] else 'off'}", file=out)
+    print(f"Open orders:   {status['openOrders']} (+{status['inFlight']} in flight)", file=out)
+    rejects = ', '.join(f"{check} {count}" for check, count in sorted(status['rejects'].items())) or 'none'
+    print(f"Checks:        {status['checks']} (rejected: {rejects})", file=out)
+    print("Limits:        " + ', '.join(f"{name}={value}" for name, value in status['limits'].items()), file=out)
+    for symbol, limits in status['symbolLimits'].items():
+        print(f"  {symbol}: " + ', '.join(f"{name}={value}" for name, value in limits.items()
+                                           if value != status['limits'][name]), file=out)
+    for symbol, s in status['symbols'].items():
+        exposure = f"{s['exposure']:,.2f}" if s['exposure'] is not None else "unpriced"
+        print(f"{symbol:<10} position {s['position']:g}  open buy {s['openBuyQty']:g} / sell {s['openSellQty']:g}  "
+              f"worst-case exposure {exposure}  {s['leverage']}x", file=out)
+
+def format_ms(timestamp):
+    return datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if timestamp is not None else "-"
+
+def print_store_info(store, out=sys.stdout):
+    print(f"\n--- Market Store ({store.root}) ---", file=out)
+    series = [(dataset, symbol) for dataset in store.datasets() for symbol in store.symbols(dataset)]
+    if not series:
+        print("The store is empty.", file=out)
+    for dataset, symbol in series:
+        info = store.info(dataset, symbol)
+        ratio = info['raw_bytes'] / info['compressed_bytes'] if info['compressed_bytes'] else 0
+        print(f"{dataset:<12} {symbol:<10} {info['rows']:>12,} rows  {format_ms(info['first'])} -> "
+              f"{format_ms(info['last'])}  {info['chunks']} chunk(s) {info['compressed_bytes'] / 1e6:.1f} MB "
+              f"({ratio:.1f}x) + {info['tail_rows']:,} tail rows", file=out)
 
+def run_fetch(bot, args, symbol, out=sys.stdout):
+    """Downloads the requested history into the market store, or shows what it holds."""
+    import config
+    from history_fetcher import HistoryFetcher
+    from market_store import MarketStore
+    store = MarketStore(args.store or config.MARKET_STORE_PATH)
+    if args.info:
+        print_store_info(store, out)
+        return
+    if args.start is None:
+        print("fetch needs --start (or --info).", file=out)
+        return
+    symbols = [s.strip().upper() for s in (args.symbols or symbol).split(',') if s.strip()]
+    intervals = [i.strip() for i in args.klines.split(',') if i.strip()]
+    log.info(f"CLI: Fetch {', '.join(intervals) or 'no'} klines{' and aggTrades' if args.agg_trades else ''} "
+             f"for {', '.join(symbols)}")
+    try:
+        summaries = HistoryFetcher(bot, store, workers=args.workers).fetch(
+            symbols, args.start, args.end, intervals=intervals, agg_trades=args.agg_trades)
+    except ValueError as e:
+        print(f"Could not fetch: {e}", file=out)
+        return
+    print(f"\n--- Fetched ({len(summaries)} series) ---", file=out)
+    for s in summaries:
+        last = store.last_time(s['dataset'], s['symbol'])
+        result = f"FAILED ({s['error']}); run again to resume" if s['error'] else f"stored up to {format_ms(last)}"
+        print(f"{s['dataset']:<12} {s['symbol']:<10} {s['rows']:>10,} new rows in {s['pages']} page(s), "
+              f"{s['seconds']:.1f}s  {result}", file=out)
+
+def print_algo_summary(parent, out=sys.stdout):
+    summary = parent.summary()
+    print(f"#{summary['id']} {summary['algo']} {summary['side']} {summary['symbol']}: {summary['status']} "
+          f"filled {summary['filled']:g}/{summary['quantity']:g} @ {summary['avgPrice']:g} "
+          f"({summary['children']} child order(s))" + (f" - {summary['reason']}" if summary['reason'] else ''), file=out)
+
+def run_algo(bot, args, out=sys.stdout, algo_engine=None):
+    """Runs an `algo` command: in the foreground, or on the daemon's shared engine."""
+    if args.algo_command in ('status', 'cancel'):
+        if algo_engine is None:
+            print("No algo engine is running here; submit and query parent orders through 'serve' with --daemon.", file=out)
+            return
+        if args.algo_command == 'cancel':
+            ok = algo_engine.cancel(args.algo_id)
+            print(f"Cancel requested for algo #{args.algo_id}." if ok else f"Algo #{args.algo_id} is not active.", file=out)
+            return
+        parents = [algo_engine.parents[args.algo_id]] if args.algo_id in algo_engine.parents else \
+            [] if args.algo_id else list(algo_engine.parents.values())
+        print(f"\n--- Algo Orders ({len(parents)}) ---", file=out)
+        for parent in parents:
+            print_algo_summary(parent, out)
+        return
+
+    symbol = args.symbol.upper()
+    try:
+        parent = build_parent_order(args, symbol)
+    except ValueError as e:
+        log.error(f"Invalid algo order: {e}")
+        print(f"Invalid algo order: {e}", file=out)
+        return
+    log.info(f"CLI: {parent.algo} {parent.side} {parent.quantity} {symbol}")
+    if algo_engine is not None:
+        algo_engine.submit(parent)
+        if not args.wait:
+            print(f"Submitted algo #{parent.id}: {parent.algo} {parent.side} {parent.quantity} {symbol}. "
+                  f"Follow it with 'algo status {parent.id}'.", file=out)
+            return
+        parent.wait()
+    else:
+        from execution_algos import AlgoEngine
+        engine = AlgoEngine(bot).start()
+        engine.submit(parent)
+        try:
+            parent.wait()
+        except KeyboardInterrupt:
+            print("Interrupted: cancelling the parent order...", file=out)
+        engine.stop() # Cancels the working child if the parent is still active
+    print_algo_summary(parent, out)
+
+def run_command(bot, args, out=sys.stdout, algo_engine=None):
+    """
+    Executes one parsed CLI command with an already connected bot, writing results to out.
+    :param algo_engine: Shared AlgoEngine (the daemon's) for `algo` commands; None runs them in the foreground
+    """
     # Default symbol from top-level arg, can be overridden by specific commands if they take symbol
     symbol = args.symbol.upper() 
 
     if args.command == 'market':
         log.info(f"CLI: Market order: Side={args.side}, Quantity={args.quantity}, Symbol={symbol}")
         order = bot.place_market_order(symbol, args.side.upper(), args.quantity)
-        print_order_details(order)
+        print_order_details(order, out)
     
     elif args.command == 'limit':
         log.info(f"CLI: Limit order: Side={args.side}, Quantity={args.quantity}, Price={args.price}, Symbol={symbol}")
-        order = bot.place_limit_order(symbol, args.side.upper(), args.quantity, args.price)
-        print_order_details(order)
+        if isinstance(args.price, str):
+            order = bot.place_book_limit_order(symbol, args.side.upper(), args.quantity, args.price)
+        else:
+            order = bot.place_limit_order(symbol, args.side.upper(), args.quantity, args.price)
+        print_order_details(order, out)
 
     elif args.command == 'stoplimit':
         log.info(f"CLI: Stop-Limit order: Side={args.side}, Quantity={args.quantity}, Price={args.price}, StopPrice={args.stop_price}, Symbol={symbol}")
         order = bot.place_stop_limit_order(symbol, args.side.upper(), args.quantity, args.price, args.stop_price)
-        print_order_details(order)
+        print_order_details(order, out)
 
     elif args.command == 'status':
         log.info(f"CLI: Get order status: OrderID={args.order_id}, Symbol={symbol}")
         status = bot.get_order_status(symbol, args.order_id)
         if status:
-            print("\n--- Order Status ---")
-            print(json.dumps(status, indent=2))
+            print("\n--- Order Status ---", file=out)
+            print(json.dumps(status, indent=2), file=out)
         else:
-            print(f"Could not retrieve status for order ID {args.order_id}.")
+            print(f"Could not retrieve status for order ID {args.order_id}.", file=out)
 
     elif args.command == 'cancel':
         log.info(f"CLI: Cancel order: OrderID={args.order_id}, Symbol={symbol}")
         response = bot.cancel_order(symbol, args.order_id)
         if response:
-            print("\n--- Cancel Order Response ---")
-            print(json.dumps(response, indent=2))
+            print("\n--- Cancel Order Response ---", file=out)
+            print(json.dumps(response, indent=2), file=out)
         else:
-            print(f"Could not cancel order ID {args.order_id} or it was already filled/cancelled.")
+            print(f"Could not cancel order ID {args.order_id} or it was already filled/cancelled.", file=out)
             
+    elif args.command == 'batch':
+        try:
+            orders = load_orders_file(args.file, symbol)
+        except (OSError, ValueError) as e:
+            log.error(f"Could not read orders file {args.file}: {e}")
+            print(f"Could not read orders file {args.file}: {e}", file=out)
+            return
+        log.info(f"CLI: Batch place {len(orders)} order(s) from {args.file}")
+        results = bot.place_batch_orders(orders)
+        print_batch_results(results, "Placement", out)
+
+    elif args.command == 'cancelall':
+        if args.order_ids:
+            log.info(f"CLI: Batch cancel {len(args.order_ids)} order(s), Symbol={symbol}")
+            results = bot.cancel_batch_orders(symbol, args.order_ids)
+            print_batch_results(results, "Cancel", out)
+        else:
+            log.info(f"CLI: Cancel all open orders, Symbol={symbol}")
+            response = bot.cancel_all_orders(symbol)
+            if response:
+                print(f"\n--- Cancel All Response for {symbol} ---", file=out)
+                print(json.dumps(response, indent=2), file=out)
+            else:
+                print(f"Failed to cancel open orders for {symbol}.", file=out)
+
+    elif args.command == 'book':
+        log.info(f"CLI: Order book for Symbol={symbol}")
+        book = bot.get_order_book(symbol)
+        if book is None:
+            print(f"Could not retrieve the order book for {symbol}.", file=out)
+            return
+        live = bot.market_data is not None and bot.market_data.book(symbol) is book
+        depth = book.depth(args.depth)
+        print(f"\n--- Order Book for {symbol} ({'live' if live else 'REST snapshot'}, update {book.last_update_id}) ---", file=out)
+        print(f"{'BID QTY':>14} {'BID':>14} | {'ASK':<14} {'ASK QTY':<14}", file=out)
+        for i in range(max(len(depth['bids']), len(depth['asks']))):
+            bid = depth['bids'][i] if i < len(depth['bids']) else ('', '')
+            ask = depth['asks'][i] if i < len(depth['asks']) else ('', '')
+            print(f"{bid[1]:>14} {bid[0]:>14} | {ask[0]:<14} {ask[1]:<14}", file=out)
+        spread = book.spread()
+        if spread is not None:
+            print(f"Mid: {book.mid()}  Spread: {spread:.10g}", file=out)
+        trade = bot.market_data.last_trade(symbol) if live else None
+        if trade:
+            print(f"Last trade: {trade[2]} @ {trade[1]}", file=out)
+
+    elif args.command == 'algo':
+        run_algo(bot, args, out, algo_engine)
+
+    elif args.command in ('positions', 'pnl'):
+        if bot.ledger is None:
+            print("The position ledger is disabled for this bot.", file=out)
+        else:
+            if args.reconcile and bot.reconcile_positions() is None:
+                print("Reconcile failed; showing the local ledger.", file=out)
+            if args.command == 'positions':
+                print_positions(bot.ledger.positions_view(), out)
+            else:
+                print_pnl(bot.ledger.pnl(), bot.ledger.margin_asset, out)
+
+    elif args.command == 'risk':
+        if bot.risk is None:
+            print("Pre-trade risk checks are disabled for this bot.", file=out)
+        elif args.action == 'kill':
+            cancelled = bot.engage_kill_switch(args.reason, cancel_open_orders=not args.keep_orders)
+            print(f"Kill switch engaged: {args.reason}." + (f" Open orders cancelled on {', '.join(cancelled)}."
+                                                            if cancelled else ""), file=out)
+        elif args.action == 'resume':
+            bot.release_kill_switch()
+            print("Kill switch released.", file=out)
+        else:
+            print_risk_status(bot.risk.status(), out)
+
+    elif args.command == 'fetch':
+        run_fetch(bot, args, symbol, out)
+
+    elif args.command == 'journal':
+        if bot.journal is None:
+            print("Order journaling is disabled for this bot.", file=out)
+        else:
+            if args.reconcile:
+                counts = bot.reconcile_journal()
+                print(f"Reconciled: {counts['placed']} placed, {counts['missing']} never placed, "
+                      f"{counts['unresolved']} still unknown.", file=out)
+            entries = bot.journal.latest(limit=args.limit, unresolved_only=args.unresolved)
+            print(f"\n--- Journaled Orders ({len(entries)}) ---", file=out)
+            for entry in entries:
+                params = entry['params']
+                print(f"{entry['client_order_id']:>16} {entry['status']:<16} {params.get('side', ''):<4} "
+                      f"{params.get('type', ''):<6} {params.get('quantity', '')} {entry['symbol']} "
+                      f"orderId={entry['order_id']}", file=out)
+
+    elif args.command == 'stats':
+        if bot.metrics is None:
+            print("Metrics are disabled for this bot.", file=out)
+        elif args.prometheus:
+            print(bot.metrics.prometheus(), end='', file=out)
+        else:
+            print(bot.metrics.format_table(), file=out)
+
     elif args.command == 'openorders':
         log.info(f"CLI: Get open orders for Symbol={symbol}")
         orders = bot.get_open_orders(symbol)
         if orders is not None: # Could be an empty list which is a valid response
-            print(f"\n--- Open Orders for {symbol} ---")
+            print(f"\n--- Open Orders for {symbol} ---", file=out)
             if orders:
                 for o in orders:
-                    print(json.dumps(o, indent=2))
+                    print(json.dumps(o, indent=2), file=out)
             else:
-                print("No open orders found.")
+                print("No open orders found.", file=out)
         else:
-            print("Failed to retrieve open orders.")
+            print("Failed to retrieve open orders.", file=out)
 
     elif args.command == 'balance':
         log.info(f"CLI: Get account balance for Asset={args.asset.upper()}")
         balance_info = bot.get_account_balance(asset=args.asset.upper())
         if balance_info:
-            print(f"\n--- Account Balance for {args.asset.upper()} ---")
-            print(f"Asset: {balance_info['asset']}")
-            print(f"Balance: {balance_info['balance']}")
-            print(f"Available Balance: {balance_info['availableBalance']}")
+            print(f"\n--- Account Balance for {args.asset.upper()} ---", file=out)
+            print(f"Asset: {balance_info['asset']}", file=out)
+            print(f"Balance: {balance_info['balance']}", file=out)
+            print(f"Available Balance: {balance_info['availableBalance']}", file=out)
         else:
-            print(f"Could not retrieve balance for asset {args.asset.upper()}.")
+            print(f"Could not retrieve balance for asset {args.asset.upper()}.", file=out)
 
     elif args.command == 'leverage':
         log.info(f"CLI: Set leverage for Symbol={symbol} to Leverage={args.leverage}")
         response = bot.set_leverage(symbol, args.leverage)
         if response:
-            print(f"\n--- Set Leverage Response for {symbol} ---")
-            print(json.dumps(response, indent=2))
+            print(f"\n--- Set Leverage Response for {symbol} ---", file=out)
+            print(json.dumps(response, indent=2), file=out)
         else:
-            print(f"Failed to set leverage for {symbol}.")
+            print(f"Failed to set leverage for {symbol}.", file=out)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.daemon and args.command not in ('serve', 'route'):
+        # Thin client: the daemon parses the same arguments and runs the command
+        try:
+            output, status = daemon.forward(sys.argv[1:] if argv is None else argv, args.socket, os.getcwd())
+        except OSError as e:
+            print(f"Could not reach the bot daemon at {args.socket}: {e}. Start it with 'python main.py serve'.")
+            sys.exit(2)
+        sys.stdout.write(output)
+        sys.exit(status)
+
+    log.info(f"Starting bot with command: {args.command}")
+
+    if args.command == 'route': # Workers connect their own accounts; no default bot needed
+        run_route(args)
+        return
+
+    if args.command == 'serve' and daemon.is_running(args.socket):
+        print(f"A bot daemon is already running on {args.socket}.")
+        sys.exit(1)
+
+    try:
+        bot = create_bot()
+    except Exception as e:
+        log.critical(f"Failed to initialize bot. Exiting. Error: {e}")
+        print(f"Critical Error: Failed to initialize bot. Check logs. Error: {e}")
+        return
+
+    if args.command == 'serve':
+        import config
+        if args.user_stream:
+            bot.start_user_stream(stream_url=config.FUTURES_STREAM_URL)
+        if args.market_data:
+            bot.start_market_data([s.strip().upper() for s in args.market_data.split(',') if s.strip()],
+                                  stream_url=config.FUTURES_MARKET_STREAM_URL)
+        bot.start_ledger(reconcile_interval=args.reconcile_interval or None)
+        if bot.risk is not None and not args.user_stream:
+            bot.get_open_orders() # The risk gate counts orders placed before the daemon started
+        from execution_algos import AlgoEngine
+        algo_engine = AlgoEngine(bot).start() # Parent orders outlive the command that submitted them
+        def handle(argv, cwd, out):
+            command_args = parser.parse_args(argv)
+            if command_args.command == 'batch': # Resolve relative to the client's directory
+                command_args.file = os.path.join(cwd, command_args.file)
+            if command_args.command == 'fetch' and command_args.store:
+                command_args.store = os.path.join(cwd, command_args.store)
+            run_command(bot, command_args, out, algo_engine)
+
+        if not daemon.serve(args.socket, handle):
+            print(f"A bot daemon is already running on {args.socket}.")
+        algo_engine.stop()
+        bot.stop_ledger()
+        bot.stop_user_stream()
+        bot.stop_market_data()
+        return
+
+    run_command(bot, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,451 @@
+# market_data.py
+"""
+Market-data subsystem: a local L2 order book and a tape of recent trades per
+symbol, kept up to date from the <symbol>@depth and <symbol>@aggTrade
+websocket streams, so limit prices can be set from the live book.
+
+Books follow the exchange's diff-depth procedure: diffs are buffered while a
+REST snapshot loads, diffs the snapshot already covers are dropped, the first
+applied diff must straddle the snapshot's lastUpdateId and every later diff
+must continue the previous one (pu == previous u). A sequence gap marks the
+book stale and a new snapshot is requested; readers only trust `synced` books.
+
+Each side keeps its price levels in two parallel array('d') columns sorted so
+the best level is the last element: best bid/ask is an O(1) read, a level is
+found by binary search, and the common updates near the top of the book only
+shift the few levels in front of them.
+
+Replay a recorded fixture offline:
+    python market_data.py fixtures/market_data_events.jsonl
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+import websockets
+
+from logger_setup import log
+
+FUTURES_TESTNET_MARKET_STREAM_URL = "wss://fstream.binancefuture.com/stream"
+DEPTH_INTERVAL = "100ms" # Diff-depth push interval: 100ms, 250ms or 500ms
+SNAPSHOT_LIMIT = 1000 # Levels per side in the REST snapshot
+MAX_LEVELS = 1000 # Levels per side kept; far levels the stream stops updating are trimmed
+MAX_BUFFERED_EVENTS = 10000 # Diffs held per book while a snapshot loads
+TRADE_HISTORY = 1000 # aggTrades kept per symbol
+MAX_STREAMS_PER_CONNECTION = 200
+
+
+class BookSide:
+    __slots__ = ("sign", "keys", "quantities")
+
+    def __init__(self, sign):
+        """
+        :param sign: 1.0 for bids, -1.0 for asks; keys are sign * price, ascending,
+                     so the best level is always the last one
+        """
+        self.sign = sign
+        self.keys = array("d")
+        self.quantities = array("d")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        del self.keys[:]
+        del self.quantities[:]
+
+    def set(self, price, quantity):
+        """Sets a level's quantity; a zero quantity removes the level."""
+        key = self.sign * price
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if quantity:
+                self.quantities[i] = quantity
+            else:
+                del keys[i]
+                del self.quantities[i]
+        elif quantity:
+            keys.insert(i, key)
+            self.quantities.insert(i, quantity)
+
+    def load(self, levels):
+        """Replaces the side with [price, quantity] pairs (strings or numbers, any order)."""
+        sign = self.sign
+        pairs = sorted((sign * float(p), float(q)) for p, q in levels if float(q))
+        self.keys = array("d", [k for k, _ in pairs])
+        self.quantities = array("d", [q for _, q in pairs])
+
+    def trim(self, max_levels):
+        excess = len(self.keys) - max_levels
+        if excess > 0:
+            del self.keys[:excess]
+            del self.quantities[:excess]
+
+    def best(self):
+        """:return: (price, quantity) of the best level, or None if the side is empty"""
+        if not self.keys:
+            return None
+        return self.sign * self.keys[-1], self.quantities[-1]
+
+    def levels(self, depth):
+        """:return: Up to `depth` (price, quantity) levels, best first"""
+        sign, keys, quantities = self.sign, self.keys, self.quantities
+        n = len(keys)
+        return [(sign * keys[i], quantities[i]) for i in range(n - 1, max(n - depth, 0) - 1, -1)]
+
+    def sweep(self, quantity):
+        """
+        Walks the side from the best level until `quantity` is covered.
+        :return: (worst price reached, average price), or None if the side is too thin
+        """
+        sign, keys, quantities = self.sign, self.keys, self.quantities
+        remaining, notional = quantity, 0.0
+        for i in range(len(keys) - 1, -1, -1):
+            price = sign * keys[i]
+            take = min(remaining, quantities[i])
+            notional += take * price
+            remaining -= take
+            if remaining <= 0:
+                return price, notional / quantity
+        return None
+
+
+class OrderBook:
+    def __init__(self, symbol, max_levels=MAX_LEVELS):
+        self.symbol = symbol
+        self.max_levels = max_levels
+        self.bids = BookSide(1.0)
+        self.asks = BookSide(-1.0)
+        self.last_update_id = 0 # Snapshot lastUpdateId, then the last applied diff's u
+        self.event_time = 0
+        self.synced = False
+        self.gaps = 0
+        self._awaiting_first = False
+        self._buffer = deque(maxlen=MAX_BUFFERED_EVENTS)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, symbol, snapshot, max_levels=MAX_LEVELS):
+        """Builds a book from a REST depth snapshot alone (no stream)."""
+        book = cls(symbol, max_levels)
+        book.load_snapshot(snapshot)
+        return book
+
+    # --- Updates ---
+    def load_snapshot(self, snapshot):
+        """
+        Replaces the book with a REST depth snapshot and applies the diffs
+        buffered since, marking the book synced.
+        :return: False if the buffered diffs don't connect to the snapshot (a newer one is needed)
+        """
+        with self._lock:
+            self.bids.load(snapshot["bids"])
+            self.asks.load(snapshot["asks"])
+            self.last_update_id = snapshot["lastUpdateId"]
+            self.event_time = snapshot.get("E", self.event_time)
+            self._awaiting_first = True
+            self.synced = True
+            buffered = list(self._buffer)
+            self._buffer.clear()
+            for i, event in enumerate(buffered):
+                if not self._apply(event):
+                    self._buffer.extend(buffered[i + 1:])
+                    return False
+        log.info(f"{self.symbol} order book synced at update {self.last_update_id} "
+                 f"({len(self.bids)} bids, {len(self.asks)} asks, {len(buffered)} buffered diff(s)).")
+        return True
+
+    def mark_stale(self, reason):
+        """Stops trusting the book (e.g. on reconnect) until the next snapshot."""
+        with self._lock:
+            if self.synced:
+                log.warning(f"{self.symbol} order book marked stale: {reason}")
+            self.synced = False
+            self._buffer.clear()
+
+    def apply_event(self, event):
+        """
+        Applies one depthUpdate event, or buffers it while the book is not synced.
+        :return: False if the event revealed a sequence gap (the book is then stale)
+        """
+        with self._lock:
+            if not self.synced:
+                self._buffer.append(event)
+                return True
+            return self._apply(event)
+
+    def _apply(self, event):
+        if self._awaiting_first:
+            if event["u"] < self.last_update_id:
+                return True # Already part of the snapshot
+            if event["U"] > self.last_update_id + 1: # U == lastUpdateId + 1 continues the snapshot exactly
+                return self._gap(event, f"first diff starts at {event['U']}, snapshot is at {self.last_update_id}")
+            self._awaiting_first = False
+        elif event["pu"] != self.last_update_id:
+            return self._gap(event, f"diff continues {event['pu']}, book is at {self.last_update_id}")
+        bids, asks = self.bids, self.asks
+        for price, quantity in event["b"]:
+            bids.set(float(price), float(quantity))
+        for price, quantity in event["a"]:
+            asks.set(float(price), float(quantity))
+        if len(bids.keys) > 2 * self.max_levels:
+            bids.trim(self.max_levels)
+        if len(asks.keys) > 2 * self.max_levels:
+            asks.trim(self.max_levels)
+        self.last_update_id = event["u"]
+        self.event_time = event["E"]
+        return True
+
+    def _gap(self, event, detail):
+        log.warning(f"{self.symbol} depth sequence gap ({detail}); resyncing.")
+        self.synced = False
+        self.gaps += 1
+        self._buffer.append(event)
+        return False
+
+    # --- Reads ---
+    def best_bid(self):
+        """:return: (price, quantity) or None"""
+        with self._lock:
+            return self.bids.best()
+
+    def best_ask(self):
+        """:return: (price, quantity) or None"""
+        with self._lock:
+            return self.asks.best()
+
+    def top(self):
+        """:return: (best bid price, best ask price); either may be None"""
+        with self._lock:
+            bids, asks = self.bids.keys, self.asks.keys
+            return (bids[-1] if bids else None), (-asks[-1] if asks else None)
+
+    def mid(self):
+        bid, ask = self.top()
+        return (bid + ask) / 2 if bid is not None and ask is not None else None
+
+    def spread(self):
+        bid, ask = self.top()
+        return ask - bid if bid is not None and ask is not None else None
+
+    def depth(self, levels=10):
+        """:return: {"bids": [(price, qty), ...], "asks": [...]}, best first"""
+        with self._lock:
+            return {"bids": self.bids.levels(levels), "asks": self.asks.levels(levels)}
+
+    def sweep(self, side, quantity):
+        """
+        Price an order of `quantity` on `side` would reach if it crossed the book now.
+        :param side: "BUY" (takes asks) or "SELL" (takes bids)
+        :return: (worst price, average price) or None if the book is too thin
+        """
+        with self._lock:
+            return (self.asks if side == "BUY" else self.bids).sweep(quantity)
+
+
+class MarketData:
+    def __init__(self, symbols, max_levels=MAX_LEVELS, trade_history=TRADE_HISTORY):
+        """
+        :param symbols: Symbols to keep books and trades for
+        :param trade_history: aggTrades kept per symbol
+        """
+        symbols = [s.upper() for s in symbols]
+        self.books = {s: OrderBook(s, max_levels) for s in symbols}
+        self.trades = {s: deque(maxlen=trade_history) for s in symbols} # (time, price, qty, buyer is maker)
+        self.messages = 0
+
+    def apply_message(self, message):
+        """
+        Applies one decoded stream message (combined-stream wrapper or bare event).
+        :return: The symbol whose book went stale on a sequence gap, else None
+        """
+        self.messages += 1
+        event = message.get("data", message)
+        event_type = event.get("e")
+        if event_type == "depthUpdate":
+            book = self.books.get(event["s"])
+            if book is not None and not book.apply_event(event):
+                return event["s"]
+        elif event_type == "aggTrade":
+            trades = self.trades.get(event["s"])
+            if trades is not None:
+                trades.append((event["T"], float(event["p"]), float(event["q"]), event["m"]))
+        return None
+
+    def book(self, symbol):
+        """:return: The symbol's OrderBook if it is synced, else None"""
+        book = self.books.get(symbol.upper())
+        return book if book is not None and book.synced else None
+
+    def last_trade(self, symbol):
+        trades = self.trades.get(symbol.upper())
+        return trades[-1] if trades else None
+
+
+def stream_names(symbols, depth_interval=DEPTH_INTERVAL):
+    names = []
+    for symbol in symbols:
+        s = symbol.lower()
+        names += [f"{s}@depth@{depth_interval}" if depth_interval else f"{s}@depth", f"{s}@aggTrade"]
+    return names
+
+
+class MarketDataStream:
+    def __init__(self, bot, market_data: MarketData, stream_url=FUTURES_TESTNET_MARKET_STREAM_URL,
+                 depth_interval=DEPTH_INTERVAL, snapshot_limit=SNAPSHOT_LIMIT):
+        """
+        :param bot: BasicBot used for REST depth snapshots
+        :param market_data: MarketData to keep up to date
+        :param stream_url: Combined-stream websocket URL; "?streams=..." is appended
+        """
+        self.bot = bot
+        self.market_data = market_data
+        self.stream_url = stream_url
+        self.depth_interval = depth_interval
+        self.snapshot_limit = snapshot_limit
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._snapshots = None
+        self._pending = set()
+
+    def start(self):
+        """Starts the streams in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="MarketDataStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+            self._loop = None
+        for book in self.market_data.books.values():
+            book.mark_stale("market data stream stopped")
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._stop = asyncio.Event()
+        self._snapshots = asyncio.Queue()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        symbols = list(self.market_data.books)
+        per_connection = MAX_STREAMS_PER_CONNECTION // 2 # Two streams per symbol
+        tasks = [asyncio.ensure_future(self._connection(symbols[i:i + per_connection]))
+                 for i in range(0, len(symbols), per_connection)]
+        tasks.append(asyncio.ensure_future(self._snapshot_worker()))
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _connection(self, symbols):
+        backoff = 1
+        while True:
+            try:
+                await self._consume(symbols)
+                backoff = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                for symbol in symbols:
+                    self.market_data.books[symbol].mark_stale(f"stream error: {e}")
+                log.error(f"Market data stream error, reconnecting in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    async def _consume(self, symbols):
+        url = f"{self.stream_url}?streams={'/'.join(stream_names(symbols, self.depth_interval))}"
+        async with websockets.connect(url, max_size=None) as ws:
+            log.info(f"Market data stream connected: {len(symbols)} symbol(s).")
+            # Diffs buffer in each book until its snapshot arrives
+            for symbol in symbols:
+                self._request_snapshot(symbol)
+            apply_message = self.market_data.apply_message
+            async for message in ws:
+                stale = apply_message(json.loads(message))
+                if stale:
+                    self._request_snapshot(stale)
+        raise ConnectionError("stream closed by server")
+
+    def _request_snapshot(self, symbol):
+        if symbol not in self._pending:
+            self._pending.add(symbol)
+            self._snapshots.put_nowait(symbol)
+
+    async def _snapshot_worker(self):
+        """Fetches snapshots one at a time; each costs request weight, so they are never fired in parallel."""
+        while True:
+            symbol = await self._snapshots.get()
+            try:
+                snapshot = await asyncio.to_thread(self.bot._call, "futures_order_book", symbol=symbol,
+                                                   limit=self.snapshot_limit)
+            except Exception as e:
+                log.error(f"Depth snapshot for {symbol} failed, retrying: {e}")
+                await asyncio.sleep(1)
+                self._snapshots.put_nowait(symbol)
+                continue
+            self._pending.discard(symbol)
+            if not self.market_data.books[symbol].load_snapshot(snapshot):
+                self._request_snapshot(symbol)
+
+
+def replay_fixture(market_data: MarketData, path):
+    """
+    Applies a recorded JSONL fixture: stream messages, plus {"snapshot": {...},
+    "symbol": ...} lines where the REST snapshot arrived during the recording.
+    :return: Number of lines applied
+    """
+    count = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            message = json.loads(line)
+            if "snapshot" in message:
+                book = market_data.books.get(message["symbol"])
+                if book is not None:
+                    book.load_snapshot(message["snapshot"])
+            else:
+                market_data.apply_message(message)
+            count += 1
+    return count
+
+
+def fixture_symbols(path):
+    """Symbols that have a snapshot in a recorded fixture."""
+    with open(path) as f:
+        return [json.loads(line)["symbol"] for line in f if line.startswith('{"snapshot"')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded market-data fixture into local order books")
+    parser.add_argument('fixture', type=str, help='JSONL file of stream messages and depth snapshots')
+    parser.add_argument('--depth', type=int, default=5, help='Levels to print per side')
+    args = parser.parse_args()
+
+    market_data = MarketData(fixture_symbols(args.fixture))
+    start = time.perf_counter()
+    count = replay_fixture(market_data, args.fixture)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {count} message(s) in {elapsed * 1000:.2f} ms")
+    for symbol, book in market_data.books.items():
+        state = f"synced at {book.last_update_id}" if book.synced else "STALE"
+        print(f"\n--- {symbol} ({state}, {book.gaps} gap(s)) ---")
+        depth = book.depth(args.depth)
+        for (bid, bid_qty), (ask, ask_qty) in zip(depth["bids"], depth["asks"]):
+            print(f"{bid_qty:>12} {bid:>12} | {ask:<12} {ask_qty:<12}")
+        trade = market_data.last_trade(symbol)
+        if trade:
+            print(f"Last trade: {trade[2]} @ {trade[1]}")
@@ -0,0 +1,246 @@
+# metrics.py
+"""
+Low-overhead latency metrics for BasicBot API calls.
+
+Each endpoint gets a rolling log-bucketed latency histogram (p50/p95/p99 over
+the last few minutes) plus cumulative call, error and request-weight
+counters. Every call is split into four phases so slow calls can be
+attributed:
+
+    queue   - time spent waiting in the rate-limit scheduler
+    connect - opening a new connection: DNS, TCP connect, TLS handshake
+              (zero when a pooled keep-alive connection is reused)
+    http    - request sent to response headers received (network + exchange)
+    client  - everything else on our side (signing, JSON parsing, logging)
+
+Connection setup is timed by TimingHTTPAdapter, which BasicBot mounts on its
+client's requests session; the time is kept per thread, so concurrent calls
+only see their own connections.
+
+Recording a call costs a few microseconds (counter increments and a
+math.log() per phase); the percentiles are only computed when stats are read.
+"""
+import math
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+PHASES = ("total", "queue", "connect", "http", "client")
+
+# Log-spaced latency buckets from 10us to ~100s, ~10% apart
+_MIN_SECONDS = 1e-5
+_GROWTH = 1.1
+_LOG_GROWTH = math.log(_GROWTH)
+_BUCKETS = int(math.log(1e2 / _MIN_SECONDS) / _LOG_GROWTH) + 2
+BUCKET_BOUNDS = [_MIN_SECONDS * _GROWTH ** i for i in range(_BUCKETS)]
+
+
+_connect = threading.local() # Connection setup seconds of the current thread's call
+
+
+def reset_connect_seconds():
+    _connect.seconds = 0.0
+
+
+def connect_seconds():
+    """Connection setup time spent on this thread since reset_connect_seconds()."""
+    return getattr(_connect, "seconds", 0.0)
+
+
+class _TimedConnect:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect.seconds = connect_seconds() + time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """requests adapter whose new connections add their setup time (DNS, connect, TLS) to connect_seconds()."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool,
+                                                   "https": _TimedHTTPSConnectionPool}
+
+
+class RollingHistogram:
+    """Log-bucketed histogram over the last `window` seconds, kept in `slices` rotating parts."""
+
+    def __init__(self, window: float = 300.0, slices: int = 5):
+        self.slice_seconds = window / slices
+        self._slices = [[0] * _BUCKETS for _ in range(slices)]
+        self._slice_ids = [-1] * slices
+
+    def record(self, seconds, now):
+        slice_id = int(now // self.slice_seconds)
+        i = slice_id % len(self._slices)
+        if self._slice_ids[i] != slice_id: # Slot holds an expired slice; reuse it
+            self._slices[i] = [0] * _BUCKETS
+            self._slice_ids[i] = slice_id
+        bucket = 0 if seconds <= _MIN_SECONDS else min(_BUCKETS - 1, int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH) + 1)
+        self._slices[i][bucket] += 1
+
+    def percentiles(self, quantiles, now):
+        """Returns {q: seconds (bucket upper bound)} for the live window; None if empty."""
+        oldest = int(now // self.slice_seconds) - len(self._slices) + 1
+        counts = [0] * _BUCKETS
+        for slice_id, buckets in zip(self._slice_ids, self._slices):
+            if slice_id >= oldest:
+                counts = [a + b for a, b in zip(counts, buckets)]
+        total = sum(counts)
+        if not total:
+            return {q: None for q in quantiles}
+        result = {}
+        for q in quantiles:
+            target, seen = q * total, 0
+            for bucket, count in enumerate(counts):
+                seen += count
+                if seen >= target:
+                    result[q] = BUCKET_BOUNDS[bucket]
+                    break
+        return result
+
+
+class EndpointStats:
+    def __init__(self, window: float):
+        self.calls = 0
+        self.errors = 0
+        self.errors_by_status = {}
+        self.weight = 0
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.counts = {phase: 0 for phase in PHASES} # connect/http/client are unknown for unanswered calls
+        self.histograms = {phase: RollingHistogram(window) for phase in PHASES}
+
+
+class Metrics:
+    def __init__(self, window: float = 300.0):
+        """
+        :param window: Seconds of history the percentiles cover
+        """
+        self.window = window
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, total, queue=0.0, http=None, weight=0, error_status=None, connect=0.0):
+        """
+        Records one API call.
+        :param total: Wall time of the whole call in seconds
+        :param queue: Time spent waiting for the rate limiter
+        :param http: Time from request sent to response received, connection setup included (None if unknown)
+        :param weight: Request weight charged for the call
+        :param error_status: HTTP status (or "exception") if the call failed
+        :param connect: Part of http spent opening a new connection (DNS, connect, TLS)
+        """
+        now = time.time()
+        phases = {"total": total, "queue": queue}
+        if http is not None:
+            phases["connect"] = connect
+            phases["http"] = max(0.0, http - connect)
+            phases["client"] = max(0.0, total - queue - http)
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats(self.window)
+            stats.calls += 1
+            stats.weight += weight
+            if error_status is not None:
+                stats.errors += 1
+                stats.errors_by_status[error_status] = stats.errors_by_status.get(error_status, 0) + 1
+            for phase, seconds in phases.items():
+                stats.seconds[phase] += seconds
+                stats.counts[phase] += 1
+                stats.histograms[phase].record(seconds, now)
+
+    def snapshot(self):
+        """Returns {endpoint: {...}} with counters and p50/p95/p99 (ms) per phase."""
+        now = time.time()
+        result = {}
+        with self._lock:
+            for endpoint, stats in sorted(self.endpoints.items()):
+                entry = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "errors_by_status": dict(stats.errors_by_status),
+                    "weight": stats.weight,
+                }
+                for phase in PHASES:
+                    p = stats.histograms[phase].percentiles((0.5, 0.95, 0.99), now)
+                    entry[phase] = {f"p{int(q * 100)}_ms": (v * 1000 if v is not None else None) for q, v in p.items()}
+                result[endpoint] = entry
+        return result
+
+    def format_table(self):
+        """Human-readable per-endpoint summary."""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "No API calls recorded yet."
+        lines = [f"Latency over the last {self.window:.0f}s (ms; connect = DNS/TCP/TLS of new connections, "
+                 f"http = network + exchange, client = our overhead)",
+                 f"{'endpoint':34} {'calls':>7} {'errors':>6} {'weight':>7} "
+                 f"{'p50':>8} {'p95':>8} {'p99':>8} {'http p50':>9} {'client p50':>10} {'queue p99':>9} "
+                 f"{'connect p99':>11}"]
+
+        def ms(value):
+            return f"{value:.2f}" if value is not None else "-"
+
+        for endpoint, e in snapshot.items():
+            lines.append(
+                f"{endpoint:34} {e['calls']:7d} {e['errors']:6d} {e['weight']:7d} "
+                f"{ms(e['total']['p50_ms']):>8} {ms(e['total']['p95_ms']):>8} {ms(e['total']['p99_ms']):>8} "
+                f"{ms(e['http']['p50_ms']):>9} {ms(e['client']['p50_ms']):>10} {ms(e['queue']['p99_ms']):>9} "
+                f"{ms(e['connect']['p99_ms']):>11}")
+        return "\n".join(lines)
+
+    def prometheus(self, prefix="trading_bot"):
+        """Prometheus text exposition format."""
+        now = time.time()
+        out = [
+            f"# HELP {prefix}_api_calls_total API calls per endpoint.",
+            f"# TYPE {prefix}_api_calls_total counter",
+        ]
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            for endpoint, s in items:
+                out.append(f'{prefix}_api_calls_total{{endpoint="{endpoint}"}} {s.calls}')
+            out += [f"# HELP {prefix}_api_errors_total Failed API calls per endpoint and status.",
+                    f"# TYPE {prefix}_api_errors_total counter"]
+            for endpoint, s in items:
+                for status, count in sorted(s.errors_by_status.items(), key=str):
+                    out.append(f'{prefix}_api_errors_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+            out += [f"# HELP {prefix}_api_request_weight_total Request weight used per endpoint.",
+                    f"# TYPE {prefix}_api_request_weight_total counter"]
+            for endpoint, s in items:
+                out.append(f'{prefix}_api_request_weight_total{{endpoint="{endpoint}"}} {s.weight}')
+            out += [f"# HELP {prefix}_api_latency_seconds API call latency per endpoint and phase "
+                    f"(quantiles over the last {self.window:.0f}s).",
+                    f"# TYPE {prefix}_api_latency_seconds summary"]
+            for endpoint, s in items:
+                for phase in PHASES:
+                    labels = f'endpoint="{endpoint}",phase="{phase}"'
+                    for q, v in s.histograms[phase].percentiles((0.5, 0.95, 0.99), now).items():
+                        if v is not None:
+                            out.append(f'{prefix}_api_latency_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+                    out.append(f"{prefix}_api_latency_seconds_sum{{{labels}}} {s.seconds[phase]:.6f}")
+                    out.append(f"{prefix}_api_latency_seconds_count{{{labels}}} {s.counts[phase]}")
+        return "\n".join(out) + "\n"
@@ -0,0 +1,267 @@
+# order_journal.py
+"""
+Write-ahead journal of every order the bot sends.
+
+Each order gets a deterministic client order ID (journal session + sequence
+number) and an intent record that is committed before the request goes out;
+the exchange's answer, a rejection, or "outcome unknown" (timeout, 5xx,
+crash mid-request) is appended afterwards. Because the ID is fixed before
+the first attempt, a retry or a restarted process can ask the exchange
+whether that order exists instead of sending it twice.
+
+The journal is an append-only SQLite table in WAL mode. One writer thread
+owns the connection and commits everything queued since its last commit in
+one transaction (group commit), so concurrent callers share one commit, and
+with synchronous=FULL one fsync. NORMAL (the default) survives a crash of
+the process, which is what the journal guards against; FULL also survives
+power loss.
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from logger_setup import log
+
+DEFAULT_JOURNAL_PATH = "order_journal.db"
+CLIENT_ID_PREFIX = "tb"
+
+# Journal statuses besides the exchange's own order statuses (NEW, FILLED, ...)
+PENDING = "PENDING" # Intent committed, request not answered yet
+UNKNOWN = "UNKNOWN" # Request sent, but whether the exchange has the order is unknown
+REJECTED = "REJECTED" # The exchange refused it; no order exists
+MISSING = "MISSING" # Reconcile found no such order: the request never reached the exchange
+UNRESOLVED_STATUSES = (PENDING, UNKNOWN)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, owner TEXT NOT NULL, pid INTEGER, started REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY, owner TEXT NOT NULL, client_order_id TEXT NOT NULL, ts REAL NOT NULL,
+    status TEXT NOT NULL, symbol TEXT, order_id INTEGER, data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_owner_client_order_id ON events (owner, client_order_id, id);
+CREATE TABLE IF NOT EXISTS unresolved (
+    owner TEXT NOT NULL, client_order_id TEXT NOT NULL, PRIMARY KEY (owner, client_order_id)
+);
+"""
+INSERT_EVENT = ("INSERT INTO events (owner, client_order_id, ts, status, symbol, order_id, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+class JournalError(RuntimeError):
+    """Raised when an entry could not be committed; the order must not be sent."""
+
+
+def account_owner(api_key):
+    """Short, stable tag for an API key, so one journal file can hold several accounts."""
+    return hashlib.sha256(str(api_key or "").encode()).hexdigest()[:12]
+
+
+class OrderJournal:
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, owner="", synchronous="NORMAL", prefix=CLIENT_ID_PREFIX):
+        """
+        Opens (or creates) the journal and starts a new session in it.
+        :param path: SQLite database file; several processes may share it
+        :param owner: Account tag (see account_owner) stored with every entry
+        :param synchronous: SQLite synchronous mode, "NORMAL" or "FULL" (fsync every commit)
+        :param prefix: Start of every client order ID this journal hands out
+        """
+        self.path = path
+        self.owner = owner
+        self.synchronous = synchronous.upper()
+        if self.synchronous not in ("OFF", "NORMAL", "FULL"):
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+            with conn:
+                # The session row ID makes client IDs unique across runs and processes sharing the file
+                session = conn.execute("INSERT INTO sessions (owner, pid, started) VALUES (?, ?, ?)",
+                                       (owner, os.getpid(), time.time())).lastrowid
+        finally:
+            conn.close()
+        self.session = session
+        self.id_prefix = f"{prefix}{session}-"
+        self._sequence = 0
+        self._id_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._queue = [] # (rows, outcome) batches; outcome is a dict the writer fills in if the caller waits
+        self._queued = 0 # Entries handed to the writer
+        self._written = 0 # Entries committed
+        self._commits = 0
+        self._error = None # Cause of the last failed commit, cleared by the next successful one
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="OrderJournal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close) # Commit the last status records before the interpreter exits
+        log.info(f"Order journal {path} opened (session {session}, synchronous={self.synchronous}).")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def next_client_order_id(self):
+        """Returns the next client order ID of this session (e.g. "tb12-7")."""
+        with self._id_lock:
+            self._sequence += 1
+            return f"{self.id_prefix}{self._sequence}"
+
+    # --- Writing ---
+    def _run(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+            log.error(f"Order journal {self.path} could not be opened for writing: {e}")
+            return
+        carried = [] # Status rows of a failed commit, retried with the next batch
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                batches, self._queue = self._queue, []
+            if not batches and not carried:
+                break
+            rows = carried + [row for batch, _ in batches for row in batch]
+            appended = len(rows) - len(carried)
+            # Index of orders whose latest status is unresolved, so startup never scans the log
+            latest = {(row[0], row[1]): row[3] in UNRESOLVED_STATUSES for row in rows}
+            try:
+                with conn:
+                    conn.executemany(INSERT_EVENT, rows)
+                    conn.executemany("INSERT OR IGNORE INTO unresolved VALUES (?, ?)",
+                                     [key for key, open_ in latest.items() if open_])
+                    conn.executemany("DELETE FROM unresolved WHERE owner = ? AND client_order_id = ?",
+                                     [key for key, open_ in latest.items() if not open_])
+            except sqlite3.Error as e:
+                log.error(f"Order journal write of {len(rows)} entr(ies) failed: {e}")
+                # Waiting callers (intents) are told and don't send; the rest is retried
+                carried = carried + [row for batch, outcome in batches if outcome is None for row in batch]
+                with self._cond:
+                    self._error = e
+                    self._written += appended
+                    for _, outcome in batches:
+                        if outcome is not None:
+                            outcome["error"] = e
+                    self._cond.notify_all()
+                if not batches: # Closing and the retry failed too
+                    break
+                continue
+            carried = []
+            with self._cond:
+                self._error = None
+                self._written += appended
+                self._commits += 1
+                for _, outcome in batches:
+                    if outcome is not None:
+                        outcome["error"] = None
+                self._cond.notify_all()
+        conn.close()
+
+    def _append(self, rows, wait):
+        with self._cond:
+            if self._closed:
+                raise JournalError("Order journal is closed")
+            if not self._thread.is_alive():
+                raise JournalError(f"Order journal is not writing: {self._error}")
+            outcome = {} if wait else None
+            self._queue.append((rows, outcome))
+            self._queued += len(rows)
+            self._cond.notify_all()
+            if wait:
+                while "error" not in outcome and self._thread.is_alive():
+                    self._cond.wait(0.1)
+                if outcome.get("error", self._error) is not None:
+                    raise JournalError(f"Order journal write failed: {outcome.get('error', self._error)}")
+
+    def _row(self, client_order_id, status, symbol=None, order_id=None, data=None):
+        return (self.owner, client_order_id, time.time(), status, symbol, order_id,
+                json.dumps(data, separators=(",", ":")) if data is not None else None)
+
+    def record_intent(self, client_order_id, params):
+        """
+        Commits the intent to send an order; returns once it is on disk.
+        Raises JournalError if it could not be written.
+        :param params: The create-order params (symbol, side, type, quantity, ...)
+        """
+        self._append([self._row(client_order_id, PENDING, params.get("symbol"), data=params)], wait=True)
+
+    def record_intents(self, entries):
+        """Commits several (client_order_id, params) intents in one transaction."""
+        self._append([self._row(cid, PENDING, params.get("symbol"), data=params) for cid, params in entries],
+                     wait=True)
+
+    def record_order(self, client_order_id, order):
+        """Appends the exchange's view of an order (create/query response) without waiting."""
+        self._append([self._row(client_order_id, order.get("status") or "NEW", order.get("symbol"),
+                                order.get("orderId") or order.get("algoId"))], wait=False)
+
+    def record_status(self, client_order_id, status, symbol=None, error=None):
+        """Appends a journal status (UNKNOWN, REJECTED, MISSING) without waiting."""
+        self._append([self._row(client_order_id, status, symbol, data={"error": error} if error else None)],
+                     wait=False)
+
+    def flush(self):
+        """Blocks until everything appended so far is committed."""
+        with self._cond:
+            ticket = self._queued
+            while self._written < ticket and self._thread.is_alive():
+                self._cond.wait(0.1)
+
+    def close(self):
+        """Commits what is queued and stops the writer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        return {"entries": self._written, "commits": self._commits, "session": self.session}
+
+    # --- Reading ---
+    def _query(self, sql, args):
+        self.flush()
+        conn = self._connect()
+        try:
+            return conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+    def latest(self, limit=None, unresolved_only=False):
+        """
+        Returns the latest entry of this owner's orders, newest first.
+        :param limit: Only the most recent orders
+        :param unresolved_only: Only orders whose latest status is PENDING or UNKNOWN
+        :return: List of dicts with client_order_id, status, symbol, order_id, ts, params
+        """
+        orders = ("SELECT client_order_id FROM unresolved WHERE owner = ?" if unresolved_only else
+                  "SELECT DISTINCT client_order_id FROM events WHERE owner = ?")
+        rows = self._query(
+            "SELECT e.client_order_id, e.status, e.symbol, e.order_id, e.ts, "
+            "(SELECT data FROM events i WHERE i.owner = e.owner AND i.client_order_id = e.client_order_id "
+            " ORDER BY i.id LIMIT 1) "
+            "FROM events e WHERE e.id IN (SELECT (SELECT MAX(id) FROM events m WHERE m.owner = ? "
+            f"AND m.client_order_id = o.client_order_id) FROM ({orders}) o) ORDER BY e.id DESC LIMIT ?",
+            (self.owner, self.owner, -1 if limit is None else limit))
+        return [{"client_order_id": cid, "status": status, "symbol": symbol, "order_id": order_id, "ts": ts,
+                 "params": json.loads(params) if params else {}}
+                for cid, status, symbol, order_id, ts, params in rows]
+
+    def unresolved(self):
+        """Orders whose existence on the exchange is not known (PENDING or UNKNOWN), oldest first."""
+        return self.latest(unresolved_only=True)[::-1]
+
+    def history(self, client_order_id):
+        """Every entry of one order, oldest first, as (ts, status, order_id) tuples."""
+        return self._query("SELECT ts, status, order_id FROM events WHERE owner = ? AND client_order_id = ? "
+                           "ORDER BY id", (self.owner, client_order_id))
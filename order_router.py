@@ -0,0 +1,307 @@
+# order_router.py
+"""
+Multi-account order router: shards accounts (or account/symbol pairs) across
+a pool of worker processes, each holding warm BasicBots, so throughput scales
+with cores instead of one GIL-bound client.
+
+Ordering: every request for the same shard key - the account, or the
+(account, symbol) pair with shard_by="symbol" - goes to the same worker and is
+executed by one thread there in submission order. Different keys run
+concurrently, both across workers and across threads within a worker.
+
+Results come back on a single result queue and resolve the
+concurrent.futures.Future returned by submit()/place().
+
+Accounts file (JSON list, or {"accounts": [...]}); secrets may be given
+directly or as the name of an environment variable:
+    [{"name": "sub1", "api_key": "...", "api_secret": "..."},
+     {"name": "sub2", "api_key_env": "SUB2_KEY", "api_secret_env": "SUB2_SECRET"}]
+"""
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import zlib
+from concurrent.futures import Future
+
+from basic_bot import FUTURES_TESTNET_API_URL, BasicBot
+from logger_setup import LOG_FILE, log, setup_logger
+from rate_limiter import RequestScheduler
+
+DEFAULT_FUTURES_URL = os.getenv("BINANCE_FUTURES_API_URL", FUTURES_TESTNET_API_URL)
+IP_WEIGHT_LIMIT = 2400 # Request weight per minute is shared by everything behind one IP
+ACCOUNT_ORDER_LIMIT_10S = 300 # Order-count limits are per account, shared by every worker holding it
+ACCOUNT_ORDER_LIMIT_1M = 1200
+ORDER_METHODS = {
+    "MARKET": "place_market_order",
+    "LIMIT": "place_limit_order",
+    "STOP_LIMIT": "place_stop_limit_order",
+}
+
+
+class OrderRouterError(RuntimeError):
+    """Raised (through the request's Future) when a request cannot be executed."""
+
+
+def load_accounts(path):
+    """
+    Reads credential sets from a JSON accounts file.
+    :return: List of {"name", "api_key", "api_secret"} dicts
+    """
+    with open(path) as f:
+        data = json.load(f)
+    entries = data["accounts"] if isinstance(data, dict) else data
+    accounts = []
+    for i, entry in enumerate(entries):
+        name = str(entry.get("name", f"account{i}"))
+        key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+        secret = entry.get("api_secret") or os.getenv(entry.get("api_secret_env", ""), "")
+        if not key or not secret:
+            raise ValueError(f"Account {name}: api_key/api_secret (or *_env variables) missing")
+        accounts.append({"name": name, "api_key": key, "api_secret": secret})
+    names = [a["name"] for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("Account names must be unique")
+    return accounts
+
+
+def order_request(order):
+    """
+    Maps an order spec (symbol, side, type, quantity, price, stop_price; as in
+    `main.py batch`) to a BasicBot method name and arguments.
+    """
+    order_type = str(order.get("type", "LIMIT")).upper().replace("-", "_")
+    if order_type == "STOP":
+        order_type = "STOP_LIMIT"
+    if order_type not in ORDER_METHODS:
+        raise ValueError(f"Unsupported order type: {order.get('type')}")
+    args = [str(order["symbol"]).upper(), str(order["side"]).upper(), float(order["quantity"])]
+    if order_type in ("LIMIT", "STOP_LIMIT"):
+        args.append(float(order["price"]))
+    if order_type == "STOP_LIMIT":
+        args.append(float(order["stop_price"]))
+    return ORDER_METHODS[order_type], args
+
+
+def _worker_log_file(worker_id):
+    root, ext = os.path.splitext(LOG_FILE)
+    return f"{root}.worker{worker_id}{ext or '.log'}"
+
+
+def _worker_main(worker_id, accounts, futures_url, bot_options, weight_limit, account_share, requests, results):
+    """
+    Worker process: builds one BasicBot per account, then runs one thread per shard key.
+    account_share is the number of workers holding each account; their order-count limits are split between them.
+    """
+    setup_logger(log_file=_worker_log_file(worker_id)) # One log file per process; rotation isn't multi-process safe
+
+    bots, failed = {}, {}
+    for account in accounts:
+        try:
+            options = dict(bot_options)
+            if options.get("rate_limit", True) and "scheduler" not in options:
+                options["scheduler"] = RequestScheduler(
+                    weight_limit=weight_limit, order_limit_10s=max(1, ACCOUNT_ORDER_LIMIT_10S // account_share),
+                    order_limit_1m=max(1, ACCOUNT_ORDER_LIMIT_1M // account_share))
+            bots[account["name"]] = BasicBot(account["api_key"], account["api_secret"], futures_url=futures_url,
+                                             **options)
+        except Exception as e:
+            failed[account["name"]] = str(e)
+    results.put(("ready", worker_id, list(bots), failed))
+
+    lanes = {} # shard key -> (queue, thread)
+
+    def run_lane(lane):
+        while True:
+            item = lane.get()
+            if item is None:
+                return
+            request_id, account, method, args, kwargs = item
+            bot = bots.get(account)
+            try:
+                if bot is None:
+                    raise OrderRouterError(f"Account {account} is not available in worker {worker_id}: "
+                                           f"{failed.get(account, 'unknown account')}")
+                if method.startswith("_") or not callable(getattr(bot, method, None)):
+                    raise OrderRouterError(f"Unknown BasicBot method: {method}")
+                results.put(("result", request_id, True, getattr(bot, method)(*args, **kwargs)))
+            except Exception as e:
+                results.put(("result", request_id, False, f"{type(e).__name__}: {e}"))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        key = item[0]
+        lane = lanes.get(key)
+        if lane is None:
+            lane_queue = queue.SimpleQueue()
+            thread = threading.Thread(target=run_lane, args=(lane_queue,), name=f"lane-{key}", daemon=True)
+            thread.start()
+            lane = lanes[key] = (lane_queue, thread)
+        lane[0].put(item[1:])
+    for lane_queue, thread in lanes.values():
+        lane_queue.put(None)
+    for _, thread in lanes.values():
+        thread.join()
+    for bot in bots.values():
+        bot.stop_user_stream()
+    results.put(("stopped", worker_id))
+
+
+class OrderRouter:
+    def __init__(self, accounts, workers=None, shard_by="account", futures_url=DEFAULT_FUTURES_URL,
+                 bot_options=None, weight_limit=IP_WEIGHT_LIMIT, start_timeout=60.0):
+        """
+        Starts the worker pool and waits until every worker has its bots connected.
+        :param accounts: Credential dicts (see load_accounts)
+        :param workers: Worker processes (default: one per core, at most one per account when sharding by account)
+        :param shard_by: "account" (each account lives in one worker) or "symbol" (each
+                         (account, symbol) pair does; every worker then connects every account)
+        :param bot_options: Extra BasicBot keyword arguments (e.g. {"validate_orders": False})
+        :param weight_limit: Request-weight budget per minute for the whole pool (one IP), split evenly between bots;
+                             with shard_by="symbol" each account's order-count limits are also split between workers
+        """
+        if shard_by not in ("account", "symbol"):
+            raise ValueError("shard_by must be 'account' or 'symbol'")
+        if not accounts:
+            raise ValueError("OrderRouter needs at least one account")
+        workers = workers or os.cpu_count() or 1
+        if shard_by == "account":
+            workers = min(workers, len(accounts))
+        self.workers = workers
+        self.shard_by = shard_by
+        self.accounts = [a["name"] for a in accounts]
+        self._account_worker = {name: i % workers for i, name in enumerate(self.accounts)}
+        if shard_by == "account":
+            assignments = [[a for i, a in enumerate(accounts) if i % workers == w] for w in range(workers)]
+        else:
+            assignments = [list(accounts)] * workers
+        account_share = 1 if shard_by == "account" else workers
+        bots = sum(len(a) for a in assignments)
+        bot_weight_limit = max(1, weight_limit // bots)
+
+        context = multiprocessing.get_context("spawn") # The parent runs threads; don't fork them
+        self._results = context.Queue()
+        self._queues = [context.Queue() for _ in range(workers)]
+        self._processes = [
+            context.Process(target=_worker_main, name=f"OrderRouter-{w}",
+                            args=(w, assignments[w], futures_url, bot_options or {}, bot_weight_limit,
+                                  account_share, self._queues[w], self._results), daemon=True)
+            for w in range(workers)
+        ]
+        self._pending = {} # request id -> (Future, worker)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._ready = threading.Event()
+        self._ready_workers = set()
+        self.failed_accounts = {}
+        self._closed = False
+        for process in self._processes:
+            process.start()
+        self._collector = threading.Thread(target=self._collect, name="OrderRouterResults", daemon=True)
+        self._collector.start()
+        if not self._ready.wait(start_timeout):
+            self.close()
+            raise OrderRouterError(f"Workers did not start within {start_timeout}s")
+        log.info(f"Order router started: {len(self.accounts)} account(s) on {workers} worker(s), "
+                 f"sharded by {shard_by}.")
+        if self.failed_accounts:
+            log.error(f"Accounts that failed to connect: {self.failed_accounts}")
+
+    def _worker_for(self, account, symbol):
+        if self.shard_by == "account":
+            return self._account_worker[account]
+        return zlib.crc32(f"{account}|{symbol}".encode()) % self.workers
+
+    def submit(self, account, method, *args, shard_symbol=None, **kwargs):
+        """
+        Queues one BasicBot method call for an account.
+        :param shard_symbol: Shard key with shard_by="symbol" (default: the `symbol` argument,
+                             else the first positional argument)
+        :return: Future resolving to the method's return value
+        """
+        if self._closed:
+            raise OrderRouterError("Router is closed")
+        if account not in self._account_worker:
+            raise OrderRouterError(f"Unknown account: {account}")
+        symbol = shard_symbol or kwargs.get("symbol") or (args[0] if args else None)
+        worker = self._worker_for(account, symbol)
+        key = account if self.shard_by == "account" else f"{account}|{symbol}"
+        future = Future()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = (future, worker)
+            # Put under the lock so requests for one key enter the worker queue in submission order
+            self._queues[worker].put((key, request_id, account, method, args, kwargs))
+        return future
+
+    def place(self, account, order):
+        """Queues an order spec dict (see order_request); returns a Future of the order response."""
+        method, args = order_request(order)
+        return self.submit(account, method, *args)
+
+    def _collect(self):
+        stopped = set()
+        while len(stopped) < self.workers:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                for worker, process in enumerate(self._processes):
+                    if worker not in stopped and not process.is_alive():
+                        stopped.add(worker)
+                        self._fail_worker(worker, f"worker {worker} exited with code {process.exitcode}")
+                        self._mark_ready(worker)
+                continue
+            kind = message[0]
+            if kind == "result":
+                _, request_id, ok, payload = message
+                with self._lock:
+                    future, _ = self._pending.pop(request_id, (None, None))
+                if future is not None:
+                    if ok:
+                        future.set_result(payload)
+                    else:
+                        future.set_exception(OrderRouterError(payload))
+            elif kind == "ready":
+                _, worker, _, failed = message
+                self.failed_accounts.update(failed)
+                self._mark_ready(worker)
+            elif kind == "stopped":
+                stopped.add(message[1])
+        self._ready.set()
+
+    def _mark_ready(self, worker):
+        self._ready_workers.add(worker)
+        if len(self._ready_workers) == self.workers:
+            self._ready.set()
+
+    def _fail_worker(self, worker, reason):
+        log.error(f"Order router {reason}; failing its pending requests.")
+        with self._lock:
+            lost = [rid for rid, (_, w) in self._pending.items() if w == worker]
+            futures = [self._pending.pop(rid)[0] for rid in lost]
+        for future in futures:
+            future.set_exception(OrderRouterError(reason))
+
+    def close(self, timeout=30.0):
+        """Lets the workers finish queued requests, then stops them."""
+        if self._closed:
+            return
+        self._closed = True
+        for q in self._queues:
+            q.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout)
+        log.info("Order router stopped.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
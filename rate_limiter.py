@@ -0,0 +1,206 @@
+# rate_limiter.py
+"""
+Client-side pacing for the Binance Futures request-weight and order-count limits.
+
+Every BasicBot call asks the RequestScheduler for permission before it goes
+out. The scheduler keeps one token bucket per exchange limit, charges each
+call the endpoint's known weight, and lets the highest-priority waiter
+(cancels first, then new orders, then queries) go as soon as enough tokens
+are available. After each response the X-MBX-USED-WEIGHT-1M and
+X-MBX-ORDER-COUNT-* headers tell the scheduler how much of the exchange's
+current fixed window is left, so bursts that the buckets would allow never
+overrun a window, and a 429/418 pauses everything for the Retry-After period.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from logger_setup import log
+
+# Limit names
+REQUEST_WEIGHT = "REQUEST_WEIGHT"
+ORDERS_10S = "ORDERS_10S"
+ORDERS_1M = "ORDERS_1M"
+
+# Response header reporting the exchange's usage for each limit
+LIMIT_HEADERS = {
+    REQUEST_WEIGHT: "X-MBX-USED-WEIGHT-1M",
+    ORDERS_10S: "X-MBX-ORDER-COUNT-10S",
+    ORDERS_1M: "X-MBX-ORDER-COUNT-1M",
+}
+
+# Priorities (lower goes first)
+PRIORITY_CANCEL = 0
+PRIORITY_ORDER = 1
+PRIORITY_QUERY = 2
+
+
+def _depth_weight(params):
+    limit = int(params.get("limit", 500))
+    return 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+
+
+def _klines_weight(params):
+    limit = int(params.get("limit", 500))
+    return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+
+
+# client method -> (priority, {limit name: cost or callable(params) -> cost})
+# Weights follow the USDT-M Futures REST documentation.
+ENDPOINT_COSTS = {
+    "futures_ping": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+    "futures_exchange_info": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+    "futures_create_order": (PRIORITY_ORDER, {ORDERS_10S: 1, ORDERS_1M: 1}),
+    "futures_place_batch_order": (PRIORITY_ORDER, {REQUEST_WEIGHT: 5, ORDERS_10S: 5, ORDERS_1M: 1}),
+    "futures_cancel_order": (PRIORITY_CANCEL, {REQUEST_WEIGHT: 1}),
+    "futures_cancel_orders": (PRIORITY_CANCEL, {REQUEST_WEIGHT: 1}),
+    "futures_cancel_all_open_orders": (PRIORITY_CANCEL, {REQUEST_WEIGHT: 1}),
+    "futures_get_order": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+    "futures_get_open_orders": (PRIORITY_QUERY, {REQUEST_WEIGHT: lambda p: 1 if p.get("symbol") else 40}),
+    "futures_account_balance": (PRIORITY_QUERY, {REQUEST_WEIGHT: 5}),
+    "futures_account": (PRIORITY_QUERY, {REQUEST_WEIGHT: 5}),
+    "futures_position_information": (PRIORITY_QUERY, {REQUEST_WEIGHT: 5}),
+    "futures_change_leverage": (PRIORITY_ORDER, {REQUEST_WEIGHT: 1}),
+    "futures_order_book": (PRIORITY_QUERY, {REQUEST_WEIGHT: _depth_weight}),
+    "futures_klines": (PRIORITY_QUERY, {REQUEST_WEIGHT: _klines_weight}),
+    "futures_aggregate_trades": (PRIORITY_QUERY, {REQUEST_WEIGHT: 20}),
+    "futures_stream_get_listen_key": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+    "futures_stream_keepalive": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+    "futures_stream_close": (PRIORITY_QUERY, {REQUEST_WEIGHT: 1}),
+}
+DEFAULT_COST = (PRIORITY_QUERY, {REQUEST_WEIGHT: 1})
+
+
+def endpoint_cost(endpoint, params=None):
+    """Returns (priority, {limit: cost}) for a client method called with params."""
+    priority, costs = ENDPOINT_COSTS.get(endpoint, DEFAULT_COST)
+    params = params or {}
+    return priority, {name: c(params) if callable(c) else c for name, c in costs.items()}
+
+
+class TokenBucket:
+    """
+    Bucket of `capacity` tokens refilled continuously over `interval` seconds,
+    additionally capped by what the exchange reports as left in its current
+    fixed window (windows are aligned to the wall clock, as on Binance).
+    """
+
+    def __init__(self, capacity: float, interval: float):
+        self.capacity = capacity
+        self.interval = interval
+        self.rate = capacity / interval
+        self.tokens = capacity
+        self._last = time.monotonic()
+        self.window_end = 0.0 # Wall-clock end of the window we have exchange usage for
+        self.window_remaining = capacity
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self, cost, wall):
+        """Seconds until `cost` tokens are available (0 if they already are)."""
+        cost = min(cost, self.capacity) # Oversized requests wait for a full bucket
+        wait = 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+        if wall < self.window_end and self.window_remaining < cost:
+            wait = max(wait, self.window_end - wall)
+        return wait
+
+    def charge(self, cost, wall):
+        self.tokens -= cost
+        if wall < self.window_end:
+            self.window_remaining -= cost
+
+    def sync(self, remaining, wall):
+        """Adopts the exchange's view of what is left in the current window."""
+        self.window_end = (wall // self.interval + 1) * self.interval
+        self.window_remaining = remaining
+
+
+class RequestScheduler:
+    def __init__(self, weight_limit=2400, weight_interval=60.0, order_limit_10s=300,
+                 order_limit_1m=1200, order_interval_10s=10.0, order_interval_1m=60.0, safety=0.9):
+        """
+        :param weight_limit: Exchange request-weight limit per weight_interval seconds
+        :param order_limit_10s: Exchange order-count limit per order_interval_10s seconds
+        :param order_limit_1m: Exchange order-count limit per order_interval_1m seconds
+        :param safety: Fraction of each limit the scheduler allows itself to use
+        """
+        self.safety = safety
+        self.limits = {
+            REQUEST_WEIGHT: weight_limit,
+            ORDERS_10S: order_limit_10s,
+            ORDERS_1M: order_limit_1m,
+        }
+        self.buckets = {
+            REQUEST_WEIGHT: TokenBucket(weight_limit * safety, weight_interval),
+            ORDERS_10S: TokenBucket(order_limit_10s * safety, order_interval_10s),
+            ORDERS_1M: TokenBucket(order_limit_1m * safety, order_interval_1m),
+        }
+        self.paused_until = 0.0
+        self.in_flight = {name: 0 for name in self.buckets} # cost sent but not yet answered
+        self._cond = threading.Condition()
+        self._waiters = [] # heap of (priority, sequence)
+        self._sequence = itertools.count()
+
+    def _wait_time(self, costs, now, wall):
+        wait = max(0.0, self.paused_until - now)
+        for name, cost in costs.items():
+            bucket = self.buckets[name]
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(cost, wall))
+        return wait
+
+    def acquire(self, endpoint, params=None):
+        """
+        Blocks until the call may be sent without exceeding any limit, then
+        charges its cost. Waiters are served strictly by priority, then FIFO.
+        :return: The charged costs, to be handed back to observe() with the response
+        """
+        priority, costs = endpoint_cost(endpoint, params)
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    if self._waiters[0] == ticket:
+                        wait = self._wait_time(costs, time.monotonic(), time.time())
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                wall = time.time()
+                for name, cost in costs.items():
+                    self.buckets[name].charge(cost, wall)
+                    self.in_flight[name] += cost
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+        return costs
+
+    def observe(self, costs, status_code=None, headers=None):
+        """
+        Marks an acquired call as answered and resynchronises with the exchange.
+        :param costs: Value returned by acquire() for this call
+        :param status_code: HTTP status of the response (None if no response arrived)
+        :param headers: Response headers (case-insensitive mapping)
+        """
+        with self._cond:
+            for name, cost in costs.items():
+                self.in_flight[name] -= cost
+            headers = headers or {}
+            now, wall = time.monotonic(), time.time()
+            for name, header in LIMIT_HEADERS.items():
+                used = headers.get(header)
+                if used is not None:
+                    # The exchange's count includes this call but not others still in flight
+                    remaining = self.limits[name] * self.safety - int(used) - self.in_flight[name]
+                    self.buckets[name].sync(remaining, wall)
+            if status_code in (429, 418):
+                retry_after = float(headers.get("Retry-After") or 60)
+                self.paused_until = max(self.paused_until, now + retry_after)
+                log.warning(f"Rate limit hit (HTTP {status_code}); pausing requests for {retry_after:.0f}s.")
+            self._cond.notify_all()
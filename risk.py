@@ -0,0 +1,426 @@
+# risk.py
+"""
+Pre-trade risk gate in front of every order BasicBot sends.
+
+Orders are checked against in-memory state only: open orders and orders in
+flight (reserved when they pass and replaced by the exchange's
+acknowledgement), positions from the ledger, leverage from set_leverage and
+a reference price (live order-book mid, else the latest fill or ledger
+mark). A check is a few dict lookups and float comparisons; a failed one
+returns a RiskReject naming the limit and the offending value instead of
+the exchange refusing the order after a round-trip.
+
+Checks, in order:
+    KILL_SWITCH          the switch is engaged: no new orders at all
+    PRICE_BAND           limit price further than price_band from a fresh reference price
+    MAX_ORDER_NOTIONAL   quantity x price of this order
+    MAX_OPEN_ORDERS      open plus in-flight orders across all symbols
+    MAX_SYMBOL_NOTIONAL  worst-case exposure on the symbol: the position plus every
+                         open order on one side
+    POSITION_LIMIT       the same exposure against leverage x max_position_margin and the
+                         exchange's maxNotionalValue for the leverage set
+Orders that do not increase the symbol's worst-case exposure pass the last two,
+so positions can always be reduced.
+"""
+import json
+import os
+import threading
+import time
+
+from logger_setup import log
+
+DEFAULT_LIMITS_PATH = "risk_limits.json"
+KILL_SWITCH_PATH = "kill_switch.json"
+DEFAULT_LEVERAGE = 20 # The exchange default until set_leverage says otherwise
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+QTY_TOLERANCE = 1e-9
+
+# Reject reasons
+KILL_SWITCH = "KILL_SWITCH"
+PRICE_BAND = "PRICE_BAND"
+NO_REFERENCE_PRICE = "NO_REFERENCE_PRICE"
+MAX_ORDER_NOTIONAL = "MAX_ORDER_NOTIONAL"
+MAX_OPEN_ORDERS = "MAX_OPEN_ORDERS"
+MAX_SYMBOL_NOTIONAL = "MAX_SYMBOL_NOTIONAL"
+POSITION_LIMIT = "POSITION_LIMIT"
+
+
+class RiskLimits:
+    __slots__ = ("max_order_notional", "max_symbol_notional", "max_open_orders", "max_position_margin",
+                 "price_band", "price_max_age", "allow_unpriced")
+
+    def __init__(self, max_order_notional=50000.0, max_symbol_notional=200000.0, max_open_orders=200,
+                 max_position_margin=10000.0, price_band=0.05, price_max_age=60.0, allow_unpriced=False):
+        """
+        Pre-trade limits; None disables a limit. Notionals are in the quote asset.
+        :param max_order_notional: Largest quantity x price of one order
+        :param max_symbol_notional: Largest worst-case exposure on one symbol
+        :param max_open_orders: Open plus in-flight orders across all symbols
+        :param max_position_margin: Margin one symbol's worst-case exposure may tie up at its leverage
+        :param price_band: Largest fractional distance of a limit price from the reference price
+        :param price_max_age: Seconds a reference price is trusted for the price band
+        :param allow_unpriced: Let market orders skip the notional and exposure checks when no
+                               reference price is known (by default they are rejected with
+                               NO_REFERENCE_PRICE; BasicBot fetches the mark price first)
+        """
+        self.max_order_notional = max_order_notional
+        self.max_symbol_notional = max_symbol_notional
+        self.max_open_orders = max_open_orders
+        self.max_position_margin = max_position_margin
+        self.price_band = price_band
+        self.price_max_age = price_max_age
+        self.allow_unpriced = allow_unpriced
+
+    def updated(self, overrides):
+        """Returns a copy with some limits replaced; raises ValueError on unknown names."""
+        unknown = set(overrides) - set(self.__slots__)
+        if unknown:
+            raise ValueError(f"Unknown risk limit(s): {', '.join(sorted(unknown))}")
+        return RiskLimits(**{**self.to_dict(), **overrides})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def load_limits(path=DEFAULT_LIMITS_PATH):
+    """
+    Reads risk limits from a JSON file such as
+        {"max_order_notional": 20000, "symbols": {"BTCUSDT": {"max_symbol_notional": 100000}}}
+    Missing keys keep their defaults; a missing file means all defaults.
+    :return: (RiskLimits, {symbol: RiskLimits})
+    """
+    if not path or not os.path.exists(path):
+        return RiskLimits(), {}
+    with open(path) as f:
+        data = json.load(f)
+    symbols = data.pop("symbols", {})
+    limits = RiskLimits().updated(data)
+    return limits, {symbol.upper(): limits.updated(overrides) for symbol, overrides in symbols.items()}
+
+
+class RiskReject:
+    __slots__ = ("check", "symbol", "message", "value", "limit")
+
+    def __init__(self, check, symbol, message, value=None, limit=None):
+        """
+        Why an order was refused locally.
+        :param check: Which check failed (KILL_SWITCH, PRICE_BAND, MAX_ORDER_NOTIONAL, ...)
+        :param value: The offending value (notional, price distance, order count), if any
+        :param limit: The limit it broke
+        """
+        self.check = check
+        self.symbol = symbol
+        self.message = message
+        self.value = value
+        self.limit = limit
+
+    def __bool__(self):
+        return False # Falsy like the None of every other failed order
+
+    def __str__(self):
+        return f"{self.check}: {self.message}"
+
+    def __repr__(self):
+        return f"RiskReject({self.check!r}, {self.symbol!r}, value={self.value!r}, limit={self.limit!r})"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RiskEngine:
+    def __init__(self, limits=None, symbol_limits=None, ledger=None, price_source=None,
+                 kill_switch_path=None):
+        """
+        :param limits: RiskLimits for every symbol without its own
+        :param symbol_limits: {symbol: RiskLimits} overrides
+        :param ledger: PositionLedger to read positions (and marks) from; without one,
+                       only open orders count towards exposure
+        :param price_source: Optional callable(symbol) -> live reference price or None
+        :param kill_switch_path: File that keeps the kill switch engaged across restarts and
+                                 processes; checks re-read it whenever it changes
+        """
+        self.limits = limits or RiskLimits()
+        self.symbol_limits = symbol_limits or {}
+        self.ledger = ledger
+        self.price_source = price_source
+        self.kill_switch_path = kill_switch_path
+        self.kill_switch = None # Reason, while engaged
+        self.leverage = {} # symbol -> leverage from set_leverage
+        self.max_notional = {} # symbol -> exchange maxNotionalValue at that leverage
+        self.prices = {} # symbol -> (price, time) of the latest fill seen
+        self.checks = 0
+        self.rejects = {} # check -> count
+        self._orders = {} # client order ID -> [symbol, signed remaining qty, acknowledged]
+        self._exposure = {} # symbol -> [open BUY qty, open SELL qty]
+        self._lock = threading.Lock()
+        self._kill_switch_mtime = None # mtime_ns of the kill switch file as last read; None while absent
+        if kill_switch_path:
+            self._sync_kill_switch()
+
+    def _sync_kill_switch(self):
+        """Follows the kill switch file when another process engaged or released it (one stat per check)."""
+        try:
+            mtime = os.stat(self.kill_switch_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        except OSError:
+            return
+        if mtime == self._kill_switch_mtime:
+            return
+        self._kill_switch_mtime = mtime
+        if mtime is None:
+            if self.kill_switch is not None:
+                self.kill_switch = None
+                log.warning(f"Kill switch released ({self.kill_switch_path} removed).")
+            return
+        try:
+            with open(self.kill_switch_path) as f:
+                self.kill_switch = json.load(f).get("reason") or "engaged"
+        except (OSError, ValueError):
+            self.kill_switch = "engaged" # A damaged file must not re-enable trading
+        log.warning(f"Kill switch is engaged ({self.kill_switch_path}): {self.kill_switch}")
+
+    # --- Pre-trade check ---
+    def check(self, symbol, side, quantity, price=None, client_order_id=None):
+        """
+        Checks one order and, if it passes, reserves its exposure under
+        client_order_id until the exchange acknowledges or release() drops it.
+        :param side: "BUY" or "SELL"
+        :param price: Limit price, None for market orders
+        :return: None if the order may be sent, else a RiskReject
+        """
+        with self._lock:
+            self.checks += 1
+            if self.kill_switch_path:
+                self._sync_kill_switch()
+            reject = self._check(symbol, side, quantity, price)
+            if reject is None:
+                if client_order_id:
+                    self._set(client_order_id, symbol, quantity if side == "BUY" else -quantity, False)
+            else:
+                self.rejects[reject.check] = self.rejects.get(reject.check, 0) + 1
+            return reject
+
+    def _check(self, symbol, side, quantity, price):
+        if self.kill_switch is not None:
+            return RiskReject(KILL_SWITCH, symbol, f"Kill switch engaged: {self.kill_switch}")
+        limits = self.symbol_limits.get(symbol, self.limits)
+        reference, reference_time = self._reference_price(symbol)
+        if (price and reference and limits.price_band is not None
+                and time.time() - reference_time <= limits.price_max_age):
+            distance = abs(price / reference - 1)
+            if distance > limits.price_band:
+                return RiskReject(PRICE_BAND, symbol, f"price {price:g} is {distance:.2%} from the reference "
+                                  f"price {reference:g} (band {limits.price_band:.2%})", distance, limits.price_band)
+        order_price = price or reference
+        if order_price is None and not limits.allow_unpriced:
+            return RiskReject(NO_REFERENCE_PRICE, symbol, "no reference price to value a market order with")
+        if order_price is not None and limits.max_order_notional is not None:
+            notional = quantity * order_price
+            if notional > limits.max_order_notional:
+                return RiskReject(MAX_ORDER_NOTIONAL, symbol, f"order notional {notional:,.2f} exceeds "
+                                  f"{limits.max_order_notional:,.2f}", notional, limits.max_order_notional)
+        if limits.max_open_orders is not None and len(self._orders) >= limits.max_open_orders:
+            return RiskReject(MAX_OPEN_ORDERS, symbol, f"{len(self._orders)} orders open or in flight "
+                              f"(limit {limits.max_open_orders})", len(self._orders), limits.max_open_orders)
+        exposure_price = reference or order_price
+        if exposure_price is None:
+            return None
+        position = self._position(symbol)
+        buys, sells = self._exposure.get(symbol, (0.0, 0.0))
+        before = max(abs(position + buys), abs(position - sells))
+        if side == "BUY":
+            after = max(abs(position + buys + quantity), abs(position - sells))
+        else:
+            after = max(abs(position + buys), abs(position - sells - quantity))
+        if after <= before + QTY_TOLERANCE: # Reduces or keeps the worst case
+            return None
+        exposure = after * exposure_price
+        if limits.max_symbol_notional is not None and exposure > limits.max_symbol_notional:
+            return RiskReject(MAX_SYMBOL_NOTIONAL, symbol, f"worst-case exposure {exposure:,.2f} exceeds "
+                              f"{limits.max_symbol_notional:,.2f}", exposure, limits.max_symbol_notional)
+        leverage = self._leverage(symbol)
+        cap = limits.max_position_margin * leverage if limits.max_position_margin is not None else None
+        exchange_cap = self.max_notional.get(symbol)
+        if exchange_cap is not None and (cap is None or exchange_cap < cap):
+            cap = exchange_cap
+        if cap is not None and exposure > cap:
+            return RiskReject(POSITION_LIMIT, symbol, f"worst-case exposure {exposure:,.2f} exceeds {cap:,.2f} "
+                              f"allowed at {leverage}x", exposure, cap)
+        return None
+
+    def _position(self, symbol):
+        if self.ledger is None:
+            return 0.0
+        position = self.ledger.positions.get(symbol)
+        return position.qty if position is not None else 0.0
+
+    def _leverage(self, symbol):
+        leverage = self.leverage.get(symbol)
+        if leverage is None and self.ledger is not None:
+            position = self.ledger.positions.get(symbol)
+            leverage = position.leverage if position is not None else None
+        return leverage or DEFAULT_LEVERAGE
+
+    def _reference_price(self, symbol):
+        """(price, time) of the freshest reference price known, or (None, 0.0)."""
+        if self.price_source is not None:
+            live = self.price_source(symbol)
+            if live:
+                return live, time.time()
+        best = self.prices.get(symbol, (None, 0.0))
+        if self.ledger is not None:
+            position = self.ledger.positions.get(symbol)
+            if position is not None and position.mark and position.mark_time > best[1]:
+                best = (position.mark, position.mark_time)
+        return best
+
+    def has_fresh_price(self, symbol):
+        """Whether a reference price younger than the symbol's price_max_age is known."""
+        with self._lock:
+            reference, reference_time = self._reference_price(symbol)
+            max_age = self.symbol_limits.get(symbol, self.limits).price_max_age
+            return reference is not None and (max_age is None or time.time() - reference_time <= max_age)
+
+    # --- State updates ---
+    def _set(self, client_order_id, symbol, signed_qty, acknowledged):
+        previous = self._orders.pop(client_order_id, None)
+        if previous is not None:
+            self._add_exposure(previous[0], previous[1], -1)
+        if abs(signed_qty) > QTY_TOLERANCE:
+            self._orders[client_order_id] = [symbol, signed_qty, acknowledged]
+            self._add_exposure(symbol, signed_qty, 1)
+
+    def _add_exposure(self, symbol, signed_qty, direction):
+        exposure = self._exposure.get(symbol)
+        if exposure is None:
+            exposure = self._exposure[symbol] = [0.0, 0.0]
+        side = 0 if signed_qty > 0 else 1
+        remaining = exposure[side] + direction * abs(signed_qty)
+        exposure[side] = remaining if remaining > QTY_TOLERANCE else 0.0
+
+    def release(self, client_order_id):
+        """Drops an order's reservation (it was rejected or never reached the exchange)."""
+        with self._lock:
+            self._set(client_order_id, None, 0.0, False)
+
+    def apply_order(self, order):
+        """Updates open orders and prices from an order response (create, cancel, status, open orders)."""
+        if not isinstance(order, dict):
+            return
+        client_id = order.get("clientOrderId") or order.get("clientAlgoId")
+        if not client_id:
+            return
+        status = order.get("status") or order.get("algoStatus")
+        symbol = order.get("symbol")
+        executed = float(order.get("executedQty") or 0)
+        with self._lock:
+            if executed > 0:
+                average = float(order.get("avgPrice") or 0)
+                if average:
+                    self.prices[symbol] = (average, time.time())
+            if status in OPEN_STATUSES:
+                remaining = float(order.get("origQty") or order.get("quantity") or 0) - executed
+                self._set(client_id, symbol, remaining if order.get("side") == "BUY" else -remaining, True)
+            elif status is not None:
+                self._set(client_id, symbol, 0.0, True)
+
+    def apply_event(self, event):
+        """Applies an ORDER_TRADE_UPDATE from the user-data stream."""
+        if event.get("e") != "ORDER_TRADE_UPDATE":
+            return
+        o = event["o"]
+        with self._lock:
+            if float(o.get("l") or 0) > 0 and float(o.get("L") or 0):
+                self.prices[o["s"]] = (float(o["L"]), time.time())
+            if o.get("X") in OPEN_STATUSES:
+                remaining = float(o.get("q") or 0) - float(o.get("z") or 0)
+                self._set(o["c"], o["s"], remaining if o.get("S") == "BUY" else -remaining, True)
+            else:
+                self._set(o["c"], o["s"], 0.0, True)
+
+    def load_open_orders(self, orders, symbol=None):
+        """
+        Replaces the acknowledged open orders (of one symbol, or all) with a
+        futures_get_open_orders response; in-flight reservations are kept.
+        """
+        with self._lock:
+            stale = [client_id for client_id, (order_symbol, _, acknowledged) in self._orders.items()
+                     if acknowledged and (symbol is None or order_symbol == symbol)]
+            for client_id in stale:
+                self._set(client_id, None, 0.0, True)
+        for order in orders:
+            self.apply_order(order)
+
+    def clear_symbol(self, symbol):
+        """Forgets the acknowledged open orders of a symbol (after a cancel-all)."""
+        self.load_open_orders([], symbol)
+
+    def set_leverage(self, symbol, leverage, max_notional=None):
+        with self._lock:
+            self.leverage[symbol] = int(leverage)
+            if max_notional is not None:
+                self.max_notional[symbol] = float(max_notional)
+
+    def set_price(self, symbol, price):
+        with self._lock:
+            self.prices[symbol] = (float(price), time.time())
+
+    # --- Kill switch ---
+    def engage_kill_switch(self, reason="manual"):
+        """Refuses every new order until release_kill_switch(); persisted if a path is set."""
+        with self._lock:
+            self.kill_switch = reason
+        log.warning(f"Kill switch engaged: {reason}")
+        if self.kill_switch_path:
+            try:
+                with open(self.kill_switch_path, "w") as f:
+                    json.dump({"reason": reason, "time": time.time()}, f)
+                with self._lock:
+                    self._kill_switch_mtime = os.stat(self.kill_switch_path).st_mtime_ns
+            except OSError as e:
+                log.error(f"Could not persist the kill switch to {self.kill_switch_path}: {e}")
+
+    def release_kill_switch(self):
+        with self._lock:
+            self.kill_switch = None
+        if self.kill_switch_path:
+            try:
+                os.remove(self.kill_switch_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.error(f"Could not remove the kill switch file {self.kill_switch_path}: {e}")
+            with self._lock:
+                self._kill_switch_mtime = None
+        log.warning("Kill switch released.")
+
+    # --- Views ---
+    def open_symbols(self):
+        with self._lock:
+            return sorted({symbol for symbol, _, acknowledged in self._orders.values() if acknowledged})
+
+    def status(self):
+        """Limits, kill switch, open orders and per-symbol exposure, for display."""
+        with self._lock:
+            if self.kill_switch_path:
+                self._sync_kill_switch()
+            symbols = {}
+            for symbol, (buys, sells) in sorted(self._exposure.items()):
+                position = self._position(symbol)
+                reference, reference_time = self._reference_price(symbol)
+                exposure = max(abs(position + buys), abs(position - sells))
+                symbols[symbol] = {
+                    "position": position, "openBuyQty": buys, "openSellQty": sells,
+                    "referencePrice": reference, "priceTime": reference_time, "leverage": self._leverage(symbol),
+                    "exposure": exposure * reference if reference else None,
+                }
+            return {
+                "killSwitch": self.kill_switch,
+                "openOrders": sum(1 for order in self._orders.values() if order[2]),
+                "inFlight": sum(1 for order in self._orders.values() if not order[2]),
+                "checks": self.checks, "rejects": dict(self.rejects),
+                "limits": self.limits.to_dict(),
+                "symbolLimits": {symbol: limits.to_dict() for symbol, limits in self.symbol_limits.items()},
+                "symbols": symbols,
+            }
@@ -0,0 +1,525 @@
+# stub_exchange.py
+"""
+A minimal local stand-in for the Binance USDT-M Futures REST API.
+
+It implements just enough of the endpoints used by BasicBot/AsyncBot to run
+throughput and latency benchmarks offline. Signatures and timestamps are not
+verified. An artificial per-request delay can be set to emulate the network
+round-trip to the real exchange, and a request-weight limit can be enforced
+the way the exchange does it: usage is reported in X-MBX-USED-WEIGHT-1M,
+requests over the limit get HTTP 429, and clients that keep going after
+repeated 429s are banned with HTTP 418. With unknown_rate, some new orders
+are placed but answered with the exchange's "execution status unknown"
+error (HTTP 503, code -1007), to exercise idempotent retries. Klines and
+aggTrades are synthesized from a deterministic price path (one aggregate
+trade every STUB_TRADE_MS since STUB_HISTORY_START), so history downloads
+can be repeated and compared.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+
+from aiohttp import web
+
+
+STUB_SYMBOLS = [
+    {"symbol": "BTCUSDT", "pricePrecision": 2, "quantityPrecision": 3, "filters": [
+        {"filterType": "PRICE_FILTER", "minPrice": "261.10", "maxPrice": "809484", "tickSize": "0.10"},
+        {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "1000", "stepSize": "0.001"},
+        {"filterType": "MARKET_LOT_SIZE", "minQty": "0.001", "maxQty": "120", "stepSize": "0.001"},
+        {"filterType": "MIN_NOTIONAL", "notional": "100"},
+    ]},
+    {"symbol": "ETHUSDT", "pricePrecision": 2, "quantityPrecision": 3, "filters": [
+        {"filterType": "PRICE_FILTER", "minPrice": "39.86", "maxPrice": "306177", "tickSize": "0.01"},
+        {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "10000", "stepSize": "0.001"},
+        {"filterType": "MARKET_LOT_SIZE", "minQty": "0.001", "maxQty": "2000", "stepSize": "0.001"},
+        {"filterType": "MIN_NOTIONAL", "notional": "20"},
+    ]},
+]
+
+STUB_MID_PRICES = {"BTCUSDT": (60000.0, 0.1), "ETHUSDT": (3000.0, 0.01)} # symbol -> (mid, tick)
+STUB_BALANCE = 10000.0
+STUB_TAKER_FEE = 0.0004
+
+# (method, endpoint) -> request weight; anything not listed weighs 1
+STUB_WEIGHTS = {
+    ("POST", "order"): 0,
+    ("POST", "batchOrders"): 5,
+    ("GET", "balance"): 5,
+    ("GET", "klines"): 10,
+    ("GET", "aggTrades"): 20,
+}
+
+STUB_ORDER_ENDPOINTS = ("order", "algoOrder", "batchOrders") # POSTs counted against the order-count limits
+
+STUB_HISTORY_START = 1567900800000 # 2019-09-08, ms; no history before it
+STUB_TRADE_MS = 250 # One aggregate trade every 250 ms; its ID is its index since STUB_HISTORY_START
+STUB_INTERVAL_MS = {"m": 60000, "h": 3600000, "d": 86400000, "w": 604800000}
+
+
+def stub_price(symbol, t_ms):
+    """Deterministic synthetic price of a symbol at a time (ms): a daily swing plus faster wiggles."""
+    mid = STUB_MID_PRICES.get(symbol, (100.0, 0.01))[0]
+    hours = (t_ms - STUB_HISTORY_START) / 3600000
+    return mid * (1 + 0.03 * math.sin(hours / 24 * math.tau) + 0.004 * math.sin(hours * 7.3)
+                  + 0.001 * math.sin(t_ms / 7919.0))
+
+
+class StubExchange:
+    def __init__(self, latency: float = 0.0, weight_limit: int = None, window: float = 60.0,
+                 ban_after: int = 3, ban_seconds: float = None, unknown_rate: float = 0.0, seed: int = 1,
+                 order_limit_10s: int = None, order_limit_1m: int = None, order_windows=(10.0, 60.0)):
+        """
+        :param latency: Seconds to sleep before answering each request (simulated RTT)
+        :param weight_limit: Request weight allowed per window (None disables limiting)
+        :param window: Length of the fixed rate-limit window in seconds
+        :param ban_after: Number of 429s within one window that triggers a 418 ban
+        :param ban_seconds: Ban duration (default: two windows)
+        :param unknown_rate: Fraction of new orders that are placed but answered with HTTP 503 / -1007
+        :param seed: Seed for picking those orders
+        :param order_limit_10s: New orders allowed per order_windows[0] seconds (None: counted, not limited)
+        :param order_limit_1m: New orders allowed per order_windows[1] seconds (None: counted, not limited)
+        :param order_windows: Lengths of the two order-count windows, reported as X-MBX-ORDER-COUNT-10S/-1M
+        """
+        self.latency = latency
+        self.weight_limit = weight_limit
+        self.window = window
+        self.ban_after = ban_after
+        self.ban_seconds = ban_seconds if ban_seconds is not None else 2 * window
+        self.used_weight = 0
+        self.rejected_429 = 0
+        self.rejected_418 = 0
+        self.listen_keys = set()
+        self._sockets = set() # Connected user-data stream websockets
+        self._window_start = time.time() // window * window # Wall-clock aligned, like Binance
+        self._window_429s = 0
+        self._banned_until = 0.0
+        self.order_limits = (order_limit_10s, order_limit_1m)
+        self.order_windows = order_windows
+        self.order_counts = [0, 0] # New orders in the current window of each order-count limit
+        self._order_window_starts = [time.time() // w * w for w in order_windows]
+        self.rejected_orders = 0
+        self.orders = {}  # orderId -> order dict
+        self.order_history = {}  # orderId -> order dict, including filled and cancelled orders
+        self.client_ids = {}  # clientOrderId -> order dict
+        self.positions = {}  # symbol -> [signed qty, entry price], from market order fills
+        self.wallet = STUB_BALANCE
+        self.unknown_rate = unknown_rate
+        self.unknown_answers = 0
+        self._rng = random.Random(seed)
+        self.leverage = {}  # symbol -> leverage
+        self.request_count = 0
+        self._order_ids = itertools.count(1)
+        self._thread = None
+        self._loop = None
+        self._runner = None
+        self.url = None
+        self.stream_url = None
+
+    # --- Helpers ---
+    async def _params(self, request):
+        if "params" not in request: # The body can be read once; the order-count check reads it first
+            request["params"] = dict(request.query)
+            if request.can_read_body:
+                request["params"].update(await request.post())
+        return dict(request["params"])
+
+    def _check_limits(self, request):
+        """Applies the weight limit; returns an error response or None."""
+        if self.weight_limit is None:
+            return None
+        now = time.time()
+        if now >= self._banned_until > 0:
+            self._banned_until = 0.0
+        if now - self._window_start >= self.window:
+            windows = int((now - self._window_start) // self.window)
+            self._window_start += windows * self.window
+            self.used_weight = 0
+            self._window_429s = 0
+        retry_after = str(max(1, int(self._window_start + self.window - now + 1)))
+        if self._banned_until:
+            self.rejected_418 += 1
+            retry_after = str(max(1, int(self._banned_until - now + 1)))
+            return self._error(-1003, "Way too many requests; IP banned.", status=418, headers={"Retry-After": retry_after})
+        self.used_weight += STUB_WEIGHTS.get((request.method, request.path.rsplit("/", 1)[-1]), 1)
+        if self.used_weight > self.weight_limit:
+            self.rejected_429 += 1
+            self._window_429s += 1
+            if self._window_429s >= self.ban_after:
+                self._banned_until = now + self.ban_seconds
+            return self._error(-1003, "Too many requests.", status=429, headers={"Retry-After": retry_after})
+        return None
+
+    async def _check_order_limits(self, request):
+        """Counts a new-order request in both order-count windows; returns an error response or None."""
+        endpoint = request.path.rsplit("/", 1)[-1]
+        if request.method != "POST" or endpoint not in STUB_ORDER_ENDPOINTS:
+            return None
+        request["counts_orders"] = True
+        now = time.time()
+        for i, window in enumerate(self.order_windows):
+            if now - self._order_window_starts[i] >= window:
+                self._order_window_starts[i] = now // window * window
+                self.order_counts[i] = 0
+        # As in RequestScheduler's costs: each order of a batch counts in the 10s window, the batch once per minute
+        orders = 1
+        if endpoint == "batchOrders":
+            orders = len(json.loads((await self._params(request)).get("batchOrders", "[]")))
+        self.order_counts[0] += orders
+        self.order_counts[1] += 1
+        for i, (limit, window, label) in enumerate(zip(self.order_limits, self.order_windows, ("10S", "1M"))):
+            if limit is not None and self.order_counts[i] > limit:
+                self.rejected_orders += 1
+                retry_after = str(max(1, int(self._order_window_starts[i] + window - now + 1)))
+                return self._error(-1015, f"Too many new orders; current limit is {limit} orders per {label}.",
+                                   status=429, headers={"Retry-After": retry_after})
+        return None
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = (self._check_limits(request) or await self._check_order_limits(request)
+                    or await handler(request))
+        if self.weight_limit is not None:
+            response.headers["X-MBX-USED-WEIGHT-1M"] = str(self.used_weight)
+        if request.get("counts_orders"):
+            response.headers["X-MBX-ORDER-COUNT-10S"] = str(self.order_counts[0])
+            response.headers["X-MBX-ORDER-COUNT-1M"] = str(self.order_counts[1])
+        return response
+
+    def _new_order(self, params):
+        if params.get("newClientOrderId") in self.client_ids:
+            return {"code": -4116, "msg": "ClientOrderId is duplicated."}
+        order_id = next(self._order_ids)
+        order_type = params.get("type", "LIMIT")
+        order = {
+            "orderId": order_id,
+            "symbol": params.get("symbol"),
+            "status": "FILLED" if order_type == "MARKET" else "NEW",
+            "clientOrderId": params.get("newClientOrderId", f"stub{order_id}"),
+            "price": params.get("price", "0"),
+            "avgPrice": params.get("price", "0"),
+            "origQty": params.get("quantity", "0"),
+            "executedQty": params.get("quantity", "0") if order_type == "MARKET" else "0",
+            "cumQuote": "0",
+            "timeInForce": params.get("timeInForce", "GTC"),
+            "type": order_type,
+            "side": params.get("side"),
+            "stopPrice": params.get("stopPrice", "0"),
+            "updateTime": int(time.time() * 1000),
+        }
+        if order_type == "MARKET": # Fills at the top of the static book
+            mid, tick = STUB_MID_PRICES.get(order["symbol"], (100.0, 0.01))
+            price = mid + tick if order["side"] == "BUY" else mid - tick
+            order["avgPrice"] = f"{price:.2f}"
+            order["cumQuote"] = f"{float(order['executedQty']) * price:.8f}"
+            self._fill(order["symbol"], order["side"], float(order["executedQty"]), price)
+        else:
+            self.orders[order_id] = order
+        self.order_history[order_id] = order
+        self.client_ids[order["clientOrderId"]] = order
+        self._publish_order(order)
+        return order
+
+    def _order_response(self, order):
+        if "code" in order:
+            return self._error(order["code"], order["msg"])
+        if self.unknown_rate and self._rng.random() < self.unknown_rate:
+            self.unknown_answers += 1 # Placed, but the client is not told
+            return self._error(-1007, "Timeout waiting for response from backend server. "
+                                      "Send status unknown; execution status unknown.", status=503)
+        return web.json_response(order)
+
+    def _fill(self, symbol, side, quantity, price):
+        position = self.positions.setdefault(symbol, [0.0, 0.0])
+        signed = quantity if side == "BUY" else -quantity
+        realized = 0.0
+        if position[0] * signed >= 0:
+            total = position[0] + signed
+            position[1] = (position[0] * position[1] + signed * price) / total if total else 0.0
+            position[0] = total
+        else:
+            closed = min(abs(position[0]), quantity)
+            realized = closed * (price - position[1]) * (1 if position[0] > 0 else -1)
+            remaining = position[0] + signed
+            if abs(remaining) < 1e-12:
+                remaining, position[1] = 0.0, 0.0
+            elif remaining * position[0] < 0:
+                position[1] = price
+            position[0] = remaining
+        self.wallet += realized - quantity * price * STUB_TAKER_FEE
+
+    def _publish_order(self, order):
+        """Pushes an ORDER_TRADE_UPDATE for the order to every user-data stream."""
+        if not self._sockets:
+            return
+        now = int(time.time() * 1000)
+        event = {"e": "ORDER_TRADE_UPDATE", "E": now, "T": now, "o": {
+            "s": order["symbol"], "c": order["clientOrderId"], "S": order["side"], "o": order["type"],
+            "f": order["timeInForce"], "q": order["origQty"], "p": order["price"], "ap": order["avgPrice"],
+            "sp": order["stopPrice"], "x": order["status"] if order["status"] != "FILLED" else "TRADE",
+            "X": order["status"], "i": order["orderId"], "z": order["executedQty"], "T": now,
+        }}
+        for ws in list(self._sockets):
+            asyncio.ensure_future(ws.send_json(event))
+
+    def _error(self, code, msg, status=400, headers=None):
+        return web.json_response({"code": code, "msg": msg}, status=status, headers=headers)
+
+    # --- Handlers ---
+    async def ping(self, request):
+        return web.json_response({})
+
+    async def exchange_info(self, request):
+        return web.json_response({"timezone": "UTC", "symbols": STUB_SYMBOLS})
+
+    async def create_order(self, request):
+        return self._order_response(self._new_order(await self._params(request)))
+
+    async def create_algo_order(self, request):
+        # Newer python-binance routes conditional (STOP*) orders to the algo endpoint
+        params = await self._params(request)
+        params.setdefault("stopPrice", params.get("triggerPrice", "0"))
+        params.setdefault("newClientOrderId", params.get("clientAlgoId"))
+        return self._order_response(self._new_order(params))
+
+    async def get_order(self, request):
+        params = await self._params(request)
+        client_id = params.get("origClientOrderId") or params.get("clientAlgoId")
+        if client_id:
+            order = self.client_ids.get(client_id)
+        else:
+            order = self.order_history.get(int(params.get("orderId", 0)))
+        if order is None:
+            return self._error(-2013, "Order does not exist.")
+        return web.json_response(order)
+
+    async def cancel_order(self, request):
+        params = await self._params(request)
+        order = self.orders.pop(int(params.get("orderId", 0)), None)
+        if order is None:
+            return self._error(-2011, "Unknown order sent.")
+        order["status"] = "CANCELED"
+        self._publish_order(order)
+        return web.json_response(order)
+
+    async def batch_orders(self, request):
+        params = await self._params(request)
+        return web.json_response([self._new_order(p) for p in json.loads(params["batchOrders"])])
+
+    async def cancel_batch_orders(self, request):
+        params = await self._params(request)
+        results = []
+        for order_id in json.loads(params["orderidlist"]):
+            order = self.orders.pop(int(order_id), None)
+            if order is None:
+                results.append({"code": -2011, "msg": "Unknown order sent."})
+            else:
+                order["status"] = "CANCELED"
+                self._publish_order(order)
+                results.append(order)
+        return web.json_response(results)
+
+    async def cancel_all_orders(self, request):
+        params = await self._params(request)
+        for order_id in [i for i, o in self.orders.items() if o["symbol"] == params.get("symbol")]:
+            order = self.orders.pop(order_id)
+            order["status"] = "CANCELED"
+            self._publish_order(order)
+        return web.json_response({"code": 200, "msg": "The operation of cancel all open order is done."})
+
+    async def open_orders(self, request):
+        params = await self._params(request)
+        symbol = params.get("symbol")
+        return web.json_response(
+            [o for o in self.orders.values() if symbol is None or o["symbol"] == symbol]
+        )
+
+    async def depth(self, request):
+        # A static ladder around the symbol's mid price, one tick apart
+        params = await self._params(request)
+        mid, tick = STUB_MID_PRICES.get(params.get("symbol"), (100.0, 0.01))
+        limit = int(params.get("limit", 500))
+        return web.json_response({
+            "lastUpdateId": self.request_count,
+            "bids": [[f"{mid - tick * (i + 1):.2f}", f"{0.5 + i * 0.25:.3f}"] for i in range(limit)],
+            "asks": [[f"{mid + tick * (i + 1):.2f}", f"{0.5 + i * 0.25:.3f}"] for i in range(limit)],
+        })
+
+    async def mark_price(self, request):
+        params = await self._params(request)
+        mid = STUB_MID_PRICES.get(params.get("symbol"), (100.0, 0.01))[0]
+        return web.json_response({"symbol": params.get("symbol"), "markPrice": f"{mid:.8f}",
+                                  "time": int(time.time() * 1000)})
+
+    async def klines(self, request):
+        params = await self._params(request)
+        symbol, interval = params.get("symbol"), params.get("interval", "1m")
+        step = int(interval[:-1]) * STUB_INTERVAL_MS[interval[-1]]
+        limit = min(int(params.get("limit", 500)), 1500)
+        now = int(time.time() * 1000)
+        last = min(int(params.get("endTime", now)), now) // step * step # The current candle is still open
+        if "startTime" in params:
+            first = max(-(-int(params["startTime"]) // step) * step, STUB_HISTORY_START)
+        else:
+            first = max(last - (limit - 1) * step, STUB_HISTORY_START)
+        rows = []
+        for open_time in range(first, min(last, first + (limit - 1) * step) + 1, step):
+            close_time = open_time + step - 1
+            open_, close = stub_price(symbol, open_time), stub_price(symbol, min(close_time, now))
+            volume = 10 + 5 * math.sin(open_time / 3600000)
+            rows.append([open_time, f"{open_:.2f}", f"{max(open_, close) * 1.0005:.2f}",
+                         f"{min(open_, close) * 0.9995:.2f}", f"{close:.2f}", f"{volume:.3f}", close_time,
+                         f"{volume * (open_ + close) / 2:.4f}", step // STUB_TRADE_MS, f"{volume / 2:.3f}",
+                         f"{volume * (open_ + close) / 4:.4f}", "0"])
+        return web.json_response(rows)
+
+    async def agg_trades(self, request):
+        params = await self._params(request)
+        symbol = params.get("symbol")
+        limit = min(int(params.get("limit", 500)), 1000)
+        newest = (int(time.time() * 1000) - STUB_HISTORY_START) // STUB_TRADE_MS
+        if "fromId" in params:
+            first, last = int(params["fromId"]), newest
+        elif "startTime" in params or "endTime" in params:
+            start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2 ** 62))
+            if "startTime" in params and "endTime" in params and end - start > 3600000:
+                return self._error(-1127, "More than 1 hours between startTime and endTime.")
+            first = max(-(-(start - STUB_HISTORY_START) // STUB_TRADE_MS), 0)
+            last = min((end - STUB_HISTORY_START) // STUB_TRADE_MS, newest)
+        else:
+            first, last = newest - limit + 1, newest
+        trades = []
+        for trade_id in range(max(first, 0), min(last, first + limit - 1) + 1):
+            t = STUB_HISTORY_START + trade_id * STUB_TRADE_MS
+            trades.append({"a": trade_id, "p": f"{stub_price(symbol, t):.2f}", "q": f"{0.001 * (1 + trade_id % 7):.3f}",
+                           "f": trade_id * 2, "l": trade_id * 2 + 1, "T": t, "m": trade_id % 2 == 0})
+        return web.json_response(trades)
+
+    async def balance(self, request):
+        return web.json_response([
+            {"asset": "USDT", "balance": f"{self.wallet:.8f}", "availableBalance": f"{self.wallet:.8f}"},
+        ])
+
+    async def position_risk(self, request):
+        params = await self._params(request)
+        positions = []
+        for symbol, (qty, entry) in self.positions.items():
+            if qty and params.get("symbol") in (None, symbol):
+                mark = STUB_MID_PRICES.get(symbol, (100.0, 0.01))[0]
+                positions.append({"symbol": symbol, "positionSide": "BOTH", "positionAmt": f"{qty:.3f}",
+                                  "entryPrice": f"{entry:.8f}", "markPrice": f"{mark:.8f}",
+                                  "unRealizedProfit": f"{qty * (mark - entry):.8f}"})
+        return web.json_response(positions)
+
+    async def change_leverage(self, request):
+        params = await self._params(request)
+        self.leverage[params["symbol"]] = int(params["leverage"])
+        return web.json_response({
+            "symbol": params["symbol"],
+            "leverage": int(params["leverage"]),
+            "maxNotionalValue": "1000000",
+        })
+
+    async def listen_key(self, request):
+        if request.method == "POST":
+            key = f"stubListenKey{len(self.listen_keys) + 1}"
+            self.listen_keys.add(key)
+            return web.json_response({"listenKey": key})
+        if request.method == "DELETE":
+            self.listen_keys.discard((await self._params(request)).get("listenKey"))
+        return web.json_response({})
+
+    async def user_stream(self, request):
+        if request.match_info["listen_key"] not in self.listen_keys:
+            raise web.HTTPNotFound()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    def create_app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/fapi/{version}/ping", self.ping)
+        app.router.add_get("/fapi/{version}/exchangeInfo", self.exchange_info)
+        app.router.add_post("/fapi/{version}/order", self.create_order)
+        app.router.add_post("/fapi/{version}/algoOrder", self.create_algo_order)
+        app.router.add_get("/fapi/{version}/algoOrder", self.get_order)
+        app.router.add_get("/fapi/{version}/order", self.get_order)
+        app.router.add_delete("/fapi/{version}/order", self.cancel_order)
+        app.router.add_post("/fapi/{version}/batchOrders", self.batch_orders)
+        app.router.add_delete("/fapi/{version}/batchOrders", self.cancel_batch_orders)
+        app.router.add_delete("/fapi/{version}/allOpenOrders", self.cancel_all_orders)
+        app.router.add_get("/fapi/{version}/openOrders", self.open_orders)
+        app.router.add_get("/fapi/{version}/depth", self.depth)
+        app.router.add_get("/fapi/{version}/premiumIndex", self.mark_price)
+        app.router.add_get("/fapi/{version}/klines", self.klines)
+        app.router.add_get("/fapi/{version}/aggTrades", self.agg_trades)
+        app.router.add_get("/fapi/{version}/balance", self.balance)
+        app.router.add_get("/fapi/{version}/positionRisk", self.position_risk)
+        app.router.add_post("/fapi/{version}/leverage", self.change_leverage)
+        app.router.add_route("*", "/fapi/{version}/listenKey", self.listen_key)
+        app.router.add_get("/ws/{listen_key}", self.user_stream)
+        return app
+
+    # --- Lifecycle ---
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Starts the stub in a background thread.
+        :return: The futures base URL to assign to a client's FUTURES_URL
+        """
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.create_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, host, port)
+            self._loop.run_until_complete(site.start())
+            bound_port = site._server.sockets[0].getsockname()[1]
+            self.url = f"http://{host}:{bound_port}/fapi"
+            self.stream_url = f"ws://{host}:{bound_port}/ws"
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="StubExchange", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the Binance Futures REST API")
+    parser.add_argument('--host', type=str, default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated round-trip in seconds")
+    parser.add_argument('--weight-limit', type=int, default=None, help="Request weight per window (default: unlimited)")
+    parser.add_argument('--window', type=float, default=60.0, help="Rate-limit window in seconds")
+    parser.add_argument('--unknown-rate', type=float, default=0.0,
+                        help="Fraction of new orders placed but answered with 'execution status unknown'")
+    args = parser.parse_args()
+
+    stub = StubExchange(latency=args.latency, weight_limit=args.weight_limit, window=args.window,
+                        unknown_rate=args.unknown_rate)
+    web.run_app(stub.create_app(), host=args.host, port=args.port)
@@ -0,0 +1,172 @@
+# symbol_rules.py
+"""
+Exchange-info cache with precomputed per-symbol trading filters.
+
+Orders are rounded to the symbol's tick/step size and checked against its
+quantity, price and min-notional limits locally before they are sent, so
+precision mistakes no longer cost a rejected round-trip. The exchange info
+is fetched once, persisted to disk, and refreshed lazily after `ttl` seconds
+(or when an unknown symbol is requested).
+"""
+import json
+import os
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN
+
+from logger_setup import log
+
+DEFAULT_CACHE_PATH = "exchange_info_cache.json"
+DEFAULT_TTL = 24 * 60 * 60
+MIN_REFRESH_INTERVAL = 60 # Don't refetch more often than this on unknown symbols
+
+
+class OrderValidationError(ValueError):
+    """Raised when an order cannot satisfy the symbol's trading filters."""
+
+
+class SymbolFilters:
+    __slots__ = (
+        "symbol", "tick_size", "min_price", "max_price", "step_size", "min_qty", "max_qty",
+        "market_step_size", "market_min_qty", "market_max_qty", "min_notional",
+        "price_precision", "quantity_precision",
+    )
+
+    def __init__(self, symbol_info):
+        """
+        :param symbol_info: One entry of exchangeInfo["symbols"]
+        """
+        filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
+        price = filters.get("PRICE_FILTER", {})
+        lot = filters.get("LOT_SIZE", {})
+        market_lot = filters.get("MARKET_LOT_SIZE", lot)
+        self.symbol = symbol_info["symbol"]
+        self.price_precision = symbol_info.get("pricePrecision")
+        self.quantity_precision = symbol_info.get("quantityPrecision")
+        self.tick_size = Decimal(price.get("tickSize", "0"))
+        self.min_price = Decimal(price.get("minPrice", "0"))
+        self.max_price = Decimal(price.get("maxPrice", "0"))
+        self.step_size = Decimal(lot.get("stepSize", "0"))
+        self.min_qty = Decimal(lot.get("minQty", "0"))
+        self.max_qty = Decimal(lot.get("maxQty", "0"))
+        self.market_step_size = Decimal(market_lot.get("stepSize", "0"))
+        self.market_min_qty = Decimal(market_lot.get("minQty", "0"))
+        self.market_max_qty = Decimal(market_lot.get("maxQty", "0"))
+        self.min_notional = Decimal(filters.get("MIN_NOTIONAL", {}).get("notional", "0"))
+
+    @staticmethod
+    def _round(value, step, rounding):
+        if not step:
+            return value
+        return ((value / step).to_integral_value(rounding=rounding) * step).quantize(step)
+
+    def round_quantity(self, quantity, market=False):
+        """Rounds a quantity down to the (market) lot step."""
+        step = self.market_step_size if market else self.step_size
+        return self._round(Decimal(str(quantity)), step, ROUND_DOWN)
+
+    def round_price(self, price, side=None):
+        """
+        Rounds a price to the tick size: BUY rounds down and SELL rounds up so
+        the order never ends up more aggressive than requested.
+        """
+        rounding = {"BUY": ROUND_DOWN, "SELL": ROUND_UP}.get(side, ROUND_HALF_EVEN)
+        return self._round(Decimal(str(price)), self.tick_size, rounding)
+
+    def check_price(self, price, label="price"):
+        if price <= 0 or price < self.min_price or (self.max_price and price > self.max_price):
+            raise OrderValidationError(
+                f"{self.symbol} {label} {price} outside [{self.min_price}, {self.max_price}]")
+
+    def normalize(self, side, quantity, price=None, stop_price=None, market=False, reference_price=None):
+        """
+        Rounds and validates an order.
+        :param reference_price: Price used for the min-notional check when there is no limit price
+        :return: (quantity, price, stop_price) as Decimals (price/stop_price None when not given)
+        """
+        qty = self.round_quantity(quantity, market=market)
+        min_qty, max_qty = (self.market_min_qty, self.market_max_qty) if market else (self.min_qty, self.max_qty)
+        if qty <= 0 or qty < min_qty or (max_qty and qty > max_qty):
+            raise OrderValidationError(
+                f"{self.symbol} quantity {quantity} (rounded {qty}) outside [{min_qty}, {max_qty}]")
+        if price is not None:
+            price = self.round_price(price, side)
+            self.check_price(price)
+        if stop_price is not None:
+            stop_price = self.round_price(stop_price)
+            self.check_price(stop_price, "stop price")
+        notional_price = price if price is not None else reference_price
+        if notional_price is not None and self.min_notional and qty * Decimal(str(notional_price)) < self.min_notional:
+            raise OrderValidationError(
+                f"{self.symbol} notional {qty * Decimal(str(notional_price))} below minimum {self.min_notional}")
+        return qty, price, stop_price
+
+
+class SymbolRules:
+    def __init__(self, fetch, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, source=None):
+        """
+        :param fetch: Callable returning the futures exchange info (e.g. a bound futures_exchange_info)
+        :param path: File the symbol filters are persisted to (None disables persistence)
+        :param ttl: Seconds before the cached exchange info is refreshed
+        :param source: Identifies where the rules came from (e.g. the REST base URL);
+                       a persisted cache from another source is ignored
+        """
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.source = source
+        self.filters = {}
+        self.fetched_at = 0.0
+
+    @classmethod
+    def from_exchange_info(cls, exchange_info, ttl=DEFAULT_TTL):
+        """Builds an in-memory instance (no fetching or persistence) from exchange info."""
+        rules = cls(fetch=None, path=None, ttl=ttl)
+        rules._load_symbols(exchange_info["symbols"], time.time())
+        return rules
+
+    def _load_symbols(self, symbols, fetched_at):
+        self.filters = {s["symbol"]: SymbolFilters(s) for s in symbols}
+        self.fetched_at = fetched_at
+
+    def _load_from_disk(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable exchange info cache {self.path}: {e}")
+            return False
+        if cached.get("source") != self.source or time.time() - cached["fetched_at"] > self.ttl:
+            return False
+        self._load_symbols(cached["symbols"], cached["fetched_at"])
+        log.debug(f"Loaded trading rules for {len(self.filters)} symbol(s) from {self.path}")
+        return True
+
+    def refresh(self):
+        """Fetches exchange info and persists the symbol filters."""
+        if self.fetch is None:
+            return
+        info = self.fetch()
+        symbols = [{k: s[k] for k in ("symbol", "pricePrecision", "quantityPrecision", "filters") if k in s}
+                   for s in info["symbols"]]
+        self._load_symbols(symbols, time.time())
+        log.info(f"Fetched trading rules for {len(self.filters)} symbol(s).")
+        if self.path:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp" # Several processes may refresh at once
+            with open(tmp_path, "w") as f:
+                json.dump({"source": self.source, "fetched_at": self.fetched_at, "symbols": symbols}, f)
+            os.replace(tmp_path, self.path)
+
+    def get(self, symbol):
+        """Returns the SymbolFilters for a symbol, loading or refreshing lazily."""
+        age = time.time() - self.fetched_at
+        if age > self.ttl and not self._load_from_disk():
+            self.refresh()
+        filters = self.filters.get(symbol)
+        if filters is None and time.time() - self.fetched_at > MIN_REFRESH_INTERVAL:
+            self.refresh() # Possibly a newly listed symbol
+            filters = self.filters.get(symbol)
+        if filters is None:
+            raise OrderValidationError(f"Unknown symbol: {symbol}")
+        return filters
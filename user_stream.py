@@ -0,0 +1,313 @@
+# user_stream.py
+"""
+User-data stream subsystem: keeps a local copy of our own orders and balances
+up to date from ORDER_TRADE_UPDATE / ACCOUNT_UPDATE events, so BasicBot can
+answer status, open-order and balance queries without a REST round-trip.
+
+The cache is only trusted while it is `synced`, i.e. after a REST snapshot
+has been loaded and the stream has stayed connected since. Any disconnect or
+listenKeyExpired event marks it stale, and BasicBot falls back to REST until
+the stream reconnects and a fresh snapshot is loaded.
+
+Replay a recorded fixture offline:
+    python user_stream.py fixtures/user_stream_events.jsonl
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import websockets
+
+from logger_setup import log
+
+FUTURES_TESTNET_STREAM_URL = "wss://fstream.binancefuture.com/ws"
+KEEPALIVE_INTERVAL = 30 * 60 # listenKeys expire after 60 minutes without a keepalive
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+
+
+def order_from_event(o):
+    """Converts the "o" payload of an ORDER_TRADE_UPDATE into the REST order shape."""
+    return {
+        "orderId": o["i"],
+        "symbol": o["s"],
+        "status": o["X"],
+        "clientOrderId": o["c"],
+        "price": o["p"],
+        "avgPrice": o["ap"],
+        "origQty": o["q"],
+        "executedQty": o["z"],
+        "type": o["o"],
+        "side": o["S"],
+        "stopPrice": o["sp"],
+        "timeInForce": o["f"],
+        "reduceOnly": o.get("R", False),
+        "updateTime": o["T"],
+    }
+
+
+class OrderStateCache:
+    def __init__(self, max_closed_orders: int = 10000):
+        """
+        :param max_closed_orders: Finished orders kept for status lookups before the oldest are evicted
+        """
+        self.max_closed_orders = max_closed_orders
+        self.orders = {} # orderId -> order dict (REST shape)
+        self.client_ids = {} # clientOrderId -> orderId
+        self.open_by_symbol = {} # symbol -> {orderId: order}
+        self.balances = {} # asset -> balance dict (REST shape)
+        self.positions = {} # (symbol, positionSide) -> position dict
+        self.synced = False
+        self.last_event_time = 0
+        self._closed = OrderedDict() # orderId -> None, oldest first
+        self._lock = threading.Lock()
+
+    # --- Updates ---
+    def load_snapshot(self, open_orders, balances):
+        """Replaces the cache contents with REST snapshots and marks it synced."""
+        with self._lock:
+            self.orders.clear()
+            self.client_ids.clear()
+            self.open_by_symbol.clear()
+            self._closed.clear()
+            for order in open_orders:
+                self._store(order)
+            self.balances = {b["asset"]: dict(b) for b in balances}
+            self.synced = True
+        log.info(f"Order cache synced: {len(open_orders)} open order(s), {len(self.balances)} asset(s).")
+
+    def mark_stale(self, reason):
+        if self.synced:
+            log.warning(f"Order cache marked stale: {reason}")
+        self.synced = False
+
+    def update_order(self, order):
+        """Stores an order seen in a REST response (create/cancel/status)."""
+        if order and "orderId" in order:
+            with self._lock:
+                self._store(dict(order))
+
+    def apply_event(self, event):
+        """Applies one user-data stream event."""
+        event_type = event.get("e")
+        if event_type == "ORDER_TRADE_UPDATE":
+            with self._lock:
+                self._store(order_from_event(event["o"]))
+        elif event_type == "ACCOUNT_UPDATE":
+            with self._lock:
+                for b in event["a"].get("B", []):
+                    balance = self.balances.setdefault(b["a"], {"asset": b["a"]})
+                    if balance.get("updateTime", 0) > event.get("T", 0):
+                        continue
+                    balance["balance"] = b["wb"]
+                    balance["crossWalletBalance"] = b["cw"]
+                    # ACCOUNT_UPDATE carries no available balance; the snapshot's is stale from here on
+                    balance.pop("availableBalance", None)
+                    balance["updateTime"] = event.get("T", 0)
+                for p in event["a"].get("P", []):
+                    self.positions[(p["s"], p.get("ps", "BOTH"))] = {
+                        "symbol": p["s"],
+                        "positionAmt": p["pa"],
+                        "entryPrice": p["ep"],
+                        "unRealizedProfit": p["up"],
+                        "positionSide": p.get("ps", "BOTH"),
+                    }
+        elif event_type == "listenKeyExpired":
+            self.mark_stale("listenKey expired")
+        self.last_event_time = max(self.last_event_time, event.get("E", 0))
+
+    def _store(self, order):
+        order_id = order["orderId"]
+        known = self.orders.get(order_id)
+        if known and known.get("updateTime", 0) > order.get("updateTime", 0):
+            return # Older than what we already have (events can race REST responses)
+        if known:
+            known.update(order)
+            order = known
+        self.orders[order_id] = order
+        if order.get("clientOrderId"):
+            self.client_ids[order["clientOrderId"]] = order_id
+        open_orders = self.open_by_symbol.setdefault(order["symbol"], {})
+        if order["status"] in OPEN_STATUSES:
+            open_orders[order_id] = order
+        else:
+            open_orders.pop(order_id, None)
+            self._closed[order_id] = None
+            while len(self._closed) > self.max_closed_orders:
+                evicted, _ = self._closed.popitem(last=False)
+                evicted_order = self.orders.pop(evicted, None)
+                if evicted_order:
+                    self.client_ids.pop(evicted_order.get("clientOrderId"), None)
+
+    # --- Lookups (None means cache miss) ---
+    def get_order(self, order_id=None, client_order_id=None):
+        with self._lock:
+            if order_id is None:
+                order_id = self.client_ids.get(client_order_id)
+            order = self.orders.get(order_id)
+            return dict(order) if order else None
+
+    def get_open_orders(self, symbol=None):
+        with self._lock:
+            if symbol:
+                return [dict(o) for o in self.open_by_symbol.get(symbol, {}).values()]
+            return [dict(o) for orders in self.open_by_symbol.values() for o in orders.values()]
+
+    def get_balance(self, asset):
+        with self._lock:
+            balance = self.balances.get(asset)
+            return dict(balance) if balance else None
+
+
+class UserDataStream:
+    def __init__(self, bot, cache: OrderStateCache, stream_url=FUTURES_TESTNET_STREAM_URL,
+                 keepalive_interval=KEEPALIVE_INTERVAL, ledger=None, risk=None):
+        """
+        :param bot: BasicBot used for listenKey management and REST snapshots
+        :param cache: OrderStateCache to keep up to date
+        :param stream_url: Base websocket URL; the listenKey is appended
+        :param ledger: Optional PositionLedger that also receives every event (fills, balance changes)
+        :param risk: Optional RiskEngine that also receives order updates
+        """
+        self.bot = bot
+        self.cache = cache
+        self.ledger = ledger
+        self.risk = risk
+        self.stream_url = stream_url
+        self.keepalive_interval = keepalive_interval
+        self.listen_key = None
+        self._thread = None
+        self._loop = None
+        self._stop = None
+
+    def start(self):
+        """Starts the stream in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="UserDataStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+            self._loop = None
+        self.cache.mark_stale("user data stream stopped")
+        if self.listen_key:
+            try:
+                self.bot._call("futures_stream_close", listenKey=self.listen_key)
+            except Exception as e:
+                log.warning(f"Could not close listenKey: {e}")
+            self.listen_key = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._stop = asyncio.Event()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        backoff = 1
+        keepalive = asyncio.ensure_future(self._keepalive())
+        try:
+            while not self._stop.is_set():
+                try:
+                    if self.listen_key is None:
+                        self.listen_key = await asyncio.to_thread(self.bot._call, "futures_stream_get_listen_key")
+                    await self._consume()
+                    backoff = 1
+                except Exception as e:
+                    self.cache.mark_stale(f"stream error: {e}")
+                    log.error(f"User data stream error, reconnecting in {backoff}s: {e}")
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), backoff)
+                    except asyncio.TimeoutError:
+                        pass
+                    backoff = min(backoff * 2, 60)
+        finally:
+            keepalive.cancel()
+
+    async def _consume(self):
+        async with websockets.connect(f"{self.stream_url}/{self.listen_key}") as ws:
+            log.info("User data stream connected.")
+            # Events arriving while the snapshot loads are applied afterwards;
+            # updateTime ordering keeps the newer state.
+            buffered = []
+            reader = asyncio.ensure_future(self._read(ws, buffered))
+            try:
+                await asyncio.to_thread(self._resync)
+                for event in buffered:
+                    self._apply(event)
+                buffered.clear()
+                stop = asyncio.ensure_future(self._stop.wait())
+                done, _ = await asyncio.wait({reader, stop}, return_when=asyncio.FIRST_COMPLETED)
+                stop.cancel()
+                if reader in done:
+                    reader.result() # Re-raise the connection error, if any
+                    raise ConnectionError("stream closed by server")
+            finally:
+                reader.cancel()
+        self.cache.mark_stale("user data stream disconnected")
+
+    async def _read(self, ws, buffered):
+        async for message in ws:
+            event = json.loads(message)
+            if not self.cache.synced and event.get("e") != "listenKeyExpired":
+                buffered.append(event)
+                continue
+            self._apply(event)
+            if event.get("e") == "listenKeyExpired":
+                self.listen_key = None
+                raise ConnectionError("listenKey expired")
+
+    def _apply(self, event):
+        self.cache.apply_event(event)
+        if self.ledger is not None:
+            self.ledger.apply_event(event)
+        if self.risk is not None:
+            self.risk.apply_event(event)
+
+    def _resync(self):
+        open_orders = self.bot._call("futures_get_open_orders")
+        balances = self.bot._call("futures_account_balance")
+        self.cache.load_snapshot(open_orders, balances)
+
+    async def _keepalive(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            if self.listen_key:
+                try:
+                    await asyncio.to_thread(self.bot._call, "futures_stream_keepalive", listenKey=self.listen_key)
+                    log.debug("listenKey keepalive sent.")
+                except Exception as e:
+                    log.warning(f"listenKey keepalive failed: {e}")
+
+
+def replay_events(cache: OrderStateCache, path):
+    """Applies every event of a recorded JSONL fixture to the cache."""
+    count = 0
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                cache.apply_event(json.loads(line))
+                count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded user-data stream fixture into an OrderStateCache")
+    parser.add_argument('fixture', type=str, help='JSONL file of user-data stream events')
+    args = parser.parse_args()
+
+    cache = OrderStateCache()
+    cache.load_snapshot([], [])
+    start = time.perf_counter()
+    count = replay_events(cache, args.fixture)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {count} event(s) in {elapsed * 1000:.2f} ms")
+    print("\n--- Open Orders ---")
+    print(json.dumps(cache.get_open_orders(), indent=2))
+    print("\n--- Balances ---")
+    print(json.dumps(list(cache.balances.values()), indent=2))